@@ -0,0 +1,45 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmarks for dodai.  Each module can be run on its own, eg..
+
+    python -m bench.find
+"""
+
+import time
+
+
+def timeit(func, repeat=200):
+    """Returns the best wall time, in seconds, of calling func repeat times
+    """
+    best = None
+    for x in range(0, repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def report(title, rows):
+    """Prints a simple table of (label, value) rows
+    """
+    print(title)
+    width = max(len(label) for label, value in rows)
+    for label, value in rows:
+        print("  {0}  {1}".format(label.ljust(width), value))
@@ -0,0 +1,61 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+"""Compares the throughput of the parser backends in dodai.parse.backend on
+a generated config file with thousands of tenant database sections.
+"""
+
+from dodai.parse import backend
+from bench import timeit, report
+
+SECTIONS = 5000
+
+
+def build_text(count):
+    out = ["[DEFAULT]\nroot = /srv\n# Generated file\n"]
+    for x in range(0, count):
+        out.append("[db.tenant{0}]\ndialect = postgresql\n"
+                   "host = db{0}.example.com\nport: 5432\n"
+                   "username = user{0}\npassword = secret\n"
+                   "database = tenant{0}\nschema = public\n"
+                   "; the options are passed on to the driver\n"
+                   "options = sslmode=require\n    connect_timeout=10\n"
+                   "path = %(root)s/tenant{0}\n\n".format(x))
+    return ''.join(out)
+
+
+def main():
+    text = build_text(SECTIONS)
+    megabytes = len(text.encode('utf-8')) / 1e6
+    rows = []
+    times = {}
+    for name in (backend.ConfigParserBackend.NAME,
+                 backend.NativeBackend.NAME):
+        parse = backend.load(name)
+        times[name] = elapsed = timeit(lambda: parse(text), 10)
+        rows.append(("{0}: MB/s".format(name),
+                     "{0:.1f}".format(megabytes / elapsed)))
+        rows.append(("{0}: sections/s".format(name),
+                     "{0:.0f}".format(SECTIONS / elapsed)))
+    rows.append(("native speedup", "{0:.1f}x".format(
+        times[backend.ConfigParserBackend.NAME] /
+        times[backend.NativeBackend.NAME])))
+    report("Parser backends, {0} sections ({1:.2f} MB)".format(
+           SECTIONS, megabytes), rows)
+
+
+if __name__ == '__main__':
+    main()
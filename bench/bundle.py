@@ -0,0 +1,84 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+"""Compares the startup work of loading a project's config from its files
+(discovery, parse, environment and database validation) with loading
+a compiled dodai.parse.bundle.Bundle and validating its database sections,
+which the bundle already did.
+"""
+
+import os
+import tempfile
+from dodai.compile import CompileBundle
+from dodai.parse.ini import ParseIni
+from dodai.validate.database import IsValidDatabaseConnectionSection
+from bench import timeit, report
+
+PROJECT = '__bench__dodai__bundle__'
+FILES = 10
+SECTIONS_PER_FILE = 20
+
+
+def write_files(directory):
+    files = []
+    for x in range(0, FILES):
+        path = os.path.join(directory, 'conf{0}.ini'.format(x))
+        with open(path, 'w') as f:
+            f.write("[server]\nenvironment = prod\n"
+                    "[DEFAULT]\nroot = /srv/{0}\n".format(x))
+            for y in range(0, SECTIONS_PER_FILE):
+                f.write("[db.tenant{0}_{1}]\ndialect = sqlite\n"
+                        "path = %(root)s/tenant{1}.db\n"
+                        "timeout = 30\n\n".format(x, y))
+        files.append(path)
+    return files
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        files = write_files(directory)
+        path = os.path.join(directory, 'config.bundle')
+        CompileBundle.load(PROJECT)(files).write(path)
+        size = os.path.getsize(path)
+        # A new ParseIni each time, as in a new process
+        from_files = timeit(lambda: CompileBundle.load(PROJECT)(files), 20)
+        from_bundle = timeit(lambda: ParseIni.load(PROJECT, bundle=path)
+                                     .sections(), 20)
+
+        def validated():
+            sections = ParseIni.load(PROJECT, bundle=path).sections()
+            sections.environment
+            assert IsValidDatabaseConnectionSection.load(sections) \
+                   .batch().ok
+
+        from_bundle_validated = timeit(validated, 20)
+    rows = [
+        ("files: parse, validate (ms)",
+         "{0:.2f}".format(from_files * 1e3)),
+        ("bundle: read and decode (ms)",
+         "{0:.2f}  ({1:.1f}x)".format(from_bundle * 1e3,
+                                      from_files / from_bundle)),
+        ("bundle: and environment, validation (ms)",
+         "{0:.2f}  ({1:.1f}x)".format(from_bundle_validated * 1e3,
+                                      from_files / from_bundle_validated)),
+    ]
+    report("Startup of {0} files, {1} database sections, {2} KB "
+           "bundle".format(FILES, FILES * SECTIONS_PER_FILE, size // 1024),
+           rows)
+
+
+if __name__ == '__main__':
+    main()
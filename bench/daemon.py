@@ -0,0 +1,95 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+"""Compares loading the config in process with getting it from a
+dodai.daemon.ConfigDaemon over its Unix socket.
+"""
+
+import os
+import tempfile
+import threading
+from dodai import daemon
+from dodai.parse.ini import ParseIni
+from bench import timeit, report
+from bench.snapshot import write_files
+
+PROJECT = '__bench__dodai__daemon__'
+FILES = 10
+CLIENTS = 8
+REQUESTS = 200
+
+
+def parse_ini(files):
+    out = ParseIni(PROJECT)
+    out.sections(files)
+    return out
+
+
+def main():
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        files = write_files(directory, FILES)
+        path = os.path.join(directory, 'daemon.sock')
+        fallback = parse_ini(files)
+        in_process = timeit(lambda: parse_ini(files), 20)
+        with daemon.ConfigDaemon(parse_ini(files), path, watch=False):
+            def new_client():
+                client = daemon.ConfigClient(path, fallback)
+                client.current
+                client.close()
+
+            first = timeit(new_client, 20)
+            client = daemon.ConfigClient(path, fallback)
+            client.current
+            cached = timeit(lambda: client.current, 1000)
+
+            def get(sock):
+                daemon.send_frame(sock, daemon.GET)
+                daemon.read_frame(sock)
+
+            sock = client._connect()
+            round_trip = timeit(lambda: get(sock), 200)
+            sock.close()
+
+            def hammer():
+                sock = client._connect()
+                for x in range(0, REQUESTS):
+                    get(sock)
+                sock.close()
+
+            def run_clients():
+                threads = [threading.Thread(target=hammer)
+                           for x in range(0, CLIENTS)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+            many = timeit(run_clients, 3)
+            client.close()
+    rows.append(("in process load (ms)", "{0:.2f}".format(in_process * 1e3)))
+    rows.append(("new client, first current (ms)",
+                 "{0:.2f}  ({1:.1f}x)".format(first * 1e3,
+                                              in_process / first)))
+    rows.append(("cached current (us)", "{0:.2f}".format(cached * 1e6)))
+    rows.append(("GET round trip (us)", "{0:.0f}".format(round_trip * 1e6)))
+    rows.append(("GET throughput, {0} clients (req/s)".format(CLIENTS),
+                 "{0:.0f}".format(CLIENTS * REQUESTS / many)))
+    report("Config daemon vs in process, {0} files".format(FILES), rows)
+
+
+if __name__ == '__main__':
+    main()
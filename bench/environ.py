@@ -0,0 +1,114 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compares building the config from environment variables, as in a
+container, with finding and parsing the same config in files.  Both are
+timed in process with a new ParseIni each time, and as the cold start of a
+new interpreter.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+from dodai.util import find
+from dodai.parse.ini import ParseIni
+from bench import timeit, report
+
+PROJECT = '__bench__dodai__environ__'
+SECTIONS = 20
+KEYS = ('dialect', 'host', 'port', 'username', 'password', 'database')
+
+COLD_START = """
+import sys
+from dodai.util import find
+from dodai.parse.ini import ParseIni
+if len(sys.argv) > 1:
+    find.config_directories = lambda project_name: sys.argv[1:]
+ParseIni.load({0!r}).sections()
+""".format(PROJECT)
+
+
+def build_environ():
+    environ = {}
+    for x in range(0, SECTIONS):
+        for key in KEYS:
+            environ['DODAI__DB_TENANT{0}__{1}'.format(x, key.upper())] = \
+                '{0}{1}'.format(key, x)
+    return environ
+
+
+def write_files(root):
+    directories = []
+    for name in ('project', 'etc', 'home'):
+        directory = os.path.join(root, name)
+        os.mkdir(directory)
+        directories.append(directory)
+    with open(os.path.join(directories[0], 'config.ini'), 'w') as f:
+        for x in range(0, SECTIONS):
+            f.write("[db.tenant{0}]\n".format(x))
+            for key in KEYS:
+                f.write("{0} = {0}{1}\n".format(key, x))
+    return directories
+
+
+def cold_start(args, environ, repeat=5):
+    best = None
+    for x in range(0, repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', COLD_START] + args,
+                       env=environ, check=True)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    environ = build_environ()
+    with tempfile.TemporaryDirectory() as root:
+        directories = write_files(root)
+        config_directories = find.config_directories
+        find.config_directories = lambda project_name: directories
+        try:
+            files = timeit(lambda: ParseIni(PROJECT).sections(), 200)
+        finally:
+            find.config_directories = config_directories
+        from_environ = timeit(lambda: ParseIni(PROJECT, environ=environ)
+                                      .sections(), 200)
+
+        base = dict(os.environ)
+        base.pop(ParseIni.ENVIRON_VARIABLE, None)
+        with_environ = dict(base, **environ)
+        with_environ[ParseIni.ENVIRON_VARIABLE] = '1'
+        cold_files = cold_start(directories, base)
+        cold_environ = cold_start([], with_environ)
+
+    report("Container start, {0} sections of {1} keys".format(
+           SECTIONS, len(KEYS)), [
+        ("file discovery + parse (us)", "{0:.1f}".format(files * 1e6)),
+        ("environment variables (us)", "{0:.1f}  ({1:.1f}x)".format(
+                                from_environ * 1e6, files / from_environ)),
+        ("cold start, files (ms)", "{0:.1f}".format(cold_files * 1e3)),
+        ("cold start, environment (ms)", "{0:.1f}".format(
+                                cold_environ * 1e3)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
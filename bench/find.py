@@ -0,0 +1,138 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compares the filesystem cost of dodai.util.find.ConfigFiles against the
+original probe of every candidate path with os.path.exists/isfile.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from dodai.util import find
+from bench import timeit, report
+
+
+class _CountingEntry(object):
+
+    def __init__(self, entry, counter):
+        self._entry = entry
+        self._counter = counter
+        self.name = entry.name
+        self.path = entry.path
+
+    def is_file(self):
+        if self._entry.is_symlink():
+            self._counter['stat'] += 1
+        return self._entry.is_file()
+
+    def stat(self):
+        self._counter['stat'] += 1
+        return self._entry.stat()
+
+
+class _CountingScandir(object):
+
+    def __init__(self, iterator, counter):
+        self._iterator = iterator
+        self._counter = counter
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._iterator.close()
+
+    def __iter__(self):
+        for entry in self._iterator:
+            yield _CountingEntry(entry, self._counter)
+
+
+@contextmanager
+def count_syscalls():
+    """Counts the stat and directory listing calls made through os
+    """
+    counter = {'stat': 0, 'scandir': 0}
+    stat, lstat, scandir = os.stat, os.lstat, os.scandir
+
+    def counting_stat(*args, **kwargs):
+        counter['stat'] += 1
+        return stat(*args, **kwargs)
+
+    def counting_lstat(*args, **kwargs):
+        counter['stat'] += 1
+        return lstat(*args, **kwargs)
+
+    def counting_scandir(*args, **kwargs):
+        counter['scandir'] += 1
+        return _CountingScandir(scandir(*args, **kwargs), counter)
+
+    os.stat, os.lstat, os.scandir = counting_stat, counting_lstat, \
+                                    counting_scandir
+    try:
+        yield counter
+    finally:
+        os.stat, os.lstat, os.scandir = stat, lstat, scandir
+
+
+def probe_every_candidate(config_files):
+    """The original ConfigFiles.__call__: stat every possible filename
+    """
+    out = []
+    for directory in config_files.directories:
+        for filename in config_files._build_filenames():
+            filename = os.path.join(directory, filename)
+            if os.path.exists(filename) and os.path.isfile(filename):
+                out.append(filename)
+    return out
+
+
+def build_directories(root):
+    directories = []
+    for name, files in (('project', ('config.ini',)),
+                        ('etc', ()),
+                        ('home', ('.db.cfg', 'server.txt', 'notes.md'))):
+        directory = os.path.join(root, name)
+        os.mkdir(directory)
+        for filename in files:
+            with open(os.path.join(directory, filename), 'w') as f:
+                f.write('[main]\n')
+        directories.append(directory)
+    return directories
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        config_files = find.ConfigFiles(build_directories(root), 'utf-8')
+
+        with count_syscalls() as legacy:
+            probe_every_candidate(config_files)
+        with count_syscalls() as scan:
+            config_files()
+
+        report("Config discovery over 3 directories", [
+            ("probe: stat calls", legacy['stat']),
+            ("scan: stat calls", scan['stat']),
+            ("scan: directory listings", scan['scandir']),
+            ("probe: best time (us)", "{0:.1f}".format(
+                timeit(lambda: probe_every_candidate(config_files)) * 1e6)),
+            ("scan: best time (us)", "{0:.1f}".format(
+                timeit(config_files) * 1e6)),
+        ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Times dodai.util.find.config_directories, which every ConfigFiles.load
+calls, with the environment probed once against probing it on every call.
+"""
+
+from dodai.util import find
+from bench import timeit, report
+
+PROJECT = '__bench__dodai__probe__'
+
+
+def cold():
+    find.reset_probes()
+    return find.config_directories(PROJECT)
+
+
+def main():
+    cold_time = timeit(cold, 2000)
+    warm_time = timeit(lambda: find.config_directories(PROJECT), 2000)
+    load_time = timeit(lambda: find.ConfigFiles.load(PROJECT), 2000)
+    report("config_directories() call cost", [
+        ("probed every call (us)", "{0:.1f}".format(cold_time * 1e6)),
+        ("probed once (us)", "{0:.1f}".format(warm_time * 1e6)),
+        ("ConfigFiles.load (us)", "{0:.1f}".format(load_time * 1e6)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compares validating the host of 50 database sections one after another
+with validating them as one batch, using a stub resolver where every lookup
+takes 20ms and one of them hangs.  Then times validating the same config
+again with a dodai.validate.cache.HostCache.
+"""
+
+import time
+import threading
+from dodai.validate.field.host import IsValidHost, ResolveHosts
+from dodai.validate.cache import HostCache
+from bench import report
+
+SECTIONS = 50
+DELAY = 0.02
+
+
+class StubResolver(object):
+
+    def __init__(self, delay, hang):
+        self._delay = delay
+        self._hang = hang
+        self._released = threading.Event()
+
+    def __call__(self, host):
+        if host == self._hang:
+            self._released.wait(5)
+        else:
+            time.sleep(self._delay)
+        return [host]
+
+    def release(self):
+        self._released.set()
+
+
+def main():
+    sections = dict(('db.tenant{0}'.format(x),
+                     {'host': 'db{0}.example.com'.format(x)})
+                    for x in range(0, SECTIONS))
+    names = sorted(sections)
+    hang = sections[names[-1]]['host']
+
+    resolver = StubResolver(DELAY, None)
+    validate = IsValidHost.load(sections, raise_errors=False,
+                                resolve_hosts=ResolveHosts(resolver))
+    start = time.perf_counter()
+    for name in names:
+        validate(name)
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    validate.batch(names)
+    batch = time.perf_counter() - start
+
+    resolver = StubResolver(DELAY, hang)
+    validate = IsValidHost.load(sections, raise_errors=False,
+                                resolve_hosts=ResolveHosts(
+                                    resolver, lookup_timeout=0.5,
+                                    timeout=2.0))
+    start = time.perf_counter()
+    out = validate.batch(names)
+    hanging = time.perf_counter() - start
+    resolver.release()
+
+    cache = HostCache()
+    validate = IsValidHost.load(sections, raise_errors=False,
+                                resolve_hosts=ResolveHosts(
+                                    StubResolver(DELAY, None), cache=cache))
+    validate.batch(names)
+    start = time.perf_counter()
+    validate.batch(names)
+    cached = time.perf_counter() - start
+
+    report("Host validation of {0} sections, {1:.0f}ms per lookup".format(
+           SECTIONS, DELAY * 1e3), [
+        ("one after another (ms)", "{0:.1f}".format(serial * 1e3)),
+        ("batch (ms)", "{0:.1f}  ({1:.1f}x)".format(batch * 1e3,
+                                                   serial / batch)),
+        ("batch, one hung lookup (ms)", "{0:.1f}  ({1} failed)".format(
+            hanging * 1e3, sum(1 for value in out.values() if not value))),
+        ("batch, unchanged config, cached (ms)", "{0:.3f}  ({1} hits)".format(
+            cached * 1e3, cache.hits)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
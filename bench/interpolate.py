@@ -0,0 +1,69 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+"""Compares repeated reads of deeply interpolated values from a
+configparser.ConfigParser and from a dodai.parse.sections.Sections, which
+resolves each value once.
+"""
+
+import configparser
+from dodai.parse.sections import Sections
+from bench import timeit, report
+
+DEPTH = 8
+READS = 10000
+
+
+def build_data():
+    defaults = {'level0': '/srv'}
+    for x in range(1, DEPTH):
+        defaults['level{0}'.format(x)] = '%(level{0})s/l{1}'.format(x - 1, x)
+    section = {'url': 'postgresql://db/%(level{0})s'.format(DEPTH - 1)}
+    return {'DEFAULT': defaults, 'db.main': section}
+
+
+def main():
+    data = build_data()
+    parser = configparser.ConfigParser()
+    parser.read_dict(data)
+    sections = Sections(dict((name, dict(values)) for name, values
+                             in data.items()))
+    assert parser.get('db.main', 'url') == sections.get('db.main', 'url')
+
+    def read(config):
+        def run():
+            for x in range(0, READS):
+                config['db.main']['url']
+        return run
+
+    parse = timeit(read(parser), 5)
+    cached = timeit(read(sections), 5)
+    reload = Sections(dict((name, dict(values)) for name, values
+                           in data.items()), sections)
+    reloaded = timeit(read(reload), 5)
+    rows = [
+        ("configparser (reads/s)", "{0:.0f}".format(READS / parse)),
+        ("Sections (reads/s)", "{0:.0f}  ({1:.1f}x)".format(
+                                    READS / cached, parse / cached)),
+        ("Sections after reload (reads/s)", "{0:.0f}".format(
+                                    READS / reloaded)),
+    ]
+    report("Reads of a value interpolated {0} levels deep".format(DEPTH),
+           rows)
+
+
+if __name__ == '__main__':
+    main()
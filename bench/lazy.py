@@ -0,0 +1,72 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+"""Compares reading one tenant from a large generated config file with the
+eager sections and the lazy sections of dodai.parse.ini.ParseIni.
+"""
+
+import os
+import tempfile
+import tracemalloc
+from dodai.parse.ini import ParseIni
+from bench import timeit, report
+from bench.backend import build_text
+
+PROJECT = '__bench__dodai__lazy__'
+SECTIONS = 20000
+
+
+def read_one(**kwargs):
+    def run(path):
+        sections = ParseIni(PROJECT, backend='native', **kwargs)\
+                   .sections([path])
+        return sections['db.tenant1234']['host']
+    return run
+
+
+def peak_memory(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'tenants.ini')
+        with open(path, 'w') as f:
+            f.write(build_text(SECTIONS))
+        megabytes = os.path.getsize(path) / 1e6
+        for label, kwargs in (('eager', {}),
+                              ('lazy', dict(lazy=True)),
+                              ('lazy, db.* only', dict(lazy=True,
+                                                       prefixes='db.'))):
+            run = read_one(**kwargs)
+            elapsed = timeit(lambda: run(path), 5)
+            memory = peak_memory(run, path)
+            rows.append(("{0}: first read (ms)".format(label),
+                         "{0:.1f}".format(elapsed * 1e3)))
+            rows.append(("{0}: peak memory (MB)".format(label),
+                         "{0:.1f}".format(memory / 1e6)))
+    report("One tenant from {0} sections ({1:.1f} MB)".format(
+           SECTIONS, megabytes), rows)
+
+
+if __name__ == '__main__':
+    main()
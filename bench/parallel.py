@@ -0,0 +1,58 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+"""Compares reading config files one after another with reading them on a
+thread pool when every open is slow, as on network storage.
+"""
+
+import time
+import tempfile
+from dodai.parse.ini import ParseIni
+from bench import timeit, report
+from bench.snapshot import write_files
+
+PROJECT = '__bench__dodai__parallel__'
+LATENCY = 0.02
+FILES = 10
+
+
+def slow_opener(name, *args, **kwargs):
+    time.sleep(LATENCY)
+    return open(name, *args, **kwargs)
+
+
+def main():
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        files = write_files(directory, FILES)
+        for workers in (None, 2, 4, 8):
+            label = "{0} workers".format(workers or 1)
+            # A new ParseIni each time so every file is read again
+            sections = timeit(lambda: ParseIni(PROJECT, workers=workers,
+                                               opener=slow_opener)
+                                      .sections(files), 5)
+            parser = timeit(lambda: ParseIni(PROJECT, workers=workers,
+                                             opener=slow_opener)(files), 5)
+            rows.append(("{0}: sections (ms)".format(label),
+                         "{0:.1f}".format(sections * 1e3)))
+            rows.append(("{0}: configparser (ms)".format(label),
+                         "{0:.1f}".format(parser * 1e3)))
+    report("{0} files, {1:.0f} ms per open".format(FILES, LATENCY * 1e3),
+           rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Read throughput of a published Sections, read without locking, against
+a ConfigParser guarded by a lock, while a reloader swaps the config.
+"""
+
+import time
+import threading
+import configparser
+from dodai.parse.publish import Published
+from dodai.parse.sections import Sections
+from bench import report
+
+SECONDS = 1.0
+RELOAD_INTERVAL = 0.01
+DATA = {
+    'DEFAULT': {'root': '/srv'},
+    'db.main': {'dialect': 'postgresql', 'host': 'db.example.com',
+                'port': '5432', 'path': '%(root)s/main'},
+}
+
+
+def build_sections():
+    return Sections(dict((name, dict(values)) for name, values
+                         in DATA.items()))
+
+
+def build_parser():
+    parser = configparser.ConfigParser()
+    parser.read_dict(DATA)
+    return parser
+
+
+def run(threads, read, reload):
+    stop = threading.Event()
+    counts = [0] * threads
+
+    def reader(index):
+        count = 0
+        while not stop.is_set():
+            for x in range(0, 100):
+                read()
+            count += 100
+        counts[index] = count
+
+    def reloader():
+        while not stop.is_set():
+            reload()
+            time.sleep(RELOAD_INTERVAL)
+
+    workers = [threading.Thread(target=reader, args=(x,))
+               for x in range(0, threads)]
+    workers.append(threading.Thread(target=reloader))
+    for worker in workers:
+        worker.start()
+    time.sleep(SECONDS)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / SECONDS
+
+
+def main():
+    published = Published(build_sections())
+
+    def read_published():
+        section = published.current['db.main']
+        return section['host'], section['path']
+
+    def reload_published():
+        published.publish(build_sections())
+
+    lock = threading.Lock()
+    state = {'parser': build_parser()}
+
+    def read_locked():
+        with lock:
+            section = state['parser']['db.main']
+            return section['host'], section['path']
+
+    def reload_locked():
+        parser = build_parser()
+        with lock:
+            state['parser'] = parser
+
+    rows = []
+    for threads in (1, 4):
+        for name, read, reload in (
+                ("published Sections", read_published, reload_published),
+                ("locked ConfigParser", read_locked, reload_locked)):
+            rows.append(("{0}, {1} thread(s) (reads/s)".format(name,
+                                                                threads),
+                         "{0:,.0f}".format(run(threads, read, reload))))
+    report("Read throughput while reloading every {0}s".format(
+           RELOAD_INTERVAL), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compares a cold parse of 1, 10 and 100 config files with loading the
+same data from a dodai.parse.snapshot.ParseSnapshot.
+"""
+
+import os
+import tempfile
+from dodai.parse.ini import ParseIni
+from dodai.parse.snapshot import ParseSnapshot
+from bench import timeit, report
+
+PROJECT = '__bench__dodai__snapshot__'
+SECTIONS_PER_FILE = 20
+
+
+def write_files(directory, count):
+    files = []
+    for x in range(0, count):
+        path = os.path.join(directory, 'conf{0}.ini'.format(x))
+        with open(path, 'w') as f:
+            f.write("[DEFAULT]\nroot = /srv/{0}\n".format(x))
+            for y in range(0, SECTIONS_PER_FILE):
+                f.write("[db.tenant{0}_{1}]\ndialect = postgresql\n"
+                        "host = db{1}.example.com\nport = 5432\n"
+                        "username = user{1}\npassword = secret\n"
+                        "database = tenant{1}\nschema = public\n"
+                        "path = %(root)s/tenant{1}\n\n".format(x, y))
+        os.utime(path, (1000000000, 1000000000))
+        files.append(path)
+    return files
+
+
+def main():
+    rows = []
+    for count in (1, 10, 100):
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_files(directory, count)
+            path = os.path.join(directory, 'snapshot')
+            ParseIni(PROJECT, ParseSnapshot(path)).sections(files)
+
+            # A new ParseIni each time so nothing is reused in memory
+            repeat = max(5, 200 // count)
+            parse = timeit(lambda: ParseIni(PROJECT)(files), repeat)
+            sections = timeit(lambda: ParseIni(PROJECT).sections(files),
+                              repeat)
+            load = timeit(lambda: ParseIni(PROJECT, ParseSnapshot(path))
+                                  .sections(files), repeat)
+        rows.append(("{0} files: configparser (ms)".format(count),
+                     "{0:.2f}".format(parse * 1e3)))
+        rows.append(("{0} files: sections, no snapshot (ms)".format(count),
+                     "{0:.2f}".format(sections * 1e3)))
+        rows.append(("{0} files: sections, snapshot (ms)".format(count),
+                     "{0:.2f}  ({1:.1f}x)".format(load * 1e3,
+                                                  parse / load)))
+    report("Cold parse vs snapshot load, {0} sections per file".format(
+           SECTIONS_PER_FILE), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Validates 10,000 database sections three ways: the original chain of
+field validators that each check the section again, the compiled plan one
+section at a time, and the batch that collects a report.  Then validates
+a reloaded, unchanged config with a dodai.validate.cache.ValidationCache
+and times a worker that only uses a few sections, validated on first use.
+A stub resolver answers every host at once so only the validation itself
+is timed.
+"""
+
+import time
+from dodai.validate.database import IsDatabaseConnectionSection
+from dodai.validate.database import IsValidDatabaseConnectionSection
+from dodai.validate.database import ValidateOnFirstUse
+from dodai.validate.field.host import IsValidHost, ResolveHosts
+from dodai.validate.cache import ValidationCache
+from dodai.validate.field.port import IsValidPort
+from dodai.validate.field.username import IsValidUsername
+from dodai.validate.field.password import IsValidPassword
+from dodai.validate.field.database import IsValidDatabase
+from dodai.validate.field.schema import IsValidSchema
+from dodai.parse.sections import Sections
+from bench import report
+
+SECTIONS = 10000
+USED = 5
+
+
+def build_sections():
+    data = {}
+    for x in range(0, SECTIONS):
+        data['db.tenant{0}'.format(x)] = {
+            'dialect': 'postgresql', 'host': 'db{0}.example.com'.format(x % 50),
+            'port': '5432', 'username': 'user', 'password': 'secret',
+            'database': 'tenant{0}'.format(x), 'schema': 'public'}
+    return Sections(data)
+
+
+def legacy(sections, names, resolve_hosts):
+    """The chain as it was: every field validator is loaded on its own and
+    checks that the section exists before its field
+    """
+    is_database_section = IsDatabaseConnectionSection.load(sections)
+    chain = [IsValidHost.load(sections, resolve_hosts=resolve_hosts)]
+    chain.extend(validate.load(sections) for validate in (
+                 IsValidPort, IsValidUsername, IsValidPassword,
+                 IsValidDatabase))
+    is_valid_schema = IsValidSchema.load(sections)
+    for name in names:
+        if is_database_section(name):
+            if all([validate(name) for validate in chain]):
+                is_valid_schema(name)
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    names = build_sections().sections()
+    resolve_hosts = ResolveHosts(lambda host: [host])
+
+    def compiled(sections):
+        validate = IsValidDatabaseConnectionSection.load(
+                        sections, resolve_hosts=resolve_hosts)
+        for name in names:
+            validate(name)
+
+    def batch(sections):
+        validate = IsValidDatabaseConnectionSection.load(
+                        sections, resolve_hosts=resolve_hosts)
+        assert validate.batch(names).ok
+
+    def first_use(sections):
+        validate = ValidateOnFirstUse.load(sections,
+                                           resolve_hosts=resolve_hosts)
+        validate.names
+        for name in names[:USED]:
+            for x in range(0, 100):
+                assert validate(name)
+
+    def best(func):
+        # Sections keep converted values, so each run gets its own
+        return min(timed(lambda: func(build_sections()))
+                   for x in range(0, 3))
+
+    old = best(lambda sections: legacy(sections, names, resolve_hosts))
+    new = best(compiled)
+    all_at_once = best(batch)
+    deferred = best(first_use)
+
+    cache = ValidationCache()
+    IsValidDatabaseConnectionSection.load(build_sections(), cache=cache,
+                    resolve_hosts=resolve_hosts).batch(names)
+    reloaded = build_sections()
+    cached = timed(lambda: IsValidDatabaseConnectionSection.load(
+                    reloaded, cache=cache,
+                    resolve_hosts=resolve_hosts).batch(names))
+    report("Validation of {0} database sections".format(SECTIONS), [
+        ("field validators (ms)", "{0:.1f}".format(old * 1e3)),
+        ("compiled plan (ms)", "{0:.1f}  ({1:.1f}x)".format(new * 1e3,
+                                                          old / new)),
+        ("batch report (ms)", "{0:.1f}  ({1:.1f}x)".format(
+                                all_at_once * 1e3, old / all_at_once)),
+        ("batch after reload, cached (ms)", "{0:.1f}  ({1:.1f}x)".format(
+                                cached * 1e3, old / cached)),
+        ("{0} sections used, on first use (ms)".format(USED),
+         "{0:.1f}  ({1:.1f}x)".format(deferred * 1e3, old / deferred)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Measures the time from editing a config file to the ConfigWatcher
+callback firing, and the CPU an idle watcher uses.
+"""
+
+import os
+import time
+import tempfile
+import threading
+from dodai.util import watch
+from bench import report
+
+DEBOUNCE = 0.05
+EDITS = 10
+IDLE_SECONDS = 2.0
+
+
+def measure(backend, directory):
+    fired = threading.Event()
+    seen = []
+
+    def callback(event):
+        seen.append(time.monotonic())
+        fired.set()
+
+    path = os.path.join(directory, 'db.ini')
+    watcher = watch.ConfigWatcher([directory], [], ('db.ini',), callback,
+                                  backend, debounce=DEBOUNCE)
+    with watcher:
+        cpu = time.process_time()
+        time.sleep(IDLE_SECONDS)
+        idle = time.process_time() - cpu
+
+        latencies = []
+        for x in range(0, EDITS):
+            fired.clear()
+            start = time.monotonic()
+            with open(path, 'w') as f:
+                f.write("[main]\nedit = {0}\n".format(x))
+            # Move the mtime on filesystems with coarse timestamps
+            stamp = time.time() + x
+            os.utime(path, (stamp, stamp))
+            if fired.wait(5):
+                latencies.append(seen[-1] - start)
+            time.sleep(DEBOUNCE * 2)
+    if not latencies:
+        latencies.append(float('nan'))
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[-1], idle
+
+
+def main():
+    backends = [('polling (0.1s)', lambda: watch._PollingBackend(0.1))]
+    if watch._InotifyBackend.load():
+        backends.insert(0, ('inotify', watch._InotifyBackend.load))
+
+    rows = []
+    for name, backend in backends:
+        with tempfile.TemporaryDirectory() as directory:
+            median, worst, idle = measure(backend(), directory)
+        rows.append(("{0}: median latency (ms)".format(name),
+                     "{0:.1f}".format(median * 1e3)))
+        rows.append(("{0}: worst latency (ms)".format(name),
+                     "{0:.1f}".format(worst * 1e3)))
+        rows.append(("{0}: idle cpu over {1}s (ms)".format(name,
+                                                        IDLE_SECONDS),
+                     "{0:.2f}".format(idle * 1e3)))
+    report("Edit to callback latency, debounce {0}s".format(DEBOUNCE), rows)
+
+
+if __name__ == '__main__':
+    main()
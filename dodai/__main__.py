@@ -0,0 +1,76 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+"""Command line of dodai::
+
+    python -m dodai compile <project_name> [-o bundle] [-f config_file ...]
+"""
+
+import sys
+import argparse
+
+
+def compile_command(args):
+    from dodai.compile import CompileBundle
+    from dodai.parse.sections import DEFAULT_SECTION
+    compile_bundle = CompileBundle.load(args.project_name,
+                                        validate=not args.no_validate,
+                                        prefix=args.prefix)
+    try:
+        bundle = compile_bundle(args.files or None)
+    except (KeyError, ValueError) as e:
+        sys.stderr.write("Unable to compile the config: {0}\n".format(
+                         e.args[0] if e.args else e))
+        return 1
+    output = args.output or "{0}.bundle".format(args.project_name)
+    try:
+        bundle.write(output)
+    except OSError as e:
+        sys.stderr.write("Unable to write the bundle: {0}\n".format(e))
+        return 1
+    sections = [name for name in bundle.data if name != DEFAULT_SECTION]
+    sys.stdout.write("Compiled {0} config files, {1} sections and {2} "
+                     "databases ({3}) into {4}\n".format(
+                     len(bundle.files), len(sections),
+                     len(bundle.databases), bundle.environment, output))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m dodai')
+    commands = parser.add_subparsers(dest='command')
+    command = commands.add_parser(
+            'compile', help='compile the config of a project into a bundle')
+    command.add_argument('project_name')
+    command.add_argument('-o', '--output',
+                         help='the bundle to write, defaults to '
+                              '<project_name>.bundle')
+    command.add_argument('-f', '--file', dest='files', action='append',
+                         help='an extra config file, may be repeated')
+    command.add_argument('--prefix',
+                         help='the prefix of database section names')
+    command.add_argument('--no-validate', action='store_true',
+                         help='do not validate the database sections')
+    command.set_defaults(run=compile_command)
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.print_help()
+        return 2
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
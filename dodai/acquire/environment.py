@@ -29,10 +29,14 @@ class AcquireEnvironment(object):
     def __init__(self, sections, log=None, value=None, section_name=None,
                  field_name=None, default_value=None):
         self._sections = sections
+        self._value = value
         self._section_name = section_name
         self._field_name = field_name
         self._default_value = default_value or self.ENVIRONMENT_DEFAULT
-        self._out_ = None
+        # (section_name, field_name, default_value) -> environment, only
+        # kept for config that can't change (eg.. Sections, which have a
+        # typed view)
+        self._out_ = {} if hasattr(type(sections), 'typed') else None
 
 
     @classmethod
@@ -59,11 +63,26 @@ class AcquireEnvironment(object):
 
     def __call__(self, section_name=None, field_name=None,
                  default_value=None):
+        """Returns the environment.  For a read-only
+        dodai.parse.sections.Sections it is only searched for the first
+        time for each set of arguments.
+        """
+        if self._value:
+            return self._value
         section_name = section_name or self._section_name
         field_name = field_name or self._field_name
         default_value = default_value or self._default_value
-        out = None
+        if self._out_ is None:
+            return self._search(section_name, field_name, default_value)
+        key = (section_name, field_name, default_value)
+        try:
+            return self._out_[key]
+        except KeyError:
+            out = self._out_[key] = self._search(section_name, field_name,
+                                                 default_value)
+            return out
 
+    def _search(self, section_name, field_name, default_value):
         if section_name:
             section_names = (section_name,)
         else:
@@ -81,4 +100,3 @@ class AcquireEnvironment(object):
                     return out
 
         return default_value
-
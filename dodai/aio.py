@@ -0,0 +1,170 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+"""Awaitable counterparts of config discovery, parsing, validation and
+connection setup.  The blocking calls (stat, scandir, open, DNS, connect)
+run on an executor through the same public functions and methods as the
+synchronous code, so none of this stalls a running event loop and both
+give the same results.  Independent sections are validated at the same
+time.
+
+To use this module::
+
+    parse_ini = AsyncParseIni.load('myproject')
+
+    async def startup():
+        sections = await parse_ini.sections()
+        validate = IsValidDatabaseConnectionSection.load(sections)
+        results = await validate_sections(validate, sections.sections())
+
+    async def on_change():
+        await parse_ini.publish()
+"""
+
+import asyncio
+import functools
+from dodai.util import find
+from dodai.parse.ini import ParseIni
+
+
+async def _run(executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    if kwargs:
+        func = functools.partial(func, **kwargs)
+    return await loop.run_in_executor(executor, func, *args)
+
+
+async def config_files(project_name, filenames=None, executor=None,
+                       use_manifest=False, environment=None):
+    """Returns the same list as dodai.util.find.config_files, which it runs
+    on the executor.
+
+    :param project_name: The name of the project
+    :param filenames: A list of complete file paths (or (filename,
+        encoding)) added to the config files found on the system
+    :param executor: The concurrent.futures executor that runs the
+        blocking calls.  Defaults to the loop's default executor.
+    :param use_manifest: See dodai.util.find.config_files
+    :param environment: See dodai.util.find.config_files
+    """
+    return await _run(executor, find.config_files, project_name, filenames,
+                      use_manifest, environment)
+
+# The methods below take a config_files argument that hides the function
+_config_files = config_files
+
+
+class AsyncParseIni(object):
+    """Awaitable wrapper of a dodai.parse.ini.ParseIni.  Its methods run on
+    the executor, so the result is the same as ParseIni.sections.  The
+    config files are read at the same time when the ParseIni has workers.
+    Reloads run one at a time.
+    """
+
+    def __init__(self, parse_ini, executor=None):
+        """
+        :param parse_ini: An instance of dodai.parse.ini.ParseIni
+        :param executor: The concurrent.futures executor that runs the
+            blocking calls.  Defaults to the loop's default executor.
+        """
+        self.parse_ini = parse_ini
+        self._executor = executor
+        self._lock = None
+
+    @classmethod
+    def load(cls, project_name, executor=None, **kwargs):
+        """
+        :param project_name: The name of the project
+        :param executor: The executor that runs the blocking calls
+        :param kwargs: Passed on to dodai.parse.ini.ParseIni.load
+        """
+        return cls(ParseIni.load(project_name, **kwargs), executor)
+
+    @property
+    def published(self):
+        return self.parse_ini.published
+
+    @property
+    def current(self):
+        """The last published Sections, or None before the first publish
+        """
+        return self.parse_ini.published.current
+
+    async def config_files(self, config_files=None):
+        """Returns the config files that sections would read
+        """
+        return await _config_files(self.parse_ini.project_name,
+                                   config_files, self._executor)
+
+    async def sections(self, config_files=None, dictionary=None):
+        """Returns the same Sections as dodai.parse.ini.ParseIni.sections
+        """
+        async with self._reload_lock():
+            return await _run(self._executor, self.parse_ini.sections,
+                              config_files, dictionary)
+
+    async def reload(self):
+        """Returns a new Sections using the config_files and dictionary
+        given to the last call of sections
+        """
+        async with self._reload_lock():
+            return await _run(self._executor, self.parse_ini.reload)
+
+    async def publish(self, config_files=None, dictionary=None):
+        """Reloads the config and swaps it in as the published config.
+        Readers of current never wait on this.
+        """
+        async with self._reload_lock():
+            return await _run(self._executor, self.parse_ini.publish,
+                              config_files, dictionary)
+
+    def _reload_lock(self):
+        # Made on first use so it belongs to the running loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+
+async def validate_sections(validate, section_names, executor=None):
+    """Runs a validator (eg..
+    dodai.validate.database.IsValidDatabaseConnectionSection) on every
+    section at the same time and returns a dictionary of section name to
+    its result.  The first error raised by the validator is raised.
+
+    :param validate: Callable that takes a section name
+    :param section_names: The names of the sections to validate
+    :param executor: The executor that runs the validator
+    """
+    section_names = list(section_names)
+    results = await asyncio.gather(*(_run(executor, validate, section_name)
+                                     for section_name in section_names))
+    return dict(zip(section_names, results))
+
+
+async def connect(connection, executor=None):
+    """Creates the engine and the default connection of a
+    dodai.process.database_connection.DodaiSqlalchemyConnection and returns
+    the connection
+    """
+    return await _run(executor, lambda: connection.connection)
+
+
+async def session(connection, executor=None):
+    """Creates the engine and the default session of a
+    dodai.process.database_connection.DodaiSqlalchemyConnection and returns
+    the session
+    """
+    return await _run(executor, lambda: connection.session)
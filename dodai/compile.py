@@ -0,0 +1,72 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+"""Compiles the config of a project into a dodai.parse.bundle.Bundle
+"""
+
+import time
+from dodai.parse.ini import ParseIni
+from dodai.parse.bundle import Bundle
+from dodai.acquire.environment import AcquireEnvironment
+from dodai.validate.database import IsDatabaseConnectionSection
+from dodai.validate.database import IsValidDatabaseConnectionSection
+
+
+class CompileBundle(object):
+    """Callable object that compiles the config of a project into a Bundle
+    """
+
+    def __init__(self, parse_ini, validate=True, log=None, prefix=None):
+        """
+        :param parse_ini: An instance of dodai.parse.ini.ParseIni
+        :param validate: If set to True the database sections are
+            validated and an invalid one raises an error
+        :param log: An instance of 'logger'
+        :param prefix: The prefix of database section names
+        """
+        self._parse_ini = parse_ini
+        self._validate = validate
+        self._log = log
+        self._prefix = prefix
+
+    @classmethod
+    def load(cls, project_name, validate=True, log=None, prefix=None,
+             **kwargs):
+        """
+        :param kwargs: Passed on to dodai.parse.ini.ParseIni.load
+        """
+        # Always compiled from the config files, never from an earlier
+        # bundle or the environment variables
+        parse_ini = ParseIni.load(project_name, bundle=False, environ=False,
+                                  **kwargs)
+        return cls(parse_ini, validate, log, prefix)
+
+    def __call__(self, config_files=None, dictionary=None):
+        sections = self._parse_ini.sections(config_files, dictionary)
+        environment = AcquireEnvironment.load(sections)()
+        if self._validate:
+            is_database = IsValidDatabaseConnectionSection.load(
+                            sections, self._log, prefix=self._prefix)
+        else:
+            is_database = IsDatabaseConnectionSection.load(
+                            sections, self._log, raise_errors=False,
+                            prefix=self._prefix)
+        databases = [section_name for section_name in sections.sections()
+                     if is_database(section_name)]
+        files = [file_.name for file_ in self._parse_ini.loaded_files]
+        return Bundle(self._parse_ini.project_name, environment,
+                      sections.to_dict(), databases, files, time.time(),
+                      bool(self._validate))
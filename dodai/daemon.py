@@ -0,0 +1,482 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+"""A local config daemon.  The daemon owns the ParseIni (and validators) of
+a project, keeps the parsed config hot and serves it to the processes of the
+host over a Unix domain socket.  Clients cache the config and are told when
+it changes.  When there is no daemon the client parses in process.
+
+Every message is a frame of a 13 byte header (op, generation, length) and
+length bytes of payload.  The config is sent as a marshal of its raw data.
+By default every database connection section is validated (see
+validate_sections) before a config is served.  Until the daemon has a
+config that is valid it answers GET with NO_CONFIG and clients parse in
+process.
+
+To run the daemon::
+
+    python -m dodai.daemon myproject
+
+And in every process::
+
+    client = ConfigClient.load('myproject')
+    sections = client.current
+"""
+
+import os
+import sys
+import time
+import logging
+import struct
+import marshal
+import socket
+import threading
+import socketserver
+from dodai.util import cache
+from dodai.parse.ini import ParseIni
+from dodai.parse.sections import Sections
+from dodai.validate.database import IsValidDatabaseConnectionSection
+
+# Frame ops
+GET = 1
+GENERATION = 2
+SUBSCRIBE = 3
+DATA = 4
+INVALIDATE = 5
+NO_CONFIG = 6
+ERROR = 255
+
+_HEADER = struct.Struct('!BQI')
+
+
+def socket_path(project_name):
+    """Returns the default path of the daemon's socket.  This is under
+    $XDG_RUNTIME_DIR and falls back to the user's dodai cache directory.
+    """
+    path = os.environ.get('XDG_RUNTIME_DIR')
+    if path and os.path.isabs(path):
+        path = os.path.join(path, 'dodai')
+    else:
+        path = cache.cache_directory()
+    return os.path.join(path, "{0}.sock".format(project_name.strip()))
+
+
+def validate_sections(sections):
+    """The default validation of the daemon.  Validates every database
+    connection section and raises a ValueError of all of the errors.
+    """
+    IsValidDatabaseConnectionSection.load(sections).batch().raise_errors()
+
+
+def send_frame(sock, op, generation=0, payload=b''):
+    sock.sendall(_HEADER.pack(op, generation, len(payload)) + payload)
+
+
+def read_frame(sock):
+    """Returns (op, generation, payload) or None when the socket was closed
+    """
+    header = _read_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    op, generation, length = _HEADER.unpack(header)
+    payload = b''
+    if length:
+        payload = _read_exact(sock, length)
+        if payload is None:
+            return None
+    return op, generation, payload
+
+
+def _read_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        daemon = self.server.config_daemon
+        while True:
+            try:
+                frame = read_frame(self.request)
+            except OSError:
+                return
+            if frame is None:
+                return
+            op = frame[0]
+            if op == GET:
+                if daemon.payload is None:
+                    send_frame(self.request, NO_CONFIG)
+                else:
+                    generation, payload = daemon.payload
+                    send_frame(self.request, DATA, generation, payload)
+            elif op == GENERATION:
+                send_frame(self.request, GENERATION, daemon.generation)
+            elif op == SUBSCRIBE:
+                lock = daemon._subscribe(self.request)
+                try:
+                    with lock:
+                        send_frame(self.request, INVALIDATE,
+                                   daemon.generation)
+                    # Nothing more is read, this waits for the client to go
+                    while read_frame(self.request) is not None:
+                        pass
+                except OSError:
+                    pass
+                finally:
+                    daemon._unsubscribe(self.request)
+                return
+            else:
+                send_frame(self.request, ERROR, 0, b'unknown op')
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class ConfigDaemon(object):
+    """Serves the config of a project over a Unix domain socket.  The
+    config is reloaded when its files change, checked with the validate
+    callable and only then published to the clients.  A config that fails
+    to parse or validate is logged and the last good one keeps being
+    served.  Until there is a good one, clients are told there is no
+    config and parse in process.
+    """
+
+    def __init__(self, parse_ini, path, validate=None, watch=True, log=None):
+        """
+        :param parse_ini: An instance of dodai.parse.ini.ParseIni
+        :param path: The path of the socket
+        :param validate: Callable that takes the new Sections and raises
+            when it is not valid, eg. validate_sections.  Nothing is
+            validated when it is None.
+        :param watch: If set to True the config files are watched and
+            reloaded when they change
+        :param log: An instance of 'logger'
+        """
+        self.parse_ini = parse_ini
+        self.path = path
+        self._validate = validate
+        self._watch = watch
+        self._log = log
+        # (generation, marshalled data) of the last good config
+        self.payload = None
+        self._lock = threading.Lock()
+        # socket -> lock that serializes the frames written to it
+        self._subscribers = {}
+        self._server = None
+        self._thread = None
+        self._watcher = None
+
+    @classmethod
+    def load(cls, project_name, path=None, validate=None, watch=True,
+             log=None, **kwargs):
+        """
+        :param project_name: The name of the project
+        :param path: The path of the socket, see socket_path
+        :param validate: Defaults to validate_sections, False validates
+            nothing
+        :param kwargs: Passed on to dodai.parse.ini.ParseIni.load
+        """
+        if validate is None:
+            validate = validate_sections
+        parse_ini = ParseIni.load(project_name, **kwargs)
+        return cls(parse_ini, path or socket_path(project_name),
+                   validate or None, watch, log)
+
+    @property
+    def generation(self):
+        """The generation being served, or 0 when there is no good config
+        """
+        payload = self.payload
+        return payload[0] if payload else 0
+
+    def reload(self, event=None):
+        """Parses and validates the config, then publishes it to the
+        clients.  Returns the new generation, or None when the config was
+        not valid.
+        """
+        with self._lock:
+            try:
+                sections = self.parse_ini.reload()
+                if self._validate:
+                    self._validate(sections)
+            except Exception:
+                if not self._log:
+                    raise
+                self._log.exception("The reloaded config is not valid")
+                return None
+            generation = self.parse_ini.published.publish(sections)
+            self.payload = (generation, marshal.dumps(sections.to_dict()))
+            if self._watcher:
+                self._watcher.update(self.parse_ini.loaded_files)
+        self._notify(generation)
+        return generation
+
+    def start(self):
+        """Loads the config and starts serving it in a background thread
+        """
+        self.reload()
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self._server = _Server(self.path, _Handler)
+        self._server.config_daemon = self
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='dodai-config-daemon')
+        self._thread.daemon = True
+        self._thread.start()
+        if self._watch:
+            self._watcher = self.parse_ini.watch(self.reload, log=self._log)
+        return self
+
+    def stop(self):
+        if self._watcher:
+            self._watcher.stop()
+            self._watcher = None
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            for sock in list(self._subscribers):
+                self._close(sock)
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while self._thread.is_alive():
+                self._thread.join(1)
+        finally:
+            self.stop()
+
+    def _subscribe(self, sock):
+        """Returns the lock that every frame written to the socket is sent
+        under
+        """
+        with self._lock:
+            return self._subscribers.setdefault(sock, threading.Lock())
+
+    def _unsubscribe(self, sock):
+        with self._lock:
+            self._subscribers.pop(sock, None)
+
+    def _notify(self, generation):
+        for sock, lock in list(self._subscribers.items()):
+            try:
+                with lock:
+                    send_frame(sock, INVALIDATE, generation)
+            except OSError:
+                self._unsubscribe(sock)
+
+    def _close(self, sock):
+        self._unsubscribe(sock)
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class ConfigClient(object):
+    """Reads the config of a project from its ConfigDaemon.  The config is
+    cached and only fetched again after the daemon says it changed.  When
+    the daemon can not be reached the config is parsed in process with
+    ParseIni, and the daemon is tried again every RETRY seconds.
+    """
+
+    RETRY = 1.0
+    TIMEOUT = 5.0
+
+    def __init__(self, path, fallback, timeout=None):
+        """
+        :param path: The path of the daemon's socket
+        :param fallback: The dodai.parse.ini.ParseIni used when there is no
+            daemon
+        :param timeout: Seconds to wait on the daemon
+        """
+        self.path = path
+        self._fallback = fallback
+        self._timeout = self.TIMEOUT if timeout is None else timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._listener = None
+        self._listener_sock = None
+        self._cached = (0, None)
+        self._latest = 0
+        self._retry_at = 0.0
+
+    @classmethod
+    def load(cls, project_name, path=None, timeout=None, **kwargs):
+        """
+        :param project_name: The name of the project
+        :param path: The path of the socket, see socket_path
+        :param kwargs: Passed on to dodai.parse.ini.ParseIni.load for the
+            fallback
+        """
+        fallback = ParseIni.load(project_name, **kwargs)
+        return cls(path or socket_path(project_name), fallback, timeout)
+
+    @property
+    def connected(self):
+        """True while the config comes from the daemon
+        """
+        return self._listener is not None
+
+    @property
+    def current(self):
+        """The config as a dodai.parse.sections.Sections
+        """
+        generation, sections = self._cached
+        if sections is not None and generation == self._latest and \
+                self._listener is not None:
+            return sections
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        generation, sections = self._cached
+        if self._listener is not None and sections is not None and \
+                generation == self._latest:
+            return sections
+        if self._listener is None and time.monotonic() < self._retry_at:
+            return self._fallback.current
+        try:
+            if self._listener is None:
+                self._listen()
+            if self._sock is None:
+                self._sock = self._connect()
+            send_frame(self._sock, GET)
+            frame = read_frame(self._sock)
+            if frame is not None and frame[0] == NO_CONFIG:
+                # The daemon has no good config yet
+                self._close()
+                frame = None
+            elif frame is None or frame[0] != DATA:
+                raise ConnectionError("The config daemon went away")
+        except OSError:
+            self._disconnect()
+            frame = None
+        if frame is None:
+            self._retry_at = time.monotonic() + self.RETRY
+            return self._fallback.current
+        generation = frame[1]
+        sections = Sections(marshal.loads(frame[2]), sections)
+        self._cached = (generation, sections)
+        return sections
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self._timeout)
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _listen(self):
+        sock = self._connect()
+        try:
+            send_frame(sock, SUBSCRIBE)
+            frame = read_frame(sock)
+            if frame is None or frame[0] != INVALIDATE:
+                raise ConnectionError("The config daemon went away")
+        except OSError:
+            sock.close()
+            raise
+        self._latest = frame[1]
+        sock.settimeout(None)
+        self._listener_sock = sock
+        self._listener = threading.Thread(target=self._listen_run,
+                                          args=(sock,),
+                                          name='dodai-config-client')
+        self._listener.daemon = True
+        self._listener.start()
+
+    def _listen_run(self, sock):
+        try:
+            while True:
+                frame = read_frame(sock)
+                if frame is None:
+                    break
+                if frame[0] == INVALIDATE:
+                    self._latest = frame[1]
+        except OSError:
+            pass
+        finally:
+            sock.close()
+            if self._listener is threading.current_thread():
+                self._listener = None
+
+    def _disconnect(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        self._disconnect()
+        self._listener = None
+        if self._listener_sock is not None:
+            try:
+                self._listener_sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._listener_sock = None
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        sys.stderr.write("usage: python -m dodai.daemon <project_name>\n")
+        return 2
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s')
+    daemon = ConfigDaemon.load(argv[0], log=logging.getLogger(__name__))
+    sys.stdout.write("Serving the '{0}' config on {1}\n".format(argv[0],
+                                                              daemon.path))
+    sys.stdout.flush()
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,12 +15,11 @@
 # You should have received a copy of the GNU General Public License
 # along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
 
-from dodai.validate.base import SectionExists
+from dodai.validate.field.base import SectionExists
+from dodai.validate.field.dialect import IsValidDialect
 
 
 from dodai.model.parse import ValidateFieldExistsAndIsPopulated
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 class DodaiSqlalchemyConnection(object):
     """A dodai connection object that should be used in applications for
@@ -35,8 +34,8 @@ class DodaiSqlalchemyConnection(object):
         if schema:
             self.schema = schema
         self.__url = url
-        self.__create_engine = kwargs.get('create_engine') or create_engine
-        self.__sessionmaker = kwargs.get('sessionmaker') or sessionmaker
+        self.__create_engine = kwargs.get('create_engine')
+        self.__sessionmaker = kwargs.get('sessionmaker')
         self.__kwargs = kwargs
         self.__engine = None
         self.__connection_cache = {}
@@ -46,12 +45,22 @@ class DodaiSqlalchemyConnection(object):
 
     @property
     def engine(self):
-        """The sqlalchemy engine made from sqlalchemy.create_engine
+        """The sqlalchemy engine made from sqlalchemy.create_engine.
+        sqlalchemy is imported the first time this is read.
         """
         if not self.__engine:
-            self.__engine = self.__create_engine(url, **self.__kwargs)
+            create_engine = self.__create_engine
+            if not create_engine:
+                from sqlalchemy import create_engine
+            self.__engine = create_engine(self.__url, **self.__kwargs)
         return self.__engine
 
+    def _sessionmaker(self):
+        if not self.__sessionmaker:
+            from sqlalchemy.orm import sessionmaker
+            self.__sessionmaker = sessionmaker
+        return self.__sessionmaker
+
     @property
     def connection_cache(self):
         """Dictionary of names with engine.connect()
@@ -95,7 +104,7 @@ class DodaiSqlalchemyConnection(object):
         """A dictionary of sqlalchemy sessions
         """
         if not self.__session_cache:
-            session = self.__sessionmaker(bind=self.engine)
+            session = self._sessionmaker()(bind=self.engine)
             self.__session_cache[self.DEFAULT_KEY] = session()
         return self.__session_cache
 
@@ -124,7 +133,7 @@ class DodaiSqlalchemyConnection(object):
         """
         if name:
             if name not in self.session_cache:
-                session = self.__sessionmaker(bind=self.engine)
+                session = self._sessionmaker()(bind=self.engine)
                 self.session_cache[name] = session()
             self.active_session_key = name
         else:
@@ -420,6 +429,10 @@ class DatabaseSectionConnectionValidator(object):
 class GetAllDatabaseSections(object):
     """Callable object that returns a dictionary of valid database section
     data.
+
+    Every section is validated when the cache is built.  To validate
+    database sections only when they are first used, see
+    dodai.validate.database.ValidateOnFirstUse.
     """
 
     GROUP_NAME = "group"
@@ -639,7 +652,7 @@ class GetDatabase(object):
         database_sections = get_all_database_sections()
         as_sqlalchemy_url = SqlalchemyUrlBuilder(sections,
                                                  find_section_database_trigger)
-        return cls(sections, validate, database_sections)
+        return cls(sections, validate, database_sections, as_sqlalchemy_url)
 
     @property
     def environment(self):
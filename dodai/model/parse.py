@@ -16,24 +16,45 @@
 # along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
 
 from dodai.util import find
+from dodai.parse import backend as parser_backend
+from dodai.parse.sections import Sections, merge, from_dictionary
 import configparser
 import os
 
 class Parse(object):
     """Object used to load and parse config files
+
+    :param backend: When given ('configparser', 'native' or a callable
+        like the ones in dodai.parse.backend) the files are read with it and
+        a read-only dodai.parse.sections.Sections is returned in place of a
+        configparser.ConfigParser
     """
 
-    def __init__(self, project):
+    def __init__(self, project, backend=None):
         self.project = project
+        self._backend = None
+        if backend is not None:
+            self._backend = parser_backend.load(backend)
 
     def __call__(self, config_files=None, dictionary=None):
         config_files = self._config_files(config_files)
+        if self._backend:
+            return self._parse_sections(config_files, dictionary)
         parser = configparser.ConfigParser()
         self._load_config_files(parser, config_files)
         if dictionary:
             parser.read_dict(dictionary)
         return parser
 
+    def _parse_sections(self, config_files, dictionary):
+        data = {}
+        for file_ in config_files:
+            with open(file_.name, 'r', encoding=file_.encoding) as f:
+                merge(data, self._backend(f.read(), file_.name))
+        if dictionary:
+            merge(data, from_dictionary(dictionary))
+        return Sections(data)
+
     def _load_config_files(self, parser, config_files):
         for file_ in config_files:
             f = open(file_.name, 'r', encoding=file_.encoding)
@@ -0,0 +1,180 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Parser backends turn the text of one config file into raw config data
+that looks like data[section_name][key] = raw_value.  A backend is a
+callable of (text, source) where text already has its newlines translated
+to '\\n' (as a file opened in text mode does).
+"""
+
+import configparser
+
+DEFAULT_SECTION = configparser.DEFAULTSECT
+
+
+class _RawConfigParser(configparser.ConfigParser):
+
+    def raw(self):
+        """Returns the raw data of every section, including the DEFAULT
+        section when it has any values
+        """
+        out = {}
+        if self._defaults:
+            out[self.default_section] = dict(self._defaults)
+        for section_name, values in self._sections.items():
+            out[section_name] = dict(values)
+        return out
+
+
+class ConfigParserBackend(object):
+    """Backend that reads the text with configparser.ConfigParser
+    """
+
+    NAME = 'configparser'
+
+    def __call__(self, text, source='<string>'):
+        parser = _RawConfigParser(interpolation=None)
+        parser.read_string(text, source)
+        return parser.raw()
+
+
+class NativeBackend(object):
+    """Single pass backend that gives the same result as the default
+    configparser.ConfigParser for the ini files dodai reads:
+
+    * [section] headers and a DEFAULT section that may appear more than once
+    * key = value and key: value, split on the first delimiter
+    * full line comments starting with '#' or ';'
+    * continuation lines indented deeper than their key, with empty lines
+      kept inside the value
+    * keys lowercased and, like configparser's strict mode, duplicate
+      sections or keys within one file raise an error
+
+    Errors are the configparser exceptions so callers can't tell the two
+    backends apart.
+    """
+
+    NAME = 'native'
+
+    COMMENT_PREFIXES = ('#', ';')
+
+    def __call__(self, text, source='<string>'):
+        sections = {}
+        defaults = {}
+        cursect = None
+        sectname = None
+        optname = None
+        indent_level = 0
+        blanks = 0
+        error = None
+        comments = self.COMMENT_PREFIXES
+        lines = text.split('\n')
+
+        for lineno, line in enumerate(lines, 1):
+            value = line.strip()
+            if not value:
+                if optname:
+                    blanks += 1
+                continue
+            if value.startswith(comments):
+                continue
+
+            cur_indent_level = len(line) - len(line.lstrip())
+            if optname and cur_indent_level > indent_level:
+                cursect[optname] = "{0}{1}{2}".format(cursect[optname],
+                                                      '\n' * (blanks + 1),
+                                                      value)
+                blanks = 0
+                continue
+
+            indent_level = cur_indent_level
+            blanks = 0
+            if value[0] == '[':
+                end = value.rfind(']')
+                if end > 1:
+                    sectname = value[1:end]
+                    if sectname == DEFAULT_SECTION:
+                        cursect = defaults
+                    elif sectname in sections:
+                        raise configparser.DuplicateSectionError(
+                                                sectname, source, lineno)
+                    else:
+                        cursect = sections[sectname] = {}
+                    optname = None
+                    continue
+
+            if cursect is None:
+                raise configparser.MissingSectionHeaderError(source, lineno,
+                                            self._line(lines, lineno, line))
+
+            equals = value.find('=')
+            colon = value.find(':')
+            if equals < 0 or -1 < colon < equals:
+                equals = colon
+            if equals < 0:
+                error = self._error(error, source, lineno,
+                                    self._line(lines, lineno, line))
+                continue
+            if not equals:
+                error = self._error(error, source, lineno,
+                                    self._line(lines, lineno, line))
+            optname = value[:equals].rstrip().lower()
+            if optname in cursect:
+                raise configparser.DuplicateOptionError(sectname, optname,
+                                                        source, lineno)
+            cursect[optname] = value[equals + 1:].lstrip()
+
+        if error:
+            raise error
+        if defaults:
+            sections[DEFAULT_SECTION] = defaults
+        return sections
+
+    def _line(self, lines, lineno, line):
+        """Returns the line as configparser reports it in errors
+        """
+        if lineno < len(lines):
+            return line + '\n'
+        return line
+
+    def _error(self, error, source, lineno, line):
+        if not error:
+            error = configparser.ParsingError(source)
+        error.append(lineno, repr(line))
+        return error
+
+
+BACKENDS = {
+    ConfigParserBackend.NAME: ConfigParserBackend,
+    NativeBackend.NAME: NativeBackend,
+}
+
+
+def load(backend=None):
+    """Returns a backend from its name.  Instances are passed through and
+    None gives the configparser backend.
+    """
+    if backend is None:
+        return ConfigParserBackend()
+    if isinstance(backend, str):
+        try:
+            return BACKENDS[backend]()
+        except KeyError:
+            raise ValueError("Unknown parser backend '{0}'.  Please choose "
+                             "from the following: {1}".format(
+                             backend, repr(tuple(sorted(BACKENDS)))))
+    return backend
@@ -0,0 +1,132 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+"""Compiled config bundles.  At deploy time the config of a project is
+discovered, parsed, resolved and validated once and written to a single
+versioned and checksummed file (see dodai.compile).  At runtime ParseIni
+reads that one file instead of probing, parsing and validating.  Its
+Sections know the compiled environment and which database sections were
+validated, so dodai.validate.database does not check them again.
+
+To compile a bundle::
+
+    python -m dodai compile myproject -o /srv/myproject/config.bundle
+
+And to use it::
+
+    parse_ini = ParseIni.load('myproject', bundle='config.bundle')
+    sections = parse_ini.sections()
+
+or set $DODAI_BUNDLE to the path of the bundle.
+"""
+
+import struct
+import marshal
+import hashlib
+from dodai.util import cache
+from dodai.parse.sections import Sections
+from dodai.process.url import DatabaseUrl
+
+MAGIC = b'DODAIBDL'
+VERSION = 3
+_HEADER = struct.Struct('<8sI32s')
+
+
+class Bundle(object):
+    """The content of a compiled config bundle
+    """
+
+    def __init__(self, project_name, environment, data, databases, files,
+                 created, validated=False):
+        """
+        :param project_name: The name of the project
+        :param environment: The environment found by AcquireEnvironment
+        :param data: The raw config data
+        :param databases: The names of the database sections
+        :param files: The config files the bundle was compiled from
+        :param created: The time.time() the bundle was compiled at
+        :param validated: True when the database sections were validated
+            when the bundle was compiled
+        """
+        self.project_name = project_name
+        self.environment = environment
+        self.data = data
+        self.databases = databases
+        self.files = files
+        self.created = created
+        self.validated = validated
+        self._sections = None
+
+    @classmethod
+    def load(cls, path):
+        """Reads a bundle.  Raises ValueError when the file is not a bundle
+        of this version or does not match its checksum.
+        """
+        with open(path, 'rb') as f:
+            content = f.read()
+        return cls.loads(content, path)
+
+    @classmethod
+    def loads(cls, content, path='<bundle>'):
+        if len(content) < _HEADER.size:
+            raise ValueError("The config bundle '{0}' is truncated".format(
+                             path))
+        magic, version, checksum = _HEADER.unpack_from(content)
+        if magic != MAGIC:
+            raise ValueError("The file '{0}' is not a config bundle".format(
+                             path))
+        if version != VERSION:
+            raise ValueError("The config bundle '{0}' is version {1}, "
+                             "expected {2}".format(path, version, VERSION))
+        payload = memoryview(content)[_HEADER.size:]
+        if hashlib.sha256(payload).digest() != checksum:
+            raise ValueError("The config bundle '{0}' does not match its "
+                             "checksum".format(path))
+        return cls(**marshal.loads(payload))
+
+    def dumps(self):
+        payload = marshal.dumps({
+            'project_name': self.project_name,
+            'environment': self.environment,
+            'data': self.data,
+            'databases': self.databases,
+            'files': self.files,
+            'created': self.created,
+            'validated': self.validated,
+        })
+        checksum = hashlib.sha256(payload).digest()
+        return _HEADER.pack(MAGIC, VERSION, checksum) + payload
+
+    def write(self, path):
+        if not cache.write_atomic(path, self.dumps()):
+            raise OSError("Unable to write the config bundle: {0}".format(
+                          path))
+
+    def sections(self, previous=None):
+        """Returns the config as a dodai.parse.sections.Sections
+        """
+        return Sections(self.data, previous)
+
+    def url(self, section_name):
+        """Returns the sqlalchemy URL of a database section.  It is built
+        from the data when asked for, so the credentials are not written
+        to the bundle a second time.
+        """
+        if section_name not in self.databases:
+            raise KeyError(section_name)
+        if self._sections is None:
+            self._sections = self.sections()
+        return DatabaseUrl(self._sections)(section_name)
@@ -0,0 +1,92 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Builds raw config data from environment variables, for processes (eg..
+containers) that get all of their config that way.  A variable named::
+
+    DODAI__DB_MAIN__HOST=db.example.com
+
+is the 'host' key of the 'db.main' section.  The part between the two
+separators is the section name, lowercased, with '_' standing for '.' and
+'___' for a literal '_', so DODAI__DB_MY___APP__HOST is the 'host' key of
+'db.my_app'.  The key is lowercased like configparser does.
+DODAI__DEFAULT__<KEY> sets a key of the DEFAULT section.
+
+Section names with capital letters can not be set this way.
+"""
+
+import re
+from dodai.parse.sections import DEFAULT_SECTION
+
+PREFIX = 'DODAI'
+SEPARATOR = '__'
+
+_UNDERSCORES = re.compile('_+')
+
+# What a run of underscores in the section part of a name stands for
+_SECTION_RUNS = {1: '.', 3: '_'}
+
+
+def from_environ(environ, prefix=PREFIX):
+    """Returns the raw config data, data[section_name][key] = raw_value, of
+    the variables in environ that start with the prefix.  Variables that
+    do not have both a section and a key are skipped.
+
+    :param environ: A mapping like os.environ
+    :param prefix: The prefix of the variables, without the separator
+    """
+    start = prefix + SEPARATOR
+    default = DEFAULT_SECTION.lower()
+    out = {}
+    for name, value in environ.items():
+        if not name.startswith(start):
+            continue
+        split = _split(name[len(start):])
+        if split is None:
+            continue
+        section_name, key = split
+        section_name = section_name.lower()
+        if section_name == default:
+            section_name = DEFAULT_SECTION
+        values = out.get(section_name)
+        if values is None:
+            values = out[section_name] = {}
+        values[key.lower()] = value
+    return out
+
+
+def _split(name):
+    """Returns the (section_name, key) of a variable name without its
+    prefix, or None when it has no section or key or an underscore run of
+    another length
+    """
+    parts = []
+    position = 0
+    for match in _UNDERSCORES.finditer(name):
+        parts.append(name[position:match.start()])
+        position = match.end()
+        run = len(match.group())
+        if run == len(SEPARATOR):
+            section_name = ''.join(parts)
+            key = name[position:]
+            if not section_name or not key:
+                return None
+            return section_name, key
+        if run not in _SECTION_RUNS:
+            return None
+        parts.append(_SECTION_RUNS[run])
+    return None
@@ -16,17 +16,144 @@
 # along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
 
 from dodai.util import find
+from dodai.util.watch import ConfigWatcher
+from dodai.parse.sections import Sections
+from dodai.parse.sections import merge
+from dodai.parse.sections import from_dictionary
+from dodai.parse.sections import DEFAULT_SECTION
+from dodai.parse.lazy import SectionIndex, LazyData, LazySections
+from dodai.parse.snapshot import ParseSnapshot
+from dodai.parse.publish import Published
+from dodai.parse.bundle import Bundle
+from dodai.parse import environ as parse_environ
+from dodai.acquire.environment import AcquireEnvironment
+from dodai.parse import layer
+from dodai.parse import backend as parser_backend
+from concurrent.futures import ThreadPoolExecutor
 import configparser
+import io
 import os
 
 class ParseIni(object):
     """Callable object used to load and parse config ini files
     """
-    def __init__(self, project_name):
+
+    # Holds the path of a compiled bundle used by load
+    BUNDLE_ENVIRONMENT_VARIABLE = 'DODAI_BUNDLE'
+
+    # Holds the environment whose overlay files are read
+    ENVIRONMENT_VARIABLE = 'DODAI_ENVIRONMENT'
+
+    # When set to true load builds the config from environment variables
+    ENVIRON_VARIABLE = 'DODAI_FROM_ENVIRON'
+    ENVIRON_TRUE_VALUES = ('1', 'yes', 'true', 'on')
+
+    def __init__(self, project_name, snapshot=None, backend=None,
+                 lazy=False, prefixes=None, workers=None, opener=None,
+                 bundle=None, overlays=False, environment=None,
+                 environ=None, environ_prefix=None):
         """
         :param project_name: The name of the project
+        :param snapshot: An instance of dodai.parse.snapshot.ParseSnapshot
+            used by the sections method
+        :param backend: The parser backend used by the sections method.
+            Either 'configparser' (the default), 'native' or a callable like
+            the ones in dodai.parse.backend
+        :param lazy: If set to True the sections method only scans the
+            config files for their section headers and parses a section the
+            first time it is read.  The snapshot is not used in this mode.
+        :param prefixes: A section name prefix or a tuple of them.  When
+            given the sections method skips every other section.
+        :param workers: When more than one the config files are read and
+            parsed at the same time on a pool of this many threads.  They
+            are still merged in precedence order so the result is the same.
+        :param opener: Used in place of the builtin open to read the config
+            files
+        :param bundle: A compiled dodai.parse.bundle.Bundle.  When given the
+            sections method returns its config without looking for, reading
+            or parsing any config file.
+        :param overlays: If set to True the sections method also reads the
+            overlay files of the active environment (eg.. config.prod.ini
+            next to config.ini), each one right after the file it overlays.
+            The overlay files of other environments are not read.
+        :param environment: The active environment.  Defaults to
+            $DODAI_ENVIRONMENT and then to the one that
+            dodai.acquire.environment.AcquireEnvironment finds in the base
+            config files.
+        :param environ: If set to True, or to a mapping used in place of
+            os.environ, the sections method builds the config from
+            environment variables such as DODAI__DB_MAIN__HOST (see
+            dodai.parse.environ) without looking for or reading any config
+            file.
+        :param environ_prefix: The prefix of those variables, defaults to
+            'DODAI'
         """
         self.project_name = project_name
+        if environ is True:
+            environ = os.environ
+        self.environ = environ or None
+        self.environ_prefix = environ_prefix or parse_environ.PREFIX
+        self.overlays = overlays
+        self._environment = environment
+        # Key of the base layers -> the environment found in them
+        self._environments = {}
+        self.bundle = bundle
+        self._workers = workers
+        self._opener = opener or open
+        self._backend = parser_backend.load(backend)
+        self._lazy = lazy
+        if isinstance(prefixes, str):
+            prefixes = (prefixes,)
+        elif prefixes is not None:
+            prefixes = tuple(prefixes)
+        self._prefixes = prefixes
+        self.loaded_files = []
+        self.parsed_files = []
+        self._snapshot = snapshot
+        self._layers = {}
+        self._merged = None
+        self._stored = ()
+        self._requested = (None, None)
+        self._last = None
+        self.published = Published()
+
+    @classmethod
+    def load(cls, project_name, use_snapshot=False, backend=None,
+             lazy=False, prefixes=None, workers=None, opener=None,
+             bundle=None, overlays=False, environment=None, environ=None,
+             environ_prefix=None):
+        """
+        :param project_name: The name of the project
+        :param use_snapshot: If set to True the parsed data is kept in a
+            snapshot in the user's cache directory so later processes can
+            skip parsing while the config files are unchanged
+        :param backend: The parser backend, see dodai.parse.backend
+        :param lazy: If set to True sections are parsed on first read
+        :param prefixes: Only keep the sections starting with these
+        :param workers: The number of threads that read the config files
+        :param opener: Used in place of the builtin open
+        :param bundle: The path of a bundle compiled with
+            'python -m dodai compile'.  Defaults to $DODAI_BUNDLE, while
+            False never reads one.
+        :param overlays: If set to True the overlay files of the active
+            environment are read too
+        :param environment: The active environment
+        :param environ: If set to True the config is built from environment
+            variables only.  Defaults to $DODAI_FROM_ENVIRON.
+        :param environ_prefix: The prefix of those variables
+        """
+        snapshot = None
+        if use_snapshot and not lazy:
+            snapshot = ParseSnapshot.load(project_name)
+        if bundle is None:
+            bundle = os.environ.get(cls.BUNDLE_ENVIRONMENT_VARIABLE)
+        bundle = Bundle.load(bundle) if bundle else None
+        if environ is None:
+            environ = os.environ.get(cls.ENVIRON_VARIABLE, '').lower() \
+                      in cls.ENVIRON_TRUE_VALUES
+        return cls(project_name, snapshot, backend, lazy, prefixes, workers,
+                   opener, bundle, overlays, environment, environ,
+                   environ_prefix)
 
     def __call__(self, config_files=None, dictionary=None):
         """Grabs and returns a dictionary-like object of the data that was
@@ -46,15 +173,299 @@ class ParseIni(object):
         self._load_config_files(parser, config_files)
         if dictionary:
             parser.read_dict(dictionary)
+        self.loaded_files = config_files
         return parser
 
+    def sections(self, config_files=None, dictionary=None):
+        """Grabs and returns a read-only dodai.parse.sections.Sections of
+        the data that was parsed from all of the config files.  This reads
+        like the ConfigParser returned when calling this object.
+
+        Every config file is kept as its own layer, so calling this again
+        (eg.. to reload) only re-parses the files whose size, mtime or
+        content changed and then merges the layers in precedence order.
+        The names of the re-parsed files are kept in parsed_files.  When
+        this object has a snapshot the layers are also kept on disk for
+        the next process.
+
+        Interpolated values that were resolved by the Sections returned
+        last are reused when the raw values they depend on are unchanged.
+
+        When this object is lazy a dodai.parse.lazy.LazySections is
+        returned instead, which parses each section on its first read.
+
+        When this object reads overlays the base config files are read
+        first to find the active environment, then only that environment's
+        overlay files are read.
+
+        :param config_files: A list of complete file paths that will added
+            to the list of config files that exist on the system.
+
+        :param dictionary: A dictionary of default values added to the
+            output.  This input dictionary must look like:
+            data[section_name][key] = val
+        """
+        self._requested = (config_files, dictionary)
+        if self.environ is not None:
+            return self._environ_sections(dictionary)
+        if self.bundle is not None:
+            return self._bundle_sections(dictionary)
+        files = self._config_files(config_files)
+        self._read_snapshot()
+        results = self._map(self._read, files)
+        if self.overlays:
+            files, results = self._add_overlays(config_files, files, results)
+        return self._sections(files, dictionary, results)
+
+    def _add_overlays(self, config_files, files, results):
+        """Returns the config files along with the overlay files of the
+        active environment, and what _read returned for each of them.  Only
+        the overlay files are read here.
+
+        :param files: The base config files
+        :param results: What _read returned for the base config files
+        """
+        environment = self.environment(files, results)
+        overlaid = self._config_files(config_files, environment)
+        read = dict(zip(files, results))
+        missing = [file_ for file_ in overlaid if file_ not in read]
+        read.update(zip(missing, self._map(self._read, missing)))
+        return overlaid, [read[file_] for file_ in overlaid]
+
+    def environment(self, files=None, results=None):
+        """Returns the active environment.  Unless it was given or is set
+        in $DODAI_ENVIRONMENT it is the one compiled into the bundle, or is
+        found in the base config files once for as long as they are
+        unchanged.
+
+        :param files: The base config files, found when not given
+        :param results: What _read returned for the base config files
+        """
+        environment = self._environment or \
+                      os.environ.get(self.ENVIRONMENT_VARIABLE)
+        if environment:
+            return environment
+        if self.bundle is not None:
+            return self.bundle.environment
+        if files is None:
+            files = self._config_files(self._requested[0])
+        if results is None:
+            results = self._map(self._read, files)
+        if self._lazy:
+            return AcquireEnvironment.load(
+                        LazySections(LazyData(results)))()
+        key = tuple((current.stamp[0], current.stamp[-1])
+                    for current, parsed in results)
+        environment = self._environments.get(key)
+        if environment is None:
+            data = {}
+            for current, parsed in results:
+                merge(data, current.data)
+            environment = AcquireEnvironment.load(Sections(data))()
+            self._environments = {key: environment}
+        return environment
+
+    def _bundle_sections(self, dictionary):
+        """Returns the Sections of the bundle.  They keep the compiled
+        environment and the names of the validated database sections, less
+        what the dictionary changes.
+        """
+        sections = self._data_sections(self.bundle.data, dictionary)
+        dictionary = dictionary or {}
+        if DEFAULT_SECTION in dictionary:
+            return sections
+        if not dictionary:
+            sections._environment = self.bundle.environment
+        if self.bundle.validated:
+            sections.validated = frozenset(self.bundle.databases) \
+                                 .difference(dictionary)
+        return sections
+
+    def _environ_sections(self, dictionary):
+        data = parse_environ.from_environ(self.environ, self.environ_prefix)
+        if self._prefixes:
+            data = self._filter(data)
+        return self._data_sections(data, dictionary)
+
+    def _data_sections(self, data, dictionary):
+        """Returns the Sections of raw data that did not come from config
+        files
+        """
+        if dictionary:
+            data = merge(merge({}, data), from_dictionary(dictionary))
+        self.loaded_files = []
+        self.parsed_files = []
+        self._last = Sections(data, self._last)
+        return self._last
+
+    def _read_snapshot(self):
+        """Loads the layers of the snapshot the first time they are needed
+        """
+        if self._snapshot and not self._lazy and self._merged is None:
+            self._layers, self._merged = self._snapshot.read()
+            self._stored = tuple(current.stamp for current
+                                 in self._layers.values())
+
+    def _read(self, file_):
+        """Reads one config file for the sections method.  Returns its
+        SectionIndex when lazy, otherwise (layer, parsed)
+        """
+        if self._lazy:
+            return SectionIndex.load(file_, self._backend, self._prefixes,
+                                     self._opener)
+        return self._layer(file_)
+
+    def _sections(self, config_files, dictionary, results):
+        """Builds the Sections from what _read returned for each of the
+        config files
+        """
+        if self._lazy:
+            sections = self._lazy_sections(config_files, dictionary, results)
+        else:
+            data = self._load_layers(config_files, results)
+            if dictionary:
+                data = merge(merge({}, data), from_dictionary(dictionary))
+            if self._prefixes:
+                data = self._filter(data)
+            sections = Sections(data, self._last)
+        self.loaded_files = config_files
+        self._last = sections
+        return sections
+
+    def reload(self):
+        """Re-discovers the config files and returns a new Sections using the
+        config_files and dictionary given to the last call of sections.
+        Only the files that changed since then are re-parsed.
+        """
+        return self.sections(*self._requested)
+
+    @property
+    def current(self):
+        """The last published Sections.  Reading this takes no lock, so it
+        is safe to use from request threads while another thread calls
+        publish.  The first read parses and publishes the config.
+        """
+        current = self.published.current
+        if current is None:
+            current = self.publish()
+        return current
+
+    def publish(self, config_files=None, dictionary=None):
+        """Reloads the config and atomically swaps it in as current.  Only
+        one publish runs at a time.  When config_files and dictionary are
+        not given those of the last call to sections are used again.
+        """
+        if config_files is None and dictionary is None:
+            return self.published.update(self.reload)
+        return self.published.update(
+                            lambda: self.sections(config_files, dictionary))
+
+    def watch(self, callback, debounce=None, poll=False, log=None):
+        """Starts and returns a dodai.util.watch.ConfigWatcher that calls
+        callback(event) when the config directories or any of the loaded
+        files change.  Call stop() on the returned watcher when done.
+
+        :param callback: Called with a dodai.util.watch.ChangeEvent
+        :param debounce: Seconds to wait for changes to settle
+        :param poll: If set to True the polling backend is used
+        :param log: An instance of 'logger'
+        """
+        watcher = ConfigWatcher.load(self.project_name, callback,
+                                     self.loaded_files, debounce=debounce,
+                                     poll=poll, log=log)
+        return watcher.start()
+
     def _load_config_files(self, parser, config_files):
-        for file_ in config_files:
-            with open(file_.name, 'r', encoding=file_.encoding) as f:
-                parser.read_file(f, file_.name)
+        if not self._parallel(config_files):
+            for file_ in config_files:
+                with self._opener(file_.name, 'r',
+                                  encoding=file_.encoding) as f:
+                    parser.read_file(f, file_.name)
+            return
+        for file_, text in zip(config_files,
+                               self._map(self._read_text, config_files)):
+            parser.read_string(text, file_.name)
+
+    def _read_text(self, file_):
+        with self._opener(file_.name, 'r', encoding=file_.encoding) as f:
+            return f.read()
 
-    def _config_files(self, config_files):
-        if config_files:
-            return find.config_files(self.project_name, config_files)
+    def _parallel(self, items):
+        return self._workers and self._workers > 1 and len(items) > 1
+
+    def _map(self, func, items):
+        """Returns [func(item) for item in items], running func on the
+        thread pool when there are enough workers and items
+        """
+        if not self._parallel(items):
+            return [func(item) for item in items]
+        workers = min(self._workers, len(items))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(func, items))
+
+    def _load_layers(self, config_files, results):
+        """Returns the merged raw data of the config files reusing every
+        layer whose file has not changed
+
+        :param results: The (layer, parsed) of every config file
+        """
+        layers = {}
+        self.parsed_files = []
+        for file_, (current, parsed) in zip(config_files, results):
+            if parsed:
+                self.parsed_files.append(file_.name)
+            layers[file_.name] = current
+        self._layers = layers
+
+        stamps = tuple(current.stamp for current in layers.values())
+        key = tuple((stamp[0], stamp[1], stamp[-1]) for stamp in stamps)
+        if self._merged and self._merged[0] == key:
+            data = self._merged[1]
         else:
-            return find.config_files(self.project_name)
+            data = {}
+            for current in layers.values():
+                merge(data, current.data)
+            self._merged = (key, data)
+
+        if self._snapshot and stamps != self._stored:
+            self._snapshot.write(layers.values(), self._merged)
+            self._stored = stamps
+        return data
+
+    def _layer(self, file_):
+        """Returns (layer, parsed) of the config file where the layer is
+        the last one when the file has not changed
+        """
+        current = self._layers.get(file_.name)
+        if current:
+            stamp = layer.check(file_, current.stamp, self._opener)
+            if stamp:
+                return current._replace(stamp=stamp), False
+        return layer.read_layer(file_, self._parse, self._opener), True
+
+    def _lazy_sections(self, config_files, dictionary, indexes):
+        self.parsed_files = [file_.name for file_ in config_files]
+        overlay = None
+        if dictionary:
+            overlay = from_dictionary(dictionary)
+            if self._prefixes:
+                overlay = self._filter(overlay)
+        return LazySections(LazyData(indexes, overlay), self._last)
+
+    def _filter(self, data):
+        return dict((section_name, values) for section_name, values
+                    in data.items() if section_name == DEFAULT_SECTION or
+                    section_name.startswith(self._prefixes))
+
+    def _parse(self, file_, content):
+        """Returns the raw data of one config file as
+        data[section_name][key] = raw_value
+        """
+        with io.TextIOWrapper(io.BytesIO(content),
+                              encoding=file_.encoding) as f:
+            text = f.read()
+        return self._backend(text, file_.name)
+
+    def _config_files(self, config_files, environment=None):
+        return find.config_files(self.project_name, config_files or None,
+                                 environment=environment)
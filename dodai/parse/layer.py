@@ -0,0 +1,97 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+import hashlib
+from collections import namedtuple
+
+# A file changed this recently may change again within the same timestamp
+# tick so its stat is not trusted and the digest is always checked
+RACY_SECONDS = 2
+
+# The parsed data of one config file.  stamp is a plain tuple of
+# (path, encoding, size, mtime_ns, inode, ctime_ns, digest) and data looks
+# like data[section_name][key] = raw_value
+Layer = namedtuple('Layer', ('stamp', 'data'))
+
+
+def file_digest(content):
+    """Returns the digest used to identify the content of a config file
+    """
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+def stamp(file_, stat, content):
+    """Returns the stamp of a config file.
+
+    :param file_: The (filename, encoding) of the config file
+    :param stat: The os.stat_result taken before content was read
+    :param content: The bytes of the config file
+    """
+    mtime_ns = stat.st_mtime_ns
+    # Writing or replacing a file always moves its ctime, even when the
+    # mtime is copied over (eg.. cp -p, rsync -t or tar)
+    if time.time_ns() - max(mtime_ns, stat.st_ctime_ns) < RACY_SECONDS * 1e9:
+        mtime_ns = None
+    return (file_.name, file_.encoding, stat.st_size, mtime_ns, stat.st_ino,
+            stat.st_ctime_ns, file_digest(content))
+
+
+def read_layer(file_, parse, opener=open):
+    """Reads and parses a config file and returns its Layer
+
+    :param file_: The (filename, encoding) of the config file
+    :param parse: Callable that takes (file_, content) and returns the raw
+        data of the file
+    :param opener: Used in place of the builtin open
+    """
+    with opener(file_.name, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        content = f.read()
+    return Layer(stamp(file_, stat, content), parse(file_, content))
+
+
+def check(file_, stamp_, opener=open):
+    """Returns the stamp when the config file still matches it, a refreshed
+    stamp when only its stat moved but the content is the same, or None
+    when the file has changed.  The content is only trusted without reading
+    it when the size, mtime, inode and ctime all match.
+
+    :param opener: Used in place of the builtin open
+    """
+    name, encoding, size, mtime_ns, inode, ctime_ns, digest = stamp_
+    if file_.name != name or file_.encoding != encoding:
+        return None
+    try:
+        stat = os.stat(name)
+    except OSError:
+        return None
+    if stat.st_size != size:
+        return None
+    if mtime_ns is not None and stat.st_mtime_ns == mtime_ns and \
+            stat.st_ino == inode and stat.st_ctime_ns == ctime_ns:
+        return stamp_
+    try:
+        with opener(name, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            content = f.read()
+    except OSError:
+        return None
+    if file_digest(content) != digest:
+        return None
+    return stamp(file_, stat, content)
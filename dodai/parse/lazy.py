@@ -0,0 +1,342 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+"""Lazy config data.  A config file is scanned once for its section headers
+and every section is only decoded and parsed the first time it is read.
+"""
+
+import os
+import re
+import mmap
+import codecs
+import threading
+import configparser
+from collections.abc import Mapping
+from dodai.parse.sections import Sections
+from dodai.parse.sections import DEFAULT_SECTION
+
+# Files of at least this many bytes are mapped into memory to be scanned
+# and their sections are then read from the open file when first used
+MMAP_THRESHOLD = 1 << 20
+
+# Encodings where every byte below 0x80 is the ASCII character, so section
+# headers can be found in the raw bytes
+_ASCII_COMPATIBLE = ('ascii', 'utf-8', 'latin-1', 'iso8859', 'cp125')
+
+# Headers start in the first column, anything indented may be part of a
+# multi-line value so files holding such lines are parsed in full.  The
+# patterns start with the newline before the line, which searches much
+# faster than ^ in multi-line mode; the first line is checked on its own.
+_HEADER = re.compile(rb'\[[^\r\n]*')
+_NEXT_HEADER = re.compile(rb'\n(\[[^\r\n]*)')
+_INDENTED_HEADER = re.compile(rb'[ \t\f\v]+\[')
+_NEXT_INDENTED_HEADER = re.compile(rb'\n[ \t\f\v]+\[')
+_LONE_CR = re.compile(rb'\r(?!\n)')
+
+
+def _wanted(section_name, prefixes):
+    return prefixes is None or section_name.startswith(prefixes)
+
+
+def _ascii_compatible(encoding):
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return False
+    return name.startswith(_ASCII_COMPATIBLE) and name != 'utf-8-sig'
+
+
+class FileChangedError(OSError):
+    """A large config file was rewritten in place after it was scanned,
+    so its sections can no longer be read.  The config should be reloaded.
+    """
+
+
+class _OpenFile(object):
+    """The content of a large config file, read a span at a time from
+    the open file so only the sections that are used are ever read.
+
+    The file is checked before and after every read.  A file that was
+    replaced (renamed over) is still read from the open original, but one
+    rewritten in place raises FileChangedError rather than giving other
+    bytes.
+    """
+
+    def __init__(self, f, stat):
+        self._f = f
+        self._stamp = self._stat(stat)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat(stat):
+        # Once a replaced file has no links left nothing can rewrite it,
+        # but the unlink itself moves its ctime
+        ctime_ns = stat.st_ctime_ns if stat.st_nlink else None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns, ctime_ns)
+
+    def __getitem__(self, span):
+        size = span.stop - span.start
+        with self._lock:
+            self._check()
+            self._f.seek(span.start)
+            content = self._f.read(size)
+            self._check()
+        if len(content) != size:
+            self._changed()
+        return content
+
+    def _check(self):
+        current = self._stat(os.fstat(self._f.fileno()))
+        if current[:3] != self._stamp[:3] or \
+                current[3] not in (None, self._stamp[3]):
+            self._changed()
+
+    def _changed(self):
+        raise FileChangedError("The config file '{0}' was changed while "
+                               "it was in use.  Please reload the "
+                               "config".format(self._f.name))
+
+    def close(self):
+        self._f.close()
+
+    def __del__(self):
+        self.close()
+
+
+class SectionIndex(object):
+    """The sections of one config file.  Holds the byte span of every
+    section along with the file content (or, for large files, the open
+    file) and parses a section the first time it is asked for.
+    """
+
+    def __init__(self, file_, parse, buffer, spans, defaults, values=None):
+        """
+        :param file_: The (filename, encoding) of the config file
+        :param parse: Callable of (text, source) that returns raw data,
+            see dodai.parse.backend
+        :param buffer: The bytes of the file, or anything that slices
+            like them
+        :param spans: Ordered dictionary of section name to (start, end)
+        :param defaults: The raw values of the DEFAULT section
+        :param values: Dictionary of section name to already parsed values
+        """
+        self.file = file_
+        self._parse = parse
+        self._buffer = buffer
+        self._spans = spans
+        self.defaults = defaults
+        self._values = values or {}
+
+    @classmethod
+    def load(cls, file_, parse, prefixes=None, opener=open):
+        """Scans the config file and returns its SectionIndex
+
+        :param prefixes: A tuple of section name prefixes.  When given only
+            the sections that start with one of them are kept.
+        :param opener: Used in place of the builtin open
+        """
+        f = opener(file_.name, 'rb')
+        try:
+            stat = os.fstat(f.fileno())
+            if stat.st_size < MMAP_THRESHOLD:
+                with f:
+                    return cls._load(file_, parse, f.read(), prefixes)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                index = cls._load(file_, parse, buffer, prefixes)
+        except BaseException:
+            f.close()
+            raise
+        if index._buffer is buffer:
+            index._buffer = _OpenFile(f, stat)
+        else:
+            f.close()
+        return index
+
+    @classmethod
+    def _load(cls, file_, parse, buffer, prefixes):
+        if not _ascii_compatible(file_.encoding) or \
+                _INDENTED_HEADER.match(buffer) or \
+                _NEXT_INDENTED_HEADER.search(buffer) or \
+                (buffer.find(b'\r') >= 0 and _LONE_CR.search(buffer)):
+            return cls._load_parsed(file_, parse, buffer, prefixes)
+        return cls._load_scanned(file_, parse, buffer, prefixes)
+
+    @staticmethod
+    def _headers(buffer):
+        """Yields (offset, line) of every line starting with '['
+        """
+        match = _HEADER.match(buffer)
+        if match:
+            yield 0, match.group()
+        for match in _NEXT_HEADER.finditer(buffer):
+            yield match.start(1), match.group(1)
+
+    @classmethod
+    def _load_parsed(cls, file_, parse, buffer, prefixes):
+        data = parse(cls._decode(file_, buffer[:]), file_.name)
+        defaults = data.pop(DEFAULT_SECTION, {})
+        values = dict((name, section) for name, section in data.items()
+                      if _wanted(name, prefixes))
+        return cls(file_, parse, b'', dict.fromkeys(values), defaults,
+                   values)
+
+    @classmethod
+    def _load_scanned(cls, file_, parse, buffer, prefixes):
+        spans = {}
+        seen = set()
+        defaults = []
+        start = name = None
+        for offset, line in cls._headers(buffer):
+            header = line.decode(file_.encoding).strip()
+            end = header.rfind(']')
+            if end <= 1:
+                continue
+            if name is None:
+                # Parsed with DEFAULT so text before the first header
+                # raises the same error as configparser
+                defaults.append((0, offset))
+            else:
+                cls._add(spans, defaults, name, (start, offset), prefixes)
+            name = header[1:end]
+            start = offset
+            if name in seen and name != DEFAULT_SECTION:
+                lineno = buffer[:start].count(b'\n') + 1
+                raise configparser.DuplicateSectionError(name, file_.name,
+                                                         lineno)
+            seen.add(name)
+        if name is None:
+            defaults.append((0, len(buffer)))
+        else:
+            cls._add(spans, defaults, name, (start, len(buffer)), prefixes)
+
+        text = ''.join(cls._decode(file_, buffer[start:end])
+                       for start, end in defaults)
+        defaults = parse(text, file_.name).get(DEFAULT_SECTION, {})
+        return cls(file_, parse, buffer, spans, defaults)
+
+    @staticmethod
+    def _add(spans, defaults, name, span, prefixes):
+        if name == DEFAULT_SECTION:
+            defaults.append(span)
+        elif _wanted(name, prefixes):
+            spans[name] = span
+
+    @staticmethod
+    def _decode(file_, content):
+        return content.decode(file_.encoding).replace('\r\n', '\n')
+
+    @property
+    def names(self):
+        """The names of the kept sections, in file order
+        """
+        return self._spans.keys()
+
+    def __contains__(self, section_name):
+        return section_name in self._spans
+
+    def section(self, section_name):
+        """Returns the raw values of a section, parsing it if needed
+        """
+        values = self._values.get(section_name)
+        if values is None:
+            start, end = self._spans[section_name]
+            text = self._decode(self.file, self._buffer[start:end])
+            values = self._parse(text, self.file.name).get(section_name, {})
+            self._values[section_name] = values
+        return values
+
+    @property
+    def parsed(self):
+        """The names of the sections parsed so far
+        """
+        return list(self._values)
+
+
+class LazyData(Mapping):
+    """Raw config data, data[section_name][key] = raw_value, of several
+    config files (each a SectionIndex) in precedence order.  A section is
+    parsed and merged across the files the first time it is read.
+    """
+
+    def __init__(self, indexes, overlay=None):
+        """
+        :param indexes: A list of SectionIndex, later ones take precedence
+        :param overlay: Raw config data merged on top of the files
+        """
+        self._indexes = indexes
+        self._overlay = overlay or {}
+        self._cache = {}
+        self.defaults = {}
+        names = {}
+        for index in indexes:
+            self.defaults.update(index.defaults)
+            names.update(dict.fromkeys(index.names))
+        self.defaults.update(self._overlay.get(DEFAULT_SECTION, {}))
+        names.update(dict.fromkeys(name for name in self._overlay
+                                   if name != DEFAULT_SECTION))
+        self._names = names
+
+    def __getitem__(self, section_name):
+        values = self._cache.get(section_name)
+        if values is None:
+            if section_name not in self._names:
+                raise KeyError(section_name)
+            values = {}
+            for index in self._indexes:
+                if section_name in index:
+                    values.update(index.section(section_name))
+            values.update(self._overlay.get(section_name, {}))
+            self._cache[section_name] = values
+        return values
+
+    def __contains__(self, section_name):
+        return section_name in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    @property
+    def parsed(self):
+        """The names of the sections parsed so far
+        """
+        return list(self._cache)
+
+
+class LazySections(Sections):
+    """A dodai.parse.sections.Sections whose sections are only parsed when
+    they are first read.  Reading a section from several threads at once is
+    safe; it may be parsed more than once but every reader gets the same
+    values.
+
+    :param data: A LazyData
+    :param previous: The Sections this one replaces
+    """
+
+    def __init__(self, data, previous=None):
+        self._defaults = data.defaults
+        self._data = data
+        self._interpolation = configparser.BasicInterpolation()
+        self._proxies = {}
+        self._init_resolved(previous)
+
+    @property
+    def parsed(self):
+        """The names of the sections parsed so far
+        """
+        return self._data.parsed
@@ -0,0 +1,88 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Projects raw config data onto one environment (eg.. prod).  Values set
+for the environment replace the plain ones, either per key::
+
+    [db.main]
+    host = localhost
+    host.prod = db.example.com
+
+or per section::
+
+    [db.main.prod]
+    host = db.example.com
+
+The projected data has no environment suffixes left, so reading it is a
+plain dictionary lookup.
+"""
+
+
+def project(data, environment, environments=None):
+    """Returns the raw data as seen by the environment.  A key ending with
+    '.<environment>' replaces the key without it, and the values of a
+    '[<name>.<environment>]' section replace those of the '[<name>]'
+    section.  The given dictionaries are not changed.
+
+    :param data: The raw config data, data[section_name][key] = raw_value
+    :param environment: The active environment
+    :param environments: The names of every environment.  The keys and
+        sections of the other ones are left out.  When not given they are
+        kept as they are.
+    """
+    section_suffix = '.{0}'.format(environment)
+    key_suffix = section_suffix.lower()
+    others = tuple('.{0}'.format(name) for name in environments or ()
+                   if name != environment)
+    other_keys = tuple(suffix.lower() for suffix in others)
+
+    out = {}
+    overlays = []
+    for section_name, values in data.items():
+        if len(section_name) > len(section_suffix) and \
+                section_name.endswith(section_suffix):
+            overlays.append((section_name[:-len(section_suffix)], values))
+        elif not others or not section_name.endswith(others):
+            out[section_name] = _collapse(values, key_suffix, other_keys)
+
+    for section_name, values in overlays:
+        values = _collapse(values, key_suffix, other_keys)
+        if section_name in out:
+            merged = dict(out[section_name])
+            merged.update(values)
+            values = merged
+        out[section_name] = values
+    return out
+
+
+def _collapse(values, suffix, others):
+    """Returns the values of one section with the keys of the environment
+    in place of the plain ones.  The same dictionary is returned when none
+    of its keys has an environment suffix.
+    """
+    suffixes = (suffix,) + others
+    if not any(key.endswith(suffixes) for key in values):
+        return values
+    out = {}
+    overrides = {}
+    for key, value in values.items():
+        if len(key) > len(suffix) and key.endswith(suffix):
+            overrides[key[:-len(suffix)]] = value
+        elif not others or not key.endswith(others):
+            out[key] = value
+    out.update(overrides)
+    return out
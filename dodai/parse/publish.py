@@ -0,0 +1,93 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+
+
+class Published(object):
+    """Holds the current read-only config (eg.. a
+    dodai.parse.sections.Sections) so that many threads can read it while
+    another publishes a new one.
+
+    Readers take current without any locking; it is a single reference that
+    is swapped in one assignment, so a reader always gets a complete config.
+    A config that a reader already holds stays valid until it is dropped.
+    Only publishers take a lock, so that reloads run one at a time.
+
+    To use this class::
+
+        published = Published(parse_ini.sections())
+
+        # In request threads
+        sections = published.current
+        host = sections['db.main']['host']
+
+        # In the reloader
+        published.update(parse_ini.reload)
+    """
+
+    def __init__(self, current=None):
+        """
+        :param current: The config that is published first
+        """
+        self._state = (0, current)
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    @property
+    def current(self):
+        """The last published config
+        """
+        return self._state[1]
+
+    @property
+    def generation(self):
+        """Incremented every time a config is published
+        """
+        return self._state[0]
+
+    def state(self):
+        """Returns (generation, config) read together
+        """
+        return self._state
+
+    def publish(self, current):
+        """Publishes the given config and returns its generation
+        """
+        with self._lock:
+            return self._publish(current)
+
+    def update(self, build):
+        """Calls build() while holding the publish lock and publishes what
+        it returns.  Returns the new config.
+        """
+        with self._lock:
+            current = build()
+            self._publish(current)
+            return current
+
+    def subscribe(self, callback):
+        """Calls callback(generation, config) after every publish
+        """
+        self._subscribers.append(callback)
+
+    def _publish(self, current):
+        generation = self._state[0] + 1
+        self._state = (generation, current)
+        for callback in list(self._subscribers):
+            callback(generation, current)
+        return generation
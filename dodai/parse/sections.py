@@ -0,0 +1,381 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import configparser
+from collections.abc import Mapping
+from dodai.parse.typed import TypedView
+from dodai.parse.projection import project
+from dodai.acquire.environment import AcquireEnvironment
+
+DEFAULT_SECTION = configparser.DEFAULTSECT
+
+_UNSET = object()
+
+
+def merge(data, other):
+    """Merges the other raw config data into data the same way
+    configparser does when reading one file after another.  Both look like
+    data[section_name][key] = raw_value.
+    """
+    for section_name, values in other.items():
+        if section_name in data:
+            data[section_name].update(values)
+        else:
+            data[section_name] = dict(values)
+    return data
+
+
+def from_dictionary(dictionary):
+    """Returns raw config data from a dictionary in the same way
+    ConfigParser.read_dict converts section names, keys and values.
+    """
+    out = {}
+    for section_name, values in dictionary.items():
+        section = out.setdefault(str(section_name), {})
+        for key, value in values.items():
+            if value is not None:
+                value = str(value)
+            section[str(key).lower()] = value
+    return out
+
+
+class _Recorder(Mapping):
+    """Reads like a ChainMap of the given mappings and keeps the (key,
+    raw_value) of every lookup, which are the dependencies of an
+    interpolated value
+    """
+
+    def __init__(self, *maps):
+        self._maps = maps
+        self.dependencies = []
+
+    def __getitem__(self, key):
+        for values in self._maps:
+            if key in values:
+                value = values[key]
+                self.dependencies.append((key, value))
+                return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        seen = set()
+        for values in self._maps:
+            for key in values:
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+
+class Section(Mapping):
+    """Read-only view of one config section.  Values of the DEFAULT section
+    show through and %(name)s references are interpolated like
+    configparser.BasicInterpolation.
+    """
+
+    def __init__(self, sections, name, values):
+        self._sections = sections
+        self.name = name
+        self._values = values
+
+    def __getitem__(self, key):
+        key = key.lower()
+        if key in self._values:
+            value = self._values[key]
+        elif key in self._sections._defaults:
+            value = self._sections._defaults[key]
+        else:
+            raise KeyError(key)
+        return self._sections._interpolate(self.name, key, value)
+
+    def __contains__(self, key):
+        if not isinstance(key, str):
+            return False
+        key = key.lower()
+        return key in self._values or key in self._sections._defaults
+
+    def __iter__(self):
+        for key in self._values:
+            yield key
+        for key in self._sections._defaults:
+            if key not in self._values:
+                yield key
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+    def __repr__(self):
+        return '<Section: {0}>'.format(self.name)
+
+    def get(self, option, fallback=None, raw=False):
+        return self._sections.get(self.name, option, raw=raw,
+                                  fallback=fallback)
+
+    def getint(self, option, fallback=None):
+        return self._sections.getint(self.name, option, fallback=fallback)
+
+    def getfloat(self, option, fallback=None):
+        return self._sections.getfloat(self.name, option, fallback=fallback)
+
+    def getboolean(self, option, fallback=None):
+        return self._sections.getboolean(self.name, option,
+                                         fallback=fallback)
+
+
+class Sections(Mapping):
+    """Read-only, dictionary-like object of parsed config data.  This reads
+    like the configparser.ConfigParser returned by dodai.parse.ini.ParseIni
+    but is built straight from plain dictionaries and can not be changed.
+
+    Interpolated values are resolved once and kept along with the raw
+    values they were built from.  A Sections built with the previous one
+    (eg.. on reload) reuses every resolved value whose raw values did not
+    change.
+
+    :param data: The raw config data, data[section_name][key] = raw_value.
+        The DEFAULT section holds the defaults of every other section.  The
+        section dictionaries are used as is and must not be changed
+        afterwards.
+    :param previous: The Sections this one replaces
+    """
+
+    BOOLEAN_STATES = configparser.ConfigParser.BOOLEAN_STATES
+
+    default_section = DEFAULT_SECTION
+
+    def __init__(self, data, previous=None):
+        data = dict(data)
+        self._defaults = data.pop(self.default_section, {})
+        self._data = data
+        self._interpolation = configparser.BasicInterpolation()
+        self._proxies = {}
+        self._init_resolved(previous)
+
+    def _init_resolved(self, previous):
+        # (section_name, key) -> (value, ((key, raw_value), ...))
+        self._resolved = {}
+        self._previous = None
+        # (environment, environments) -> Sections, see for_environment
+        self._views = {}
+        self._previous_views = {}
+        if previous is not None:
+            self._previous = previous._resolved
+            self._previous_views = previous._views
+
+    # The names of the database sections that were validated when this
+    # config was compiled into a dodai.parse.bundle.Bundle
+    validated = frozenset()
+
+    _typed = None
+
+    @property
+    def typed(self):
+        """The dodai.parse.typed.TypedView of this config, which converts
+        every value once (eg.. sections.typed.getint('db', 'port'))
+        """
+        if self._typed is None:
+            self._typed = TypedView(self)
+        return self._typed
+
+    _environment = None
+
+    @property
+    def environment(self):
+        """The active environment (eg.. prod) as found by
+        dodai.acquire.environment.AcquireEnvironment.  It is only searched
+        for once.
+        """
+        if self._environment is None:
+            self._environment = AcquireEnvironment.load(self)()
+        return self._environment
+
+    def for_environment(self, environment=None, environments=None):
+        """Returns a Sections of this config as seen by one environment,
+        see dodai.parse.projection.project.  Keys such as 'host.prod' and
+        sections such as '[db.main.prod]' are collapsed so reading them is
+        a plain lookup.  The view is built once and kept along with this
+        Sections; the one built on reload reuses the interpolated values of
+        the last view.
+
+        :param environment: Defaults to the active environment
+        :param environments: The names of every environment, the keys and
+            sections of the others are left out
+        """
+        environment = environment or self.environment
+        if environments is not None:
+            environments = tuple(environments)
+        key = (environment, environments)
+        view = self._views.get(key)
+        if view is None:
+            data = {self.default_section: self._defaults}
+            data.update(self._data.items())
+            view = Sections(project(data, environment, environments),
+                            self._previous_views.get(key))
+            self._views[key] = view
+        return view
+
+    def optionxform(self, optionstr):
+        return optionstr.lower()
+
+    def _interpolate(self, section_name, key, value):
+        if value is None or '%' not in value:
+            return value
+        resolved = self._resolved.get((section_name, key))
+        if resolved is None and self._previous:
+            resolved = self._previous.get((section_name, key))
+            if resolved is not None:
+                if self._unchanged(section_name, resolved[1]):
+                    self._resolved[(section_name, key)] = resolved
+                else:
+                    resolved = None
+        if resolved is None:
+            resolved = self._resolve(section_name, key, value)
+            self._resolved[(section_name, key)] = resolved
+        return resolved[0]
+
+    def _resolve(self, section_name, key, value):
+        if section_name == self.default_section:
+            variables = _Recorder(self._defaults)
+        else:
+            variables = _Recorder(self._data[section_name], self._defaults)
+        value = self._interpolation.before_get(self, section_name, key,
+                                               value, variables)
+        dependencies = [(key, self._raw(section_name, key))]
+        dependencies.extend(variables.dependencies)
+        return value, tuple(dependencies)
+
+    def _raw(self, section_name, key):
+        if section_name != self.default_section:
+            values = self._data.get(section_name)
+            if values is None:
+                return _UNSET
+            if key in values:
+                return values[key]
+        return self._defaults.get(key, _UNSET)
+
+    def _unchanged(self, section_name, dependencies):
+        for key, value in dependencies:
+            if self._raw(section_name, key) != value:
+                return False
+        return True
+
+    def _values(self, section_name):
+        if section_name == self.default_section:
+            return self._defaults
+        return self._data[section_name]
+
+    def __getitem__(self, section_name):
+        proxy = self._proxies.get(section_name)
+        if proxy is None:
+            if not self.has_section(section_name) and \
+                    section_name != self.default_section:
+                raise KeyError(section_name)
+            proxy = Section(self, section_name, self._values(section_name))
+            self._proxies[section_name] = proxy
+        return proxy
+
+    def __contains__(self, section_name):
+        return section_name == self.default_section or \
+               section_name in self._data
+
+    def __iter__(self):
+        yield self.default_section
+        for section_name in self._data:
+            yield section_name
+
+    def __len__(self):
+        return len(self._data) + 1
+
+    def __repr__(self):
+        return '<Sections: {0}>'.format(', '.join(self._data))
+
+    def defaults(self):
+        return dict(self._defaults)
+
+    def sections(self):
+        return list(self._data)
+
+    def has_section(self, section_name):
+        return section_name in self._data
+
+    def options(self, section_name):
+        if section_name not in self._data:
+            raise configparser.NoSectionError(section_name)
+        return list(self[section_name])
+
+    def has_option(self, section_name, option):
+        if section_name == self.default_section:
+            return option.lower() in self._defaults
+        if section_name not in self._data:
+            return False
+        return option in self[section_name]
+
+    def get(self, section_name, option, raw=False, fallback=_UNSET):
+        """Returns the value of option in the section like
+        ConfigParser.get
+        """
+        option = option.lower()
+        if section_name not in self:
+            if fallback is _UNSET:
+                raise configparser.NoSectionError(section_name)
+            return fallback
+        values = self._values(section_name)
+        if option in values:
+            value = values[option]
+        elif option in self._defaults:
+            value = self._defaults[option]
+        elif fallback is _UNSET:
+            raise configparser.NoOptionError(option, section_name)
+        else:
+            return fallback
+        if raw:
+            return value
+        return self._interpolate(section_name, option, value)
+
+    def _get_conv(self, conv, section_name, option, fallback):
+        try:
+            value = self.get(section_name, option)
+        except (configparser.NoSectionError, configparser.NoOptionError):
+            if fallback is _UNSET:
+                raise
+            return fallback
+        return conv(value)
+
+    def getint(self, section_name, option, fallback=_UNSET):
+        return self._get_conv(int, section_name, option, fallback)
+
+    def getfloat(self, section_name, option, fallback=_UNSET):
+        return self._get_conv(float, section_name, option, fallback)
+
+    def getboolean(self, section_name, option, fallback=_UNSET):
+        return self._get_conv(self._convert_to_boolean, section_name,
+                              option, fallback)
+
+    def _convert_to_boolean(self, value):
+        if value.lower() not in self.BOOLEAN_STATES:
+            raise ValueError('Not a boolean: {0}'.format(value))
+        return self.BOOLEAN_STATES[value.lower()]
+
+    def to_dict(self):
+        """Returns a copy of the raw config data
+        """
+        out = {self.default_section: dict(self._defaults)}
+        for section_name, values in self._data.items():
+            out[section_name] = dict(values)
+        return out
@@ -0,0 +1,328 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+"""Config shared between processes through memory mapped files, eg.. by the
+workers of a pre-fork server.  The master parses the config once and
+publishes it; every worker maps the same pages read-only and only decodes
+the sections it reads.
+
+To use this module::
+
+    # In the master, before forking
+    shared = SharedConfig.load('myproject')
+    parse_ini = ParseIni('myproject')
+    shared.publish(parse_ini.sections())
+    parse_ini.published.subscribe(shared.subscriber)
+
+    # In the workers
+    sections = shared.current
+"""
+
+import os
+import mmap
+import stat
+import errno
+import struct
+import marshal
+import threading
+from collections.abc import Mapping
+from dodai.util import cache
+from dodai.parse.lazy import LazySections
+from dodai.parse.sections import DEFAULT_SECTION
+
+# Shared memory, when the system has it, keeps the files off disk.  Every
+# user gets a private directory in it.
+SHM_DIRECTORY = '/dev/shm'
+
+_NOFOLLOW = getattr(os, 'O_NOFOLLOW', 0)
+
+
+def _private_directory(directory):
+    """Returns the directory, creating it if needed, when it is a real
+    directory owned by this user that no one else can use.  Returns None
+    otherwise.
+    """
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return None
+    try:
+        status = os.lstat(directory)
+    except OSError:
+        return None
+    if not stat.S_ISDIR(status.st_mode) or \
+            status.st_uid != os.getuid() or status.st_mode & 0o077:
+        return None
+    return directory
+
+
+def _open(path, flags=os.O_RDONLY):
+    """Opens a regular file owned by this user, without following a
+    symbolic link, and returns its file descriptor.  Raises OSError for
+    any other file.
+    """
+    fd = os.open(path, flags | _NOFOLLOW)
+    try:
+        status = os.fstat(fd)
+        if not stat.S_ISREG(status.st_mode) or \
+                status.st_uid != os.getuid():
+            raise PermissionError(errno.EPERM, "The shared config file is "
+                                  "not owned by this user", path)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+class SharedData(Mapping):
+    """Raw config data, data[section_name][key] = raw_value, read from a
+    published file.  The file is mapped into memory and a section is only
+    unmarshalled the first time it is read.
+    """
+
+    def __init__(self, buffer, index):
+        """
+        :param buffer: The mapped file
+        :param index: Dictionary of section name to (offset, length)
+        """
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._index = index
+        self._cache = {}
+        self.defaults = self._load(DEFAULT_SECTION) \
+            if DEFAULT_SECTION in index else {}
+        self._names = [name for name in index if name != DEFAULT_SECTION]
+
+    def _load(self, section_name):
+        offset, length = self._index[section_name]
+        return marshal.loads(self._view[offset:offset + length])
+
+    def __getitem__(self, section_name):
+        values = self._cache.get(section_name)
+        if values is None:
+            if section_name == DEFAULT_SECTION or \
+                    section_name not in self._index:
+                raise KeyError(section_name)
+            values = self._cache[section_name] = self._load(section_name)
+        return values
+
+    def __contains__(self, section_name):
+        return section_name != DEFAULT_SECTION and \
+               section_name in self._index
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    @property
+    def parsed(self):
+        """The names of the sections decoded so far
+        """
+        return list(self._cache)
+
+
+class SharedConfig(object):
+    """Publishes config into memory mapped files and attaches to them.
+
+    The control file at path holds the current generation and every
+    generation has its own data file at path.<generation>.  A publish writes
+    the new data file in full and then bumps the generation, so a reader
+    always sees a complete config.  Readers keep the control file mapped and
+    check the generation on every read of current without a system call.
+    Only one process should publish.
+
+    Files that are symbolic links or are not owned by this user are never
+    read, so the publisher and readers must run as the same user.
+    """
+
+    MAGIC = b'DODAISHM'
+    VERSION = 1
+    _CONTROL = struct.Struct('<8sIIQ')
+    _HEADER = struct.Struct('<8sIQQ')
+
+    # Data files kept besides the current one, for readers still moving
+    # over to it
+    KEEP = 1
+
+    def __init__(self, path):
+        """
+        :param path: The full path of the control file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._control = None
+        self._attached = (None, None)
+
+    @classmethod
+    def load(cls, project_name, directory=None):
+        """
+        :param project_name: The name of the project
+        :param directory: Where the files are kept.  Defaults to the
+            user's private dodai-<uid> directory in /dev/shm when it can be
+            used and otherwise the user's dodai cache directory.
+        """
+        name = "{0}.config".format(project_name.strip())
+        if directory is None:
+            if os.path.isdir(SHM_DIRECTORY) and \
+                    os.access(SHM_DIRECTORY, os.W_OK):
+                directory = _private_directory(os.path.join(SHM_DIRECTORY,
+                                            "dodai-{0}".format(os.getuid())))
+            if directory is None:
+                directory = cache.cache_directory(project_name)
+        return cls(os.path.join(directory, name))
+
+    def _data_path(self, generation):
+        return "{0}.{1}".format(self.path, generation)
+
+    def publish(self, sections):
+        """Publishes the config (a Sections or raw config data) and returns
+        its generation
+        """
+        if hasattr(sections, 'to_dict'):
+            sections = sections.to_dict()
+        with self._lock:
+            generation = self._read_generation() + 1
+            if not cache.write_atomic(self._data_path(generation),
+                                      self._dumps(sections)):
+                raise OSError("Unable to write the shared config: "
+                              "{0}".format(self._data_path(generation)))
+            self._write_generation(generation)
+            self._remove_old(generation)
+        return generation
+
+    def subscriber(self, generation, sections):
+        """Publishes every config given to it.  Meant for
+        dodai.parse.publish.Published.subscribe
+        """
+        self.publish(sections)
+
+    def _dumps(self, data):
+        blobs = []
+        index = {}
+        offset = self._HEADER.size
+        for section_name, values in data.items():
+            blob = marshal.dumps(dict(values))
+            index[section_name] = (offset, len(blob))
+            blobs.append(blob)
+            offset += len(blob)
+        index = marshal.dumps(index)
+        header = self._HEADER.pack(self.MAGIC, self.VERSION, offset,
+                                   len(index))
+        return b''.join([header] + blobs + [index])
+
+    def _read_generation(self):
+        try:
+            with os.fdopen(_open(self.path), 'rb') as f:
+                content = f.read(self._CONTROL.size)
+        except OSError:
+            return 0
+        return self._unpack_generation(content)
+
+    def _unpack_generation(self, content):
+        if len(content) < self._CONTROL.size:
+            return 0
+        magic, version, padding, generation = \
+            self._CONTROL.unpack_from(content)
+        if magic != self.MAGIC or version != self.VERSION:
+            return 0
+        return generation
+
+    def _write_generation(self, generation):
+        content = self._CONTROL.pack(self.MAGIC, self.VERSION, 0, generation)
+        try:
+            fd = _open(self.path, os.O_RDWR)
+        except FileNotFoundError:
+            if not cache.write_atomic(self.path, content):
+                raise OSError("Unable to write the shared config: "
+                              "{0}".format(self.path))
+            return
+        try:
+            # In place, so the readers' mappings see the new generation
+            os.pwrite(fd, content, 0)
+        finally:
+            os.close(fd)
+
+    def _remove_old(self, generation):
+        directory, name = os.path.split(self.path)
+        prefix = name + '.'
+        for entry in os.listdir(directory):
+            if not entry.startswith(prefix):
+                continue
+            try:
+                old = int(entry[len(prefix):])
+            except ValueError:
+                continue
+            if old < generation - self.KEEP:
+                try:
+                    os.remove(os.path.join(directory, entry))
+                except OSError:
+                    pass
+
+    @property
+    def generation(self):
+        """The generation published last, or 0 when there is none
+        """
+        control = self._control
+        if control is None:
+            control = self._map_control()
+            if control is None:
+                return 0
+        return self._unpack_generation(control)
+
+    def _map_control(self):
+        with self._lock:
+            if self._control is None:
+                try:
+                    with os.fdopen(_open(self.path), 'rb') as f:
+                        self._control = mmap.mmap(f.fileno(),
+                                                  self._CONTROL.size,
+                                                  access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    return None
+            return self._control
+
+    @property
+    def current(self):
+        """The published config as a dodai.parse.lazy.LazySections, or None
+        when nothing was published.  A new one is attached when the
+        generation changes.
+        """
+        generation, sections = self._attached
+        latest = self.generation
+        if latest != generation and latest:
+            with self._lock:
+                generation, sections = self._attached
+                if latest != generation:
+                    sections = self._attach(latest, sections)
+                    self._attached = (latest, sections)
+        return sections
+
+    def _attach(self, generation, previous):
+        try:
+            with os.fdopen(_open(self._data_path(generation)), 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Already replaced by a newer generation
+            return previous
+        magic, version, offset, length = self._HEADER.unpack_from(buffer)
+        if magic != self.MAGIC or version != self.VERSION:
+            return previous
+        index = marshal.loads(buffer[offset:offset + length])
+        return LazySections(SharedData(buffer, index), previous)
@@ -0,0 +1,74 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import marshal
+from dodai.util import cache
+from dodai.parse.layer import Layer
+
+
+class ParseSnapshot(object):
+    """Keeps the parsed layer of every config file of a project, along with
+    their merged data, on disk as a marshal of plain dictionaries.
+
+    Every layer carries the stamp (path, encoding, size, mtime_ns, inode,
+    ctime_ns, digest) of its file so a later process only re-parses the
+    files that changed.  When none changed the merged data is used as is.
+    """
+
+    MAGIC = b'DODAISNP'
+    VERSION = 3
+    FILENAME = 'snapshot.marshal'
+
+    def __init__(self, path):
+        """
+        :param path: The full path of the snapshot file
+        """
+        self.path = path
+        self._tag = (self.VERSION, sys.implementation.cache_tag)
+
+    @classmethod
+    def load(cls, project_name):
+        path = os.path.join(cache.cache_directory(project_name),
+                            cls.FILENAME)
+        return cls(path)
+
+    def read(self):
+        """Returns (layers, merged) where layers is a dictionary of path to
+        dodai.parse.layer.Layer and merged is (key, data) of the merged
+        layers.  Returns ({}, None) when there is no usable snapshot.
+        """
+        data = cache.read_bytes(self.path)
+        if not data or not data.startswith(self.MAGIC):
+            return {}, None
+        try:
+            tag, layers, merged = marshal.loads(data[len(self.MAGIC):])
+        except (EOFError, ValueError, TypeError):
+            return {}, None
+        if tag != self._tag:
+            return {}, None
+        layers = dict((stamp[0], Layer(stamp, data)) for stamp, data
+                      in layers)
+        return layers, merged
+
+    def write(self, layers, merged):
+        """Stores the layers and the (key, data) of their merged data
+        """
+        layers = tuple((tuple(layer.stamp), layer.data) for layer in layers)
+        payload = marshal.dumps((self._tag, layers, tuple(merged)))
+        return cache.write_atomic(self.path, self.MAGIC + payload)
@@ -0,0 +1,226 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+"""Typed access to config values.  A TypedView converts a value the first
+time it is read with a given converter and returns the stored result after
+that.  Converted values are shared, so converters return immutable values.
+"""
+
+import re
+import configparser
+from urllib.parse import urlsplit
+
+_UNSET = object()
+
+BOOLEAN_STATES = configparser.ConfigParser.BOOLEAN_STATES
+
+_DURATION = re.compile(r'\s*(\d+(?:\.\d*)?|\.\d+)\s*(ms|s|m|h|d|w)?',
+                       re.I)
+_DURATION_UNITS = {
+    'ms': 0.001,
+    's': 1,
+    'm': 60,
+    'h': 3600,
+    'd': 86400,
+    'w': 604800,
+}
+
+_SIZE = re.compile(r'\s*(\d+(?:\.\d*)?|\.\d+)\s*([kmgt]?i?b|[kmgt])?\s*$',
+                   re.I)
+_SIZE_UNITS = {
+    'b': 1,
+    'kb': 1000, 'mb': 1000 ** 2, 'gb': 1000 ** 3, 'tb': 1000 ** 4,
+    'kib': 1024, 'mib': 1024 ** 2, 'gib': 1024 ** 3, 'tib': 1024 ** 4,
+    'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4,
+}
+
+
+def to_boolean(value):
+    """Converts the value like ConfigParser.getboolean
+    """
+    if value.lower() not in BOOLEAN_STATES:
+        raise ValueError('Not a boolean: {0}'.format(value))
+    return BOOLEAN_STATES[value.lower()]
+
+
+def to_duration(value):
+    """Converts a duration such as '90', '250ms', '5m' or '1h 30m' to
+    seconds.  A number without a unit is in seconds.
+    """
+    seconds = 0.0
+    position = 0
+    value = value.strip()
+    while position < len(value):
+        match = _DURATION.match(value, position)
+        if not match or (match.group(2) is None and
+                         match.end() < len(value)):
+            raise ValueError('Not a duration: {0}'.format(value))
+        unit = (match.group(2) or 's').lower()
+        seconds += float(match.group(1)) * _DURATION_UNITS[unit]
+        position = match.end()
+    if not value:
+        raise ValueError('Not a duration: {0}'.format(value))
+    return seconds
+
+
+def to_size(value):
+    """Converts a size such as '512', '10KB', '4KiB' or '1G' to bytes.  KB,
+    MB, GB and TB are powers of 1000 while KiB, MiB, GiB, TiB and the single
+    letters K, M, G and T are powers of 1024.
+    """
+    match = _SIZE.match(value)
+    if not match:
+        raise ValueError('Not a size: {0}'.format(value))
+    unit = (match.group(2) or 'b').lower()
+    if unit not in _SIZE_UNITS:
+        raise ValueError('Not a size: {0}'.format(value))
+    return int(float(match.group(1)) * _SIZE_UNITS[unit])
+
+
+def to_list(value):
+    """Converts a comma or line separated value to a tuple of the stripped,
+    non-empty items
+    """
+    items = (item.strip() for line in value.splitlines()
+             for item in line.split(','))
+    return tuple(item for item in items if item)
+
+
+def to_url(value):
+    """Converts the value to a urllib.parse.SplitResult
+    """
+    url = urlsplit(value.strip())
+    if not url.scheme:
+        raise ValueError('Not a URL: {0}'.format(value))
+    return url
+
+
+CONVERTERS = {
+    'int': int,
+    'float': float,
+    'boolean': to_boolean,
+    'duration': to_duration,
+    'size': to_size,
+    'list': to_list,
+    'url': to_url,
+}
+
+
+class TypedView(object):
+    """Converts config values once and keeps the results.  Meant to be
+    shared by application code and the validators in dodai.validate.
+
+    Results are kept for the life of the view.  A
+    dodai.parse.sections.Sections never changes and has its own view (see
+    its typed property), so a reload gives a fresh one.  A view over data
+    that can change, such as a ConfigParser, must be cleared after the data
+    changes or made with keep set to False.
+
+    :param sections: The config data, anything where
+        sections[section_name][key] gives the value
+    :param converters: A dictionary of extra converters by name
+    :param keep: If set to False every read converts the value again
+    """
+
+    def __init__(self, sections, converters=None, keep=True):
+        self._sections = sections
+        self._converters = dict(CONVERTERS)
+        if converters:
+            self._converters.update(converters)
+        self._cache = {} if keep else None
+
+    def register(self, name, converter):
+        """Adds a converter that can then be given to get by its name
+        """
+        self._converters[name] = converter
+
+    def clear(self):
+        """Forgets every converted value
+        """
+        if self._cache is not None:
+            self._cache.clear()
+
+    def get(self, section_name, key, converter, fallback=_UNSET):
+        """Returns the converted value of the key in the section.  Raises
+        KeyError when it does not exist and fallback is not given, or the
+        error of the converter (a ValueError) when it can not be
+        converted.
+
+        :param converter: The name of a converter or a callable that takes
+            the value and returns the converted value
+        """
+        if isinstance(converter, str):
+            converter = self._converters[converter]
+        if self._cache is None:
+            try:
+                value = self._sections[section_name][key]
+            except KeyError:
+                if fallback is _UNSET:
+                    raise
+                return fallback
+            return converter(value)
+        cache_key = (section_name, key, converter)
+        try:
+            converted, error = self._cache[cache_key]
+        except KeyError:
+            try:
+                value = self._sections[section_name][key]
+            except KeyError:
+                if fallback is _UNSET:
+                    raise
+                return fallback
+            converted = error = None
+            try:
+                converted = converter(value)
+            except ValueError as e:
+                error = e
+            self._cache[cache_key] = (converted, error)
+        if error is not None:
+            raise type(error)(*error.args)
+        return converted
+
+    def getint(self, section_name, key, fallback=_UNSET):
+        return self.get(section_name, key, int, fallback)
+
+    def getfloat(self, section_name, key, fallback=_UNSET):
+        return self.get(section_name, key, float, fallback)
+
+    def getboolean(self, section_name, key, fallback=_UNSET):
+        return self.get(section_name, key, to_boolean, fallback)
+
+    def getduration(self, section_name, key, fallback=_UNSET):
+        return self.get(section_name, key, to_duration, fallback)
+
+    def getsize(self, section_name, key, fallback=_UNSET):
+        return self.get(section_name, key, to_size, fallback)
+
+    def getlist(self, section_name, key, fallback=_UNSET):
+        return self.get(section_name, key, to_list, fallback)
+
+    def geturl(self, section_name, key, fallback=_UNSET):
+        return self.get(section_name, key, to_url, fallback)
+
+
+def view(sections):
+    """Returns the TypedView of the config data, which is the shared one
+    when the data has a typed property (eg.. Sections).  Any other data,
+    such as a ConfigParser, may change so its view converts the value on
+    every read.
+    """
+    typed = getattr(sections, 'typed', None)
+    if isinstance(typed, TypedView):
+        return typed
+    return TypedView(sections, keep=False)
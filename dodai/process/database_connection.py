@@ -15,8 +15,6 @@
 # You should have received a copy of the GNU General Public License
 # along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 
 class DodaiSqlalchemyConnection(object):
@@ -32,8 +30,8 @@ class DodaiSqlalchemyConnection(object):
         if schema:
             self.schema = schema
         self.__url = url
-        self.__create_engine = kwargs.get('create_engine') or create_engine
-        self.__sessionmaker = kwargs.get('sessionmaker') or sessionmaker
+        self.__create_engine = kwargs.get('create_engine')
+        self.__sessionmaker = kwargs.get('sessionmaker')
         self.__kwargs = kwargs
         self.__engine = None
         self.__connection_cache = {}
@@ -43,12 +41,22 @@ class DodaiSqlalchemyConnection(object):
 
     @property
     def engine(self):
-        """The sqlalchemy engine made from sqlalchemy.create_engine
+        """The sqlalchemy engine made from sqlalchemy.create_engine.
+        sqlalchemy is imported the first time this is read.
         """
         if not self.__engine:
-            self.__engine = self.__create_engine(url, **self.__kwargs)
+            create_engine = self.__create_engine
+            if not create_engine:
+                from sqlalchemy import create_engine
+            self.__engine = create_engine(self.__url, **self.__kwargs)
         return self.__engine
 
+    def _sessionmaker(self):
+        if not self.__sessionmaker:
+            from sqlalchemy.orm import sessionmaker
+            self.__sessionmaker = sessionmaker
+        return self.__sessionmaker
+
     @property
     def connection_cache(self):
         """Dictionary of names with engine.connect()
@@ -92,7 +100,7 @@ class DodaiSqlalchemyConnection(object):
         """A dictionary of sqlalchemy sessions
         """
         if not self.__session_cache:
-            session = self.__sessionmaker(bind=self.engine)
+            session = self._sessionmaker()(bind=self.engine)
             self.__session_cache[self.DEFAULT_KEY] = session()
         return self.__session_cache
 
@@ -121,7 +129,7 @@ class DodaiSqlalchemyConnection(object):
         """
         if name:
             if name not in self.session_cache:
-                session = self.__sessionmaker(bind=self.engine)
+                session = self._sessionmaker()(bind=self.engine)
                 self.session_cache[name] = session()
             self.active_session_key = name
         else:
@@ -0,0 +1,100 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def cache_directory(project_name=None):
+    """Returns the full path of the user's dodai cache directory.  This
+    follows $XDG_CACHE_HOME and falls back to ~/.cache
+
+    :param project_name: The passed in project name will be appended to
+        the cache directory.
+    """
+    path = os.environ.get('XDG_CACHE_HOME')
+    if not path or not os.path.isabs(path):
+        path = os.path.join(os.path.expanduser('~'), '.cache')
+    path = os.path.join(path, 'dodai')
+    if project_name:
+        path = os.path.join(path, project_name.strip())
+    return path
+
+
+def read_bytes(path):
+    """Returns the contents of the given file or None if it can't be read
+    """
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_atomic(path, data):
+    """Writes the given bytes to path so that readers either see the old
+    file or the complete new one.  The data is written to a temporary file
+    in the same directory which then replaces path.  Returns False if the
+    file could not be written.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+@contextlib.contextmanager
+def locked(path):
+    """Holds an exclusive lock on path + '.lock' so processes can read,
+    change and write path one at a time.  Where the lock can not be taken
+    (eg.. on Windows) nothing is locked.
+    """
+    fd = None
+    if fcntl is not None:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700,
+                        exist_ok=True)
+            fd = os.open(path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        except OSError:
+            if fd is not None:
+                os.close(fd)
+            fd = None
+    try:
+        yield
+    finally:
+        if fd is not None:
+            os.close(fd)
@@ -17,18 +17,96 @@
 
 import sys
 import os
-import platform
 import tempfile
+from stat import S_ISREG
 from collections import namedtuple
+from dodai.util.manifest import DiscoveryManifest
+
+class EnvironmentProbe(object):
+    """Looks up the parts of the environment that the config directories
+    are built from.  Each one is probed the first time it is read and then
+    kept for the life of the process.  Call reset() to probe again (eg.. in
+    tests that change the environment).
+    """
+
+    def __init__(self):
+        self._values = {}
+
+    def reset(self):
+        """Forgets every probed value
+        """
+        self._values = {}
+
+    @property
+    def tmp_directory(self):
+        """The tmp directory as set by the system
+        """
+        return self._get('tmp_directory', tempfile.gettempdir)
+
+    @property
+    def home_directory(self):
+        """The full real path of the user's home directory.  On windows
+        this is the application data folder when pywin32 is installed.
+        """
+        return self._get('home_directory', self._probe_home_directory)
+
+    @property
+    def system(self):
+        """The name of the operating system, see platform.system
+        """
+        return self._get('system', self._probe_system)
+
+    @property
+    def encoding(self):
+        """The system's character encoding
+        """
+        return self._get('encoding', self._probe_encoding)
+
+    def _get(self, name, probe):
+        values = self._values
+        try:
+            return values[name]
+        except KeyError:
+            value = values[name] = probe()
+            return value
+
+    def _probe_home_directory(self):
+        out = None
+        if sys.platform == 'win32':
+            try:
+                from win32com.shell import shellcon, shell
+            except ImportError:
+                pass
+            else:
+                out = shell.SHGetFolderPath(0, shellcon.CSIDL_APPDATA, 0, 0)
+        if out is None:
+            out = os.path.expanduser('~')
+        return os.path.realpath(out)
+
+    def _probe_system(self):
+        import platform
+        return platform.system()
+
+    def _probe_encoding(self):
+        encoding = sys.getfilesystemencoding()
+        if not encoding:
+            encoding = sys.getdefaultencoding()
+        return encoding
+
+
+# The probe shared by the functions of this module
+probe = EnvironmentProbe()
+
+
+def reset_probes():
+    """Makes the functions of this module probe the environment again
+    """
+    probe.reset()
 
 def tmp_directory():
     """Returns the tmp directory as set by the system
     """
-    def _find_tmp_direcotry__():
-        with tempfile.NamedTemporaryFile() as f:
-            name = os.path.dirname(f.name)
-        return name
-    return _find_tmp_direcotry__()
+    return probe.tmp_directory
 
 def home_directory(project_name=None):
     """Return the full real path of this script user's home directory.
@@ -39,18 +117,12 @@ def home_directory(project_name=None):
     if project_name:
         project_name = project_name.strip()
 
-    # Test for windows
-    try:
-        from win32com.shell import shellcon, shell
-    except ImportError:
-        out = os.path.expanduser('~')
-    else:
-        out = shell.SHGetFolderPath(0, shellcon.CSIDL_APPDATA, 0, 0)
-    out = os.path.realpath(out)
+    out = probe.home_directory
     if project_name:
         project_name = ".{0}".format(project_name)
         out = os.path.join(out, project_name)
-    return os.path.realpath(out)
+        return os.path.realpath(out)
+    return out
 
 def system_config_directory(project_name=None):
     """Returns the full real path to the system config directory with the
@@ -62,7 +134,8 @@ def system_config_directory(project_name=None):
     if project_name:
         project_name = project_name.strip()
 
-    if platform.system() and platform.system() not in ('Windows', 'Java',):
+    system = probe.system
+    if system and system not in ('Windows', 'Java',):
         path = "{0}{1}".format(os.path.sep, 'etc')
         if project_name:
             return os.path.join(path, project_name)
@@ -73,14 +146,7 @@ def system_config_directory(project_name=None):
 def system_encoding():
     """Returns the system's character encoding
     """
-
-    def _find_the_system_encoding__():
-        encoding = sys.getfilesystemencoding()
-        if not encoding:
-            encoding = sys.getdefaultencoding()
-        return encoding
-
-    return _find_the_system_encoding__()
+    return probe.encoding
 
 def project_config_directory(with_config=True):
     """Returns the directory of where this executable is running from.
@@ -107,7 +173,15 @@ def config_directories(project_name):
     ]
 
 class ConfigFiles(object):
-    """Callable object used to find config files that will be parsed
+    """Callable object used to find config files that will be parsed.
+
+    Each config directory is listed once and its entries are matched against
+    the precomputed candidate names, instead of probing every possible
+    filename with stat calls.
+
+    An environment can also be given, in which case its overlay files (eg..
+    config.prod.ini next to config.ini) are found along with the base ones.
+    The overlay files of other environments are never returned.
     """
 
     # Tuple of possible names of config files without the file extensions
@@ -123,6 +197,12 @@ class ConfigFiles(object):
         self.directories = directories
         self.default_encoding = default_encoding
         self._make = namedtuple('config_file', self.FIELDS)
+        # Maps each candidate filename to its precedence within a directory
+        self._ranks = dict((name, rank) for rank, name in
+                           enumerate(self._build_filenames()))
+        self.candidate_names = frozenset(self._ranks)
+        # environment -> {overlay filename: precedence}
+        self._overlay_ranks = {}
 
     @classmethod
     def load(cls, project_name):
@@ -130,24 +210,103 @@ class ConfigFiles(object):
         default_encoding = system_encoding()
         return cls(directories, default_encoding)
 
-    def __call__(self, filenames=None):
+    def __call__(self, filenames=None, environment=None):
         """Returns a list of (filename, encoding) of config files that
-        actually exist in the filesystem.
+        actually exist in the filesystem.  A file that is reached more than
+        once (eg.. through a symlink) is only returned at its last position,
+        which keeps the parsed result the same as reading it every time.
 
         :param filenames: A list of complete file paths that will
             added to the list of config files that exist on the system. The
             file path can also be a tuple (filename, encoding).  If the
             encoding is not given the default system encoding will be used
+        :param environment: When given the overlay files of this
+            environment are also returned, each one right after the config
+            file it overlays (eg.. config.prod.ini after config.ini)
         """
-        out = []
-        possible_filenames = self._build_list_of_possible_filenames(filenames)
-        for possible_filename in possible_filenames:
-            if (os.path.exists(possible_filename.name)
-                    and os.path.isfile(possible_filename.name)):
-                out.append(possible_filename)
-        return out
+        found = []
+        for possible_filename in self._build_list_of_custom_filenames(
+                                                                filenames):
+            identity = self._identify(possible_filename.name)
+            if identity:
+                found.append((identity, possible_filename))
+
+        overlays = self.overlay_ranks(environment) if environment else None
+        for directory in self.directories:
+            found.extend(self._scan_directory(directory, overlays))
+
+        return self._unique(found)
 
-    def _build_list_of_possible_filenames(self, filenames):
+    def overlay_ranks(self, environment):
+        """Returns a dictionary of the overlay filenames of the environment
+        to the precedence of the config file they overlay
+        """
+        ranks = self._overlay_ranks.get(environment)
+        if ranks is None:
+            infix = ".{0}".format(environment)
+            ranks = dict((name, rank) for rank, name in
+                         enumerate(self._build_filenames(infix)))
+            self._overlay_ranks[environment] = ranks
+        return ranks
+
+    def _scan_directory(self, directory, overlays=None):
+        """Lists the directory once and returns (identity, config_file) of
+        the entries that are candidate config files, in precedence order.
+
+        :param overlays: The overlay_ranks of the environment
+        """
+        found = []
+        if not directory:
+            return found
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            return found
+        with entries:
+            for entry in entries:
+                rank = self._ranks.get(entry.name)
+                if rank is not None:
+                    rank = (rank, 0)
+                elif overlays:
+                    rank = overlays.get(entry.name)
+                    if rank is None:
+                        continue
+                    rank = (rank, 1)
+                else:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                name = os.path.join(directory, entry.name)
+                found.append((rank, (stat.st_dev, stat.st_ino),
+                              self._make(name, self.default_encoding)))
+        found.sort(key=lambda item: item[0])
+        return [(identity, config_file) for rank, identity, config_file
+                in found]
+
+    def _identify(self, filename):
+        """Returns the (device, inode) of the given filename if it is a
+        regular file otherwise None
+        """
+        try:
+            stat = os.stat(filename)
+        except (OSError, ValueError):
+            return None
+        if not S_ISREG(stat.st_mode):
+            return None
+        return (stat.st_dev, stat.st_ino)
+
+    def _unique(self, found):
+        last = {}
+        for index, (identity, config_file) in enumerate(found):
+            last[identity] = index
+        return [config_file for index, (identity, config_file)
+                in enumerate(found) if last[identity] == index]
+
+    def _build_list_of_custom_filenames(self, filenames):
         possible_filenames = []
         if filenames:
             for filename in filenames:
@@ -164,19 +323,12 @@ class ConfigFiles(object):
                     possible_filenames.append(
                             self._make(filename, self.default_encoding)
                     )
-
-        # Build all the possible default paths
-        for directory in self.directories:
-            for filename in self._build_filenames():
-                filename = os.path.join(directory, filename)
-                possible_filenames.append(
-                        self._make(filename, self.default_encoding)
-                )
         return possible_filenames
 
-    def _build_filenames(self):
+    def _build_filenames(self, infix=''):
         out = []
         for root in self.FILENAME_ROOTS:
+            root = "{0}{1}".format(root, infix)
             for extension in self.FILENAME_EXTENSIONS:
                 if extension:
                     filename = "{0}.{1}".format(root, extension)
@@ -188,7 +340,8 @@ class ConfigFiles(object):
         return out
 
 
-def config_files(project_name, filenames=None):
+def config_files(project_name, filenames=None, use_manifest=False,
+                 environment=None):
     """Returns a list of (filename, encoding) of the config filenames that
     actually exist on the system.
 
@@ -200,6 +353,16 @@ def config_files(project_name, filenames=None):
         be a tuple (filename, encoding).  If the encoding is not given the
         default system encoding will be used.
 
+    :param use_manifest: If set to True the result is kept in a manifest in
+        the user's cache directory and reused until one of the searched
+        directories changes.  See dodai.util.manifest.DiscoveryManifest
+
+    :param environment: Also return the overlay files of this environment
+        (eg.. config.prod.ini).  See ConfigFiles
+
     """
     find_config_files = ConfigFiles.load(project_name)
-    return find_config_files(filenames)
+    if use_manifest:
+        manifest = DiscoveryManifest.load(project_name)
+        return manifest(find_config_files, filenames, environment)
+    return find_config_files(filenames, environment)
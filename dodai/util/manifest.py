@@ -0,0 +1,139 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import json
+import time
+import hashlib
+from dodai.util import cache
+
+
+class DiscoveryManifest(object):
+    """Callable object that keeps the result of a
+    dodai.util.find.ConfigFiles search on disk.  The manifest records the
+    mtime and inode of every searched directory along with the identity of
+    every file that was found.  While none of those change the file list is
+    returned from the manifest after a handful of stat calls.
+    """
+
+    VERSION = 2
+    FILENAME = 'discovery.json'
+
+    # Directories modified this recently are not trusted because another
+    # change within the same timestamp tick would not move their mtime
+    RACY_SECONDS = 2
+
+    def __init__(self, path, racy_seconds=None):
+        """
+        :param path: The full path of the manifest file
+        :param racy_seconds: Override of RACY_SECONDS
+        """
+        self.path = path
+        if racy_seconds is None:
+            racy_seconds = self.RACY_SECONDS
+        self._racy_ns = int(racy_seconds * 1e9)
+
+    @classmethod
+    def load(cls, project_name):
+        path = os.path.join(cache.cache_directory(project_name),
+                            cls.FILENAME)
+        return cls(path)
+
+    def __call__(self, config_files, filenames=None, environment=None):
+        """Returns the same list as config_files(filenames, environment)
+
+        :param config_files: An instance of dodai.util.find.ConfigFiles
+        :param filenames: Passed on to config_files
+        :param environment: Passed on to config_files
+        """
+        key = self._key(config_files, filenames, environment)
+        manifest = self._read()
+        if manifest and manifest.get('key') == key:
+            if self._is_current(manifest['stamps']):
+                return [config_files._make(name, encoding)
+                        for name, encoding in manifest['files']]
+
+        out = config_files(filenames, environment)
+        self._write(key, config_files, filenames, out)
+        return out
+
+    def _key(self, config_files, filenames, environment=None):
+        candidates = '\0'.join(sorted(config_files.candidate_names))
+        return {
+            'version': self.VERSION,
+            'directories': [directory for directory
+                            in config_files.directories if directory],
+            'filenames': [list(name) for name in
+                    config_files._build_list_of_custom_filenames(filenames)],
+            'encoding': config_files.default_encoding,
+            'candidates': hashlib.sha1(candidates.encode('utf-8')).hexdigest(),
+            'environment': environment,
+        }
+
+    def _stamp(self, path, with_mtime=False):
+        try:
+            stat = os.stat(path)
+        except (OSError, ValueError):
+            return None
+        if with_mtime:
+            return [stat.st_dev, stat.st_ino, stat.st_mtime_ns]
+        return [stat.st_dev, stat.st_ino]
+
+    def _stamps(self, key, files):
+        stamps = []
+        for directory in key['directories']:
+            stamps.append([directory, True,
+                           self._stamp(directory, with_mtime=True)])
+        for name, encoding in key['filenames']:
+            stamps.append([name, False, self._stamp(name)])
+        for file_ in files:
+            stamps.append([file_.name, False, self._stamp(file_.name)])
+        return stamps
+
+    def _is_current(self, stamps):
+        for path, with_mtime, stamp in stamps:
+            if self._stamp(path, with_mtime) != stamp:
+                return False
+        return True
+
+    def _is_racy(self, stamps):
+        now = time.time_ns()
+        for path, with_mtime, stamp in stamps:
+            if with_mtime and stamp and now - stamp[2] < self._racy_ns:
+                return True
+        return False
+
+    def _read(self):
+        data = cache.read_bytes(self.path)
+        if data:
+            try:
+                return json.loads(data.decode('utf-8'))
+            except ValueError:
+                pass
+        return None
+
+    def _write(self, key, config_files, filenames, files):
+        stamps = self._stamps(key, files)
+        if self._is_racy(stamps):
+            return False
+        manifest = {
+            'key': key,
+            'stamps': stamps,
+            'files': [[file_.name, file_.encoding] for file_ in files],
+        }
+        data = json.dumps(manifest).encode('utf-8')
+        return cache.write_atomic(self.path, data)
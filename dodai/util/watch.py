@@ -0,0 +1,438 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import time
+import select
+import warnings
+import struct
+import threading
+import ctypes
+from collections import namedtuple
+from dodai.util import find
+
+
+class ChangeEvent(namedtuple('ChangeEvent', ('paths', 'detected', 'fired'))):
+    """The event handed to a ConfigWatcher callback.
+
+    paths is a sorted tuple of the config paths that changed.  detected is
+    the time.monotonic() of the first change in this batch and fired is
+    the time.monotonic() right before the callback was called.
+    """
+
+    __slots__ = ()
+
+    @property
+    def latency(self):
+        """Seconds between the first change being seen and the callback
+        """
+        return self.fired - self.detected
+
+
+def _nearest_parent(path):
+    """Returns the nearest parent directory of path that exists, or None
+    """
+    while True:
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        if os.path.isdir(parent):
+            return parent
+        path = parent
+
+
+class _InotifyBackend(object):
+    """Watches directories with the Linux inotify api
+    """
+
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+            IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF |
+            IN_ONLYDIR)
+
+    EVENT = struct.Struct('iIII')
+    READ_SIZE = 64 * 1024
+
+    def __init__(self, libc):
+        self._libc = libc
+        self._fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        self._directories = {}
+        self._watches = {}
+        self._wake_r, self._wake_w = os.pipe()
+
+    @classmethod
+    def load(cls):
+        """Returns a new backend or None if inotify is not available
+        """
+        if not sys.platform.startswith('linux'):
+            return None
+        # ctypes.util pulls in subprocess so it is only imported here
+        import ctypes.util
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            libc.inotify_init1
+        except (OSError, AttributeError):
+            return None
+        try:
+            return cls(libc)
+        except OSError:
+            return None
+
+    def watch(self, directory):
+        if directory in self._directories:
+            return True
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory),
+                                          self.MASK)
+        if wd < 0:
+            return False
+        self._directories[directory] = wd
+        self._watches[wd] = directory
+        return True
+
+    def watch_file(self, path):
+        return self.watch(os.path.dirname(path))
+
+    def wait(self, timeout):
+        """Blocks until there are events, the timeout passes or wake is
+        called.  Returns a list of (directory, name) where name is None
+        when the change is to the directory itself.
+        """
+        ready = select.select([self._fd, self._wake_r], [], [], timeout)[0]
+        if self._fd not in ready:
+            return []
+        try:
+            data = os.read(self._fd, self.READ_SIZE)
+        except BlockingIOError:
+            return []
+        return self._decode(data)
+
+    def _decode(self, data):
+        out = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                out.extend((directory, None) for directory
+                           in self._directories)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & self.IN_IGNORED:
+                del self._watches[wd]
+                del self._directories[directory]
+            out.append((directory, os.fsdecode(name) if name else None))
+        return out
+
+    def wake(self):
+        """Makes wait return at once
+        """
+        try:
+            os.write(self._wake_w, b'x')
+        except OSError:
+            pass
+
+    def close(self):
+        if self._fd >= 0:
+            fd, self._fd = self._fd, -1
+            os.close(fd)
+            for fd in (self._wake_r, self._wake_w):
+                os.close(fd)
+
+
+class _PollingBackend(object):
+    """Portable backend that compares stat results every interval seconds.
+    Directory listings are only re-read when the directory mtime moves.
+    """
+
+    INTERVAL = 1.0
+
+    def __init__(self, interval=None):
+        self._interval = interval or self.INTERVAL
+        self._directories = {}
+        self._files = {}
+        self._woken = threading.Event()
+
+    def _stat(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _list(self, directory):
+        try:
+            return frozenset(os.listdir(directory))
+        except OSError:
+            return frozenset()
+
+    def watch(self, directory):
+        if directory not in self._directories:
+            stamp = self._stat(directory)
+            if stamp is None:
+                return False
+            self._directories[directory] = (stamp, self._list(directory))
+        return True
+
+    def watch_file(self, path):
+        if path not in self._files:
+            self._files[path] = self._stat(path)
+        return self.watch(os.path.dirname(path))
+
+    def wait(self, timeout):
+        if timeout is None or timeout > self._interval:
+            timeout = self._interval
+        if self._woken.wait(timeout):
+            return []
+        return self._poll()
+
+    def wake(self):
+        self._woken.set()
+
+    def _poll(self):
+        out = []
+        for directory, (stamp, names) in list(self._directories.items()):
+            current = self._stat(directory)
+            if current == stamp:
+                continue
+            if current is None:
+                out.append((directory, None))
+                continue
+            current_names = self._list(directory)
+            self._directories[directory] = (current, current_names)
+            for name in names.symmetric_difference(current_names):
+                out.append((directory, name))
+        for path, stamp in list(self._files.items()):
+            current = self._stat(path)
+            if current != stamp:
+                self._files[path] = current
+                out.append(os.path.split(path))
+        return out
+
+    def close(self):
+        pass
+
+
+class ConfigWatcher(object):
+    """Watches the config directories of a project and the config files
+    that were loaded and calls callback(ChangeEvent) once the changes have
+    settled for the debounce period.
+
+    Inotify is used on Linux so an idle watcher sleeps in select() without
+    using any CPU.  Everywhere else, or when poll is set to True, the
+    directories and files are polled.  For a directory that does not exist
+    when the watcher is started (eg.. ~/.foo) its nearest existing parent
+    is watched, and the directory is watched, and reported as changed,
+    once it is created.
+
+    To use this class::
+
+        parse_ini = ParseIni('foo')
+        config = parse_ini()
+        watcher = ConfigWatcher.load('foo', on_change, parse_ini.loaded_files)
+        watcher.start()
+    """
+
+    DEBOUNCE = 0.25
+    CALLBACK_ERROR = "The config watcher callback failed"
+
+    def __init__(self, directories, files, candidate_names, callback,
+                 backend, debounce=None, log=None):
+        """
+        :param directories: The config directories to watch
+        :param files: The full paths of config files that were loaded
+        :param candidate_names: A set of filenames that are config files
+            when they appear in one of the directories
+        :param callback: Called with a ChangeEvent
+        :param backend: _InotifyBackend or _PollingBackend
+        :param debounce: Seconds to wait for changes to settle
+        :param log: An instance of 'logger'
+        """
+        self._callback = callback
+        self._backend = backend
+        self._candidate_names = frozenset(candidate_names)
+        self._debounce = self.DEBOUNCE if debounce is None else debounce
+        self._log = log
+        self._relevant = {}
+        # directory that does not exist -> the parent that is watched
+        self._missing = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        for directory in directories:
+            if not directory:
+                continue
+            if self._backend.watch(directory):
+                self._relevant.setdefault(directory, set()).update(
+                                                    self._candidate_names)
+            else:
+                self._missing[directory] = None
+        self._watch_missing()
+        self.update(files)
+
+    @classmethod
+    def load(cls, project_name, callback, files=None, debounce=None,
+             poll=False, interval=None, log=None):
+        """
+        :param project_name: The name of the project
+        :param callback: Called with a ChangeEvent
+        :param files: The config files that were loaded, either paths or
+            (filename, encoding) tuples like ParseIni.loaded_files
+        :param debounce: Seconds to wait for changes to settle
+        :param poll: If set to True the polling backend is always used
+        :param interval: Seconds between polls for the polling backend
+        :param log: An instance of 'logger'
+        """
+        directories = find.config_directories(project_name)
+        candidate_names = find.ConfigFiles(directories, None).candidate_names
+        backend = None
+        if not poll:
+            backend = _InotifyBackend.load()
+        if backend is None:
+            backend = _PollingBackend(interval)
+        return cls(directories, files or [], candidate_names, callback,
+                   backend, debounce, log)
+
+    @property
+    def is_polling(self):
+        return isinstance(self._backend, _PollingBackend)
+
+    def update(self, files):
+        """Adds the given config files to the files being watched.  Should
+        be called after a re-parse loads files that were not loaded before.
+        """
+        with self._lock:
+            relevant = dict((directory, set(names)) for directory, names
+                            in self._relevant.items())
+            for file_ in files:
+                path = file_ if isinstance(file_, str) else file_[0]
+                if self._backend.watch_file(path):
+                    directory, name = os.path.split(path)
+                    relevant.setdefault(directory, set()).add(name)
+            self._relevant = relevant
+
+    def start(self):
+        if not self._thread:
+            self._thread = threading.Thread(target=self._run,
+                                            name='dodai-config-watcher')
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread:
+            thread, self._thread = self._thread, None
+            self._backend.wake()
+            if thread is not threading.current_thread():
+                thread.join()
+        self._backend.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _run(self):
+        pending = set()
+        detected = last = None
+        while self._thread:
+            timeout = None
+            if pending:
+                timeout = max(0.0, last + self._debounce - time.monotonic())
+            changes = self._backend.wait(timeout)
+            now = time.monotonic()
+            paths = self._filter(changes)
+            if changes and self._missing:
+                paths.update(self._watch_missing())
+            if paths:
+                if not pending:
+                    detected = now
+                pending.update(paths)
+                last = now
+            elif pending and now - last >= self._debounce:
+                event = ChangeEvent(tuple(sorted(pending)), detected,
+                                    time.monotonic())
+                pending = set()
+                self._fire(event)
+
+    def _watch_missing(self):
+        """Watches the directories that did not exist and have been
+        created since, and the nearest existing parent of the ones that
+        still do not.  Returns the directories that were created.
+        """
+        created = set()
+        for directory, parent in list(self._missing.items()):
+            while not self._backend.watch(directory):
+                nearest = _nearest_parent(directory)
+                if nearest is None or nearest == parent or \
+                        not self._backend.watch(nearest):
+                    break
+                # The directory may have been made before the parent was
+                # watched, so it is tried again
+                parent = self._missing[directory] = nearest
+            else:
+                del self._missing[directory]
+                with self._lock:
+                    relevant = dict(self._relevant)
+                    relevant[directory] = set(relevant.get(directory, ()))
+                    relevant[directory].update(self._candidate_names)
+                    self._relevant = relevant
+                created.add(directory)
+        return created
+
+    def _filter(self, changes):
+        out = set()
+        relevant = self._relevant
+        for directory, name in changes:
+            if name is None:
+                out.add(directory)
+            elif name in relevant.get(directory, ()):
+                out.add(os.path.join(directory, name))
+        return out
+
+    def _fire(self, event):
+        """Calls the callback.  An error is reported and never stops the
+        watcher thread.
+        """
+        try:
+            self._callback(event)
+        except Exception as e:
+            if self._log:
+                self._log.exception(self.CALLBACK_ERROR)
+            else:
+                warnings.warn("{0}: {1!r}".format(self.CALLBACK_ERROR, e),
+                              RuntimeWarning)
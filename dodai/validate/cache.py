@@ -0,0 +1,223 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import abc
+import json
+import time
+import socket
+import threading
+from dodai.util import cache
+
+
+class _TTLCache(abc.ABC):
+    """Keeps results for a while: positive ones for ttl seconds and
+    negative ones for negative_ttl seconds.  When given a path the entries
+    are also kept in that file (as json) so short lived processes share
+    them.  Every write merges in the entries other processes wrote, the
+    entry written last winning.  Safe to use from many threads.
+
+    hits and misses count the lookups answered from the cache and the ones
+    that were not.
+    """
+
+    TTL = 300.0
+    NEGATIVE_TTL = 30.0
+    VERSION = 2
+    FILENAME = None
+
+    _shared = None
+
+    def __init__(self, path=None, ttl=None, negative_ttl=None, clock=None):
+        """
+        :param path: The full path of the file the entries are kept in
+        :param ttl: Seconds a positive result is kept
+        :param negative_ttl: Seconds a negative result is kept
+        :param clock: Returns the current time in seconds, defaults to
+            time.time so the expiry times mean the same in every process
+        """
+        self.path = path
+        self._ttl = self.TTL if ttl is None else ttl
+        self._negative_ttl = self.NEGATIVE_TTL if negative_ttl is None \
+                             else negative_ttl
+        self._clock = clock or time.time
+        self._lock = threading.Lock()
+        # key -> (expires, written, value)
+        self._entries = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, project_name, ttl=None, negative_ttl=None):
+        """Returns a cache kept in the user's cache directory
+        """
+        path = os.path.join(cache.cache_directory(project_name),
+                            cls.FILENAME)
+        return cls(path, ttl, negative_ttl)
+
+    @classmethod
+    def shared(cls):
+        """Returns the in-memory cache shared by the whole process
+        """
+        if cls.__dict__.get('_shared') is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def get(self, key):
+        """Returns (found, value) where found is False when the key is not
+        in the cache or has expired
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None or entry[0] <= now:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, entry[2]
+
+    def update(self, values):
+        """Adds a dictionary of key to value
+        """
+        if not values:
+            return
+        now = self._clock()
+        with self._lock:
+            entries = self._load()
+            for key, value in values.items():
+                if self._is_positive(value):
+                    entries[key] = (now + self._ttl, now, value)
+                else:
+                    entries[key] = (now + self._negative_ttl, now, value)
+            if self.path:
+                self._write(entries, now, merge=True)
+
+    def clear(self):
+        """Forgets every entry, and resets the counters
+        """
+        with self._lock:
+            self._entries = {}
+            self.hits = 0
+            self.misses = 0
+            if self.path:
+                self._write(self._entries, self._clock())
+
+    @abc.abstractmethod
+    def _is_positive(self, value):
+        """Returns True when the value is kept for ttl seconds rather than
+        negative_ttl seconds
+        """
+
+    def _dump(self, value):
+        """Returns the value as json data
+        """
+        return value
+
+    def _undump(self, data):
+        """Returns the value of the json data from _dump
+        """
+        return data
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = self._read() if self.path else {}
+        return self._entries
+
+    def _read(self):
+        data = cache.read_bytes(self.path)
+        if not data:
+            return {}
+        try:
+            data = json.loads(data.decode('utf-8'))
+            if data.get('version') != self.VERSION:
+                return {}
+            return dict((key, (expires, written, self._undump(value)))
+                        for key, (expires, written, value)
+                        in data['entries'].items())
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return {}
+
+    def _write(self, entries, now, merge=False):
+        """Writes the entries that have not expired.  When merge is True
+        the file is read again first, under a lock shared with the other
+        processes, and the entries are merged with it keeping the one that
+        was written last.  A fresh negative result is not replaced by an
+        older positive one that expires later.
+        """
+        with cache.locked(self.path):
+            if merge:
+                for key, entry in self._read().items():
+                    current = entries.get(key)
+                    if current is None or current[1] < entry[1]:
+                        entries[key] = entry
+            data = dict((key, [expires, written, self._dump(value)])
+                        for key, (expires, written, value)
+                        in entries.items() if expires > now)
+            data = json.dumps({'version': self.VERSION, 'entries': data})
+            return cache.write_atomic(self.path, data.encode('utf-8'))
+
+
+class HostCache(_TTLCache):
+    """Keeps the result of resolving hosts for dodai.validate.field.host.
+    Hosts that resolved are kept for ttl seconds and hosts that did not
+    for negative_ttl seconds.  get(host) returns (found, error) where
+    error is None when the host resolved.  See _TTLCache.
+    """
+
+    FILENAME = 'hosts.json'
+
+    def _is_positive(self, error):
+        return error is None
+
+    def _dump(self, error):
+        if error is None:
+            return None
+        return [isinstance(error, socket.timeout), str(error)]
+
+    def _undump(self, error):
+        if error is None:
+            return None
+        timed_out, message = error
+        if timed_out:
+            return socket.timeout(message)
+        return socket.gaierror(message)
+
+
+class ValidationCache(_TTLCache):
+    """Keeps the outcome of validating a config section for
+    dodai.validate.database.IsValidDatabaseConnectionSection, by a hash of
+    the section's values and the validator's configuration.  Valid and
+    skipped sections are kept for ttl seconds and invalid ones for
+    negative_ttl seconds, since a host may start to resolve.  See
+    _TTLCache.
+    """
+
+    FILENAME = 'validation.json'
+
+    VALID = 'valid'
+    INVALID = 'invalid'
+    SKIPPED = 'skipped'
+
+    def _is_positive(self, outcome):
+        return outcome[0] != self.INVALID
+
+    def _dump(self, outcome):
+        return list(outcome)
+
+    def _undump(self, outcome):
+        status, error, messages = outcome
+        return (status, error, tuple(messages))
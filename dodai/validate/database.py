@@ -16,7 +16,14 @@
 # along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
 
 from dodai.validate.ignore import ShouldIgnore
+import hashlib
+import threading
+from dodai.parse import typed
+from dodai.validate.cache import ValidationCache
+from dodai.validate.field.base import BaseValidate
 from dodai.validate.field.base import SectionExists
+from dodai.validate.field.base import KeyExists
+from dodai.validate.field.base import ValueExists
 from dodai.validate.field.dialect import IsValidDialect
 from dodai.validate.field.host import IsValidHost
 from dodai.validate.field.port import IsValidPort
@@ -60,72 +67,434 @@ class IsDatabaseConnectionSection(object):
         return False
 
 
+class ValidationReport(object):
+    """The result of validating many config sections at once.  Every error
+    is kept rather than raised.
+
+    valid is the list of the names of the valid database sections, errors
+    a dictionary of the names of the invalid ones to their error messages
+    and skipped the list of the names of the sections that are not database
+    connection sections.
+    """
+
+    def __init__(self):
+        self.valid = []
+        self.errors = {}
+        self.skipped = []
+
+    def add(self, section_name, outcome):
+        """Adds the (status, error, messages) outcome of the section
+        """
+        status, error, messages = outcome
+        if status == ValidationCache.VALID:
+            self.valid.append(section_name)
+        elif status == ValidationCache.SKIPPED:
+            self.skipped.append(section_name)
+        else:
+            self.errors[section_name] = list(messages)
+
+    @property
+    def ok(self):
+        """True when no section had an error
+        """
+        return not self.errors
+
+    def messages(self):
+        """Returns every error message, in the order they were found
+        """
+        return [msg for messages in self.errors.values() for msg in messages]
+
+    def raise_errors(self):
+        """Raises one ValueError with every error message, if there are any
+        """
+        if self.errors:
+            raise ValueError('\n'.join(self.messages()))
+
+
 class IsValidDatabaseConnectionSection(object):
+    """Callable object used to validate a database connection section.
+
+    The field validators of each dialect are compiled once into a plan, a
+    flat tuple of checks.  The section exists, prefix, ignore and dialect
+    checks run once per section and the field checks of the plan follow.
+
+    When given a dodai.validate.cache.ValidationCache the outcome of each
+    section is kept by a hash of its values and of the configuration of
+    this object, so only sections that changed are validated again (eg..
+    after a reload).  Errors of a kept outcome are raised again but not
+    logged again.
+
+    The sections of a validated dodai.parse.bundle.Bundle were checked when
+    it was compiled, so they are valid without being checked again.
+    """
 
     FILE_DATABASES = ('sqlite', 'access',)
     NO_SCHEMA_DIALECT = ('mysql',)
 
+    # Message of a failed check whose validator does not raise errors
+    MSG = "In the config section '{section_name}' the '{key}' is not valid"
+
     def __init__(self, sections, dialect_key, is_database_section,
                  is_valid_path, is_valid_host, is_valid_port,
                  is_valid_username, is_valid_password, is_valid_database,
-                 is_valid_schema, also_validate_schema):
+                 is_valid_schema, also_validate_schema, cache=None):
         self._sections = sections
+        self._cache = cache
+        self._validated = getattr(sections, 'validated', frozenset())
         self._dialect_key = dialect_key
         self._is_database_section = is_database_section
         self._is_valid_path = is_valid_path
+        self._is_valid_host = is_valid_host
         self._chain = (is_valid_host, is_valid_port, is_valid_username,
                        is_valid_password, is_valid_database)
         self._is_valid_schema = is_valid_schema
         self._also_validate_schema = also_validate_schema
+        # dialect -> (checks, checks that run when those pass)
+        self._plans = {}
+        self._fingerprint = repr((
+            type(self).__name__, dialect_key,
+            getattr(is_database_section, '_prefix', None),
+            getattr(is_valid_host, '_raise_errors', None),
+            also_validate_schema, self.FILE_DATABASES,
+            self.NO_SCHEMA_DIALECT, IsValidDialect.DIALECTS,
+            tuple(type(validate).__name__ for validate
+                  in (is_valid_path,) + self._chain + (is_valid_schema,))))
 
     @classmethod
     def load(cls, sections, log=None, raise_errors=True, prefix=None,
-             also_validate_schema=True):
-
+             also_validate_schema=True, resolve_hosts=None, cache=None):
+        """
+        :param resolve_hosts: The
+            dodai.validate.field.host.ResolveHosts used to look up hosts
+        :param cache: The dodai.validate.cache.ValidationCache of the
+            outcomes
+        """
         dialect_key = IsValidDialect.KEY
         is_database_section = IsDatabaseConnectionSection.load(sections, log,
                                                         raise_errors, prefix)
-        is_valid_path = IsValidPath.load(sections, log,
-                                            raise_errors=raise_errors)
-        is_valid_host = IsValidHost.load(sections, log,
-                                            raise_errors=raise_errors)
-        is_valid_port = IsValidPort.load(sections, log,
-                                            raise_errors=raise_errors)
-        is_valid_username = IsValidUsername.load(sections, log,
-                                            raise_errors=raise_errors)
-        is_valid_password = IsValidPassword.load(sections, log,
-                                            raise_errors=raise_errors)
-        is_valid_database = IsValidDatabase.load(sections, log,
-                                            raise_errors=raise_errors)
-        is_valid_schema = IsValidSchema.load(sections, log,
-                                            raise_errors=raise_errors)
+        # Every field validator shares the same exists checks
+        exists = (SectionExists(sections, log, raise_errors=raise_errors),
+                  KeyExists(sections, log, raise_errors=raise_errors),
+                  ValueExists(sections, log, raise_errors=raise_errors))
+        typed_view = typed.view(sections)
+
+        def field(validate, *args):
+            return validate(sections, *(exists + (log, None, raise_errors,
+                                                  typed_view) + args))
+
         return cls(sections, dialect_key, is_database_section,
-                 is_valid_path, is_valid_host, is_valid_port,
-                 is_valid_username, is_valid_password, is_valid_database,
-                 is_valid_schema, also_validate_schema)
+                   field(IsValidPath), field(IsValidHost, resolve_hosts),
+                   field(IsValidPort), field(IsValidUsername),
+                   field(IsValidPassword), field(IsValidDatabase),
+                   field(IsValidSchema), also_validate_schema, cache)
 
     def __call__(self, section_name):
+        if section_name in self._validated:
+            return True
+        if self._cache is not None:
+            return self.replay(self._cached([section_name])[section_name])
         if self._is_database_section(section_name):
-            dialect = self._sections[section_name][self._dialect_key]
+            out = True
+            values = self._sections[section_name]
+            checks, then = self._plan(section_name)
+            for step in checks:
+                if self._check(values, section_name, step) == False:
+                    out = False
+            if out:
+                for step in then:
+                    out = self._check(values, section_name, step)
+            return out
+        return False
+
+    def batch(self, section_names=None):
+        """Validates every section in one pass and returns a
+        ValidationReport.  No error is raised; they are all collected in the
+        report.  The hosts of all of the sections are resolved at the same
+        time.
+
+        :param section_names: Defaults to every section
+        """
+        if section_names is None:
+            section_names = self._sections.keys()
+        section_names = list(section_names)
+        outcomes = self.outcomes(section_names)
+        report = ValidationReport()
+        for section_name in section_names:
+            report.add(section_name, outcomes[section_name])
+        return report
+
+    def outcomes(self, section_names):
+        """Returns a dictionary of section name to its (status, error,
+        messages) outcome, see dodai.validate.cache.ValidationCache.  No
+        error is raised.
+        """
+        outcomes = {}
+        if self._validated:
+            outcomes = dict.fromkeys((section_name for section_name
+                                      in section_names
+                                      if section_name in self._validated),
+                                     (ValidationCache.VALID, None, ()))
+            section_names = [section_name for section_name in section_names
+                             if section_name not in outcomes]
+        if self._cache is not None:
+            outcomes.update(self._cached(section_names))
+        else:
+            outcomes.update(self._outcomes(section_names))
+        return outcomes
+
+    def replay(self, outcome):
+        """Returns what calling this object returns for the outcome, or
+        raises its error
+        """
+        status, error, messages = outcome
+        if status == ValidationCache.INVALID and error:
+            raise {'KeyError': KeyError}.get(error, ValueError)(messages[0])
+        return status == ValidationCache.VALID
+
+    def _cached(self, section_names):
+        """Returns the outcome of every section, validating only the ones
+        that are not in the cache
+        """
+        outcomes = {}
+        keys = {}
+        for section_name in section_names:
+            key = self._key(section_name)
+            found, outcome = self._cache.get(key)
+            if found:
+                outcomes[section_name] = outcome
+            else:
+                keys[section_name] = key
+        if keys:
+            validated = self._outcomes(list(keys))
+            self._cache.update(dict((keys[section_name], outcome) for
+                               section_name, outcome in validated.items()))
+            outcomes.update(validated)
+        return outcomes
+
+    def _outcomes(self, section_names):
+        """Returns a dictionary of section name to its (status, error,
+        messages) where error is the name of the first error raised
+        """
+        outcomes = {}
+        planned = []
+        for section_name in section_names:
+            try:
+                is_database_section = self._is_database_section(section_name)
+            except (KeyError, ValueError) as e:
+                outcomes[section_name] = (ValidationCache.INVALID,
+                                          type(e).__name__,
+                                          (self._message(e),))
+                continue
+            if is_database_section:
+                planned.append((section_name, self._plan(section_name)))
+            else:
+                outcomes[section_name] = (ValidationCache.SKIPPED, None, ())
+
+        self._is_valid_host.prefetch(self._hosts(planned))
+        try:
+            for section_name, (checks, then) in planned:
+                error, messages = self._run(section_name, checks)
+                if not messages:
+                    error, messages = self._run(section_name, then)
+                if messages:
+                    outcomes[section_name] = (ValidationCache.INVALID, error,
+                                              tuple(messages))
+                else:
+                    outcomes[section_name] = (ValidationCache.VALID, None, ())
+        finally:
+            self._is_valid_host.forget()
+        return outcomes
+
+    def _key(self, section_name):
+        """Returns the hash of the raw values of the section and of the
+        configuration of this object
+        """
+        values = None
+        if section_name in self._sections:
+            section = self._sections[section_name]
+            if isinstance(section, dict):
+                values = sorted(section.items())
+            else:
+                # Interpolating would raise for values that are never read
+                values = sorted((key, section.get(key, raw=True))
+                                for key in section)
+        data = repr((self._fingerprint, section_name, values))
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def _plan(self, section_name):
+        """Returns the compiled (checks, then) of the dialect of the
+        section, both tuples of steps, see _step
+        """
+        dialect = self._sections[section_name][self._dialect_key]
+        plan = self._plans.get(dialect)
+        if plan is None:
             if dialect.lower() in self.FILE_DATABASES:
-                return self._validate_file_database(section_name)
+                plan = ((self._is_valid_path,), ())
+            elif self._also_validate_schema and \
+                    dialect not in self.NO_SCHEMA_DIALECT:
+                plan = (self._chain, (self._is_valid_schema,))
             else:
-                return self._validate_connection_database(section_name,
-                                                          dialect)
-        return False
+                plan = (self._chain, ())
+            plan = tuple(tuple(self._step(validate) for validate in checks)
+                         for checks in plan)
+            self._plans[dialect] = plan
+        return plan
+
+    def _step(self, validate):
+        """Returns the (validate, key, check) of a field validator, where
+        check validates a value that is set or is None when being set is
+        all there is to check
+        """
+        check = None
+        if type(validate)._check is not BaseValidate._check:
+            check = validate._check
+        return validate, validate.KEY, check
+
+    def _check(self, values, section_name, step):
+        """Validates a field like validate.check does, reading the value
+        once from the values of the section
+        """
+        validate, key, check = step
+        if not values.get(key):
+            # Missing or empty, which check reports as usual
+            return validate.check(section_name, key)
+        if check is None:
+            return True
+        return check(section_name, key)
+
+    def _hosts(self, planned):
+        key = self._is_valid_host.KEY
+        hosts = []
+        for section_name, (checks, then) in planned:
+            if any(step[0] is self._is_valid_host for step in checks):
+                host = self._sections[section_name].get(key)
+                if host:
+                    hosts.append(host)
+        return hosts
+
+    def _run(self, section_name, checks):
+        """Returns (error, messages) of the checks where error is the name
+        of the first error raised
+        """
+        error = None
+        messages = []
+        values = self._sections[section_name]
+        for step in checks:
+            validate = step[0]
+            try:
+                if self._check(values, section_name, step) == False:
+                    messages.append(self.MSG.format(
+                                    section_name=section_name,
+                                    key=validate.KEY))
+            except (KeyError, ValueError) as e:
+                if error is None and not messages:
+                    error = type(e).__name__
+                messages.append(self._message(e))
+        return error, messages
+
+    def _message(self, error):
+        return error.args[0] if error.args else str(error)
+
+
+class ValidateOnFirstUse(object):
+    """Callable object that validates a database connection section the
+    first time it is asked for, rather than every section up front.  The
+    outcome is kept, so later calls for the same section return (or raise)
+    it again without validating.
+
+    names lists the database sections by their prefix only, which is cheap,
+    and validate_all() validates every one that is left in one batch for
+    preflight checks.
+
+    The sections are read-only, so a reload should make a new object.
+
+    To use this class::
+
+        validate = ValidateOnFirstUse.load(sections)
+
+        # At startup
+        names = validate.names
+
+        # When a section is used
+        if validate('db.tenant42'):
+            # Connect
+
+        # Preflight
+        validate.validate_all().raise_errors()
+    """
+
+    def __init__(self, sections, validate, prefix=None):
+        """
+        :param sections: The config sections
+        :param validate: Should be like IsValidDatabaseConnectionSection
+        :param prefix: The prefix of the names of database sections
+        """
+        self._sections = sections
+        self._validate = validate
+        self._prefix = prefix or IsDatabaseConnectionSection.PREFIX
+        self._outcomes = {}
+        # Guards _locks only, each section is validated under its own lock
+        self._lock = threading.Lock()
+        self._locks = {}
+        self._batch_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, sections, log=None, raise_errors=True, prefix=None,
+             also_validate_schema=True, resolve_hosts=None, cache=None):
+        validate = IsValidDatabaseConnectionSection.load(sections, log,
+                        raise_errors, prefix, also_validate_schema,
+                        resolve_hosts, cache)
+        return cls(sections, validate, prefix)
+
+    @property
+    def names(self):
+        """The names of the sections that look like database sections,
+        none of which are validated
+        """
+        return [section_name for section_name in self._sections.keys()
+                if section_name.startswith(self._prefix)]
+
+    def is_validated(self, section_name):
+        """True when the section has already been validated
+        """
+        return section_name in self._outcomes
+
+    def __call__(self, section_name):
+        outcome = self._outcomes.get(section_name)
+        if outcome is None:
+            with self._section_lock(section_name):
+                outcome = self._outcomes.get(section_name)
+                if outcome is None:
+                    outcome = self._validate.outcomes(
+                                            [section_name])[section_name]
+                    outcome = self._outcomes.setdefault(section_name,
+                                                        outcome)
+        return self._validate.replay(outcome)
+
+    def validate_all(self, section_names=None):
+        """Validates every section that has not been validated yet in one
+        batch and returns a ValidationReport of all of them
+
+        :param section_names: Defaults to names
+        """
+        if section_names is None:
+            section_names = self.names
+        section_names = list(section_names)
+        with self._batch_lock:
+            left = [section_name for section_name in section_names
+                    if section_name not in self._outcomes]
+            if left:
+                for section_name, outcome in \
+                        self._validate.outcomes(left).items():
+                    self._outcomes.setdefault(section_name, outcome)
+        report = ValidationReport()
+        for section_name in section_names:
+            report.add(section_name, self._outcomes[section_name])
+        return report
 
-    def _validate_file_database(self, section_name):
-        return self._is_valid_path(section_name)
-
-    def _validate_connection_database(self, section_name, dialect):
-        out = True
-        for validate in self._chain:
-            result = validate(section_name)
-            if result == False:
-                out = False
-
-        if out:
-            if self._also_validate_schema:
-                if dialect not in self.NO_SCHEMA_DIALECT:
-                    out = self._is_valid_schema(section_name)
-        return out
+    def _section_lock(self, section_name):
+        """Returns the lock of the section, so that sections are validated
+        in parallel but each one only once
+        """
+        with self._lock:
+            return self._locks.setdefault(section_name, threading.Lock())
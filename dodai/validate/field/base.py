@@ -16,6 +16,8 @@
 # You should have received a copy of the GNU General Public License
 # along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
 
+from dodai.parse import typed
+
 
 class _BaseExists(object):
 
@@ -89,20 +91,48 @@ class ValueExists(_BaseExists):
 class BaseValidate(_BaseExists):
 
     def __init__(self, sections, section_exists, key_exists, value_exists,
-                 log=None, log_type=None, raise_errors=True):
+                 log=None, log_type=None, raise_errors=True, typed_view=None):
         super(BaseValidate, self).__init__(sections, log, log_type,
                                            raise_errors)
         self._section_exists = section_exists
         self._key_exists = key_exists
         self._value_exists = value_exists
+        self._typed = typed_view or typed.view(sections)
 
     @classmethod
-    def load(cls, sections, log=None, log_type=None, raise_errors=True):
+    def load(cls, sections, log=None, log_type=None, raise_errors=True,
+             typed_view=None):
+        """
+        :param typed_view: The dodai.parse.typed.TypedView used to convert
+            values.  Defaults to the one shared by the sections.
+        """
         section_exists = SectionExists(sections, log, log_type, raise_errors)
         key_exists = KeyExists(sections, log, log_type, raise_errors)
         value_exists = ValueExists(sections, log, log_type, raise_errors)
+        typed_view = typed_view or typed.view(sections)
         return cls(sections, section_exists, key_exists, value_exists, log,
-                   log_type, raise_errors)
+                   log_type, raise_errors, typed_view)
+
+    def __call__(self, section_name, key=None):
+        key = key or self.KEY
+        if self._validate_field(section_name, key):
+            return self._check(section_name, key)
+        return False
+
+    def check(self, section_name, key=None):
+        """Validates the field like calling this object does, for a section
+        that is already known to exist
+        """
+        key = key or self.KEY
+        if self._key_exists(section_name, key):
+            if self._value_exists(section_name, key):
+                return self._check(section_name, key)
+        return False
+
+    def _check(self, section_name, key):
+        """Validates the value of a field that is set
+        """
+        return True
 
     def _validate_field(self, section_name, key):
         if self._section_exists(section_name):
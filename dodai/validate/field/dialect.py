@@ -29,12 +29,9 @@ class IsValidDialect(BaseValidate):
     LOG_TYPE = "critical"
     KEY = 'dialect'
 
-    def __call__(self, section_name, key=None):
-        key = key or self.KEY
-        if self._validate_field(section_name, key):
-            val = self._sections[section_name].get(key)
-            if val not in self.DIALECTS:
-                return self._process_error(section_name=section_name, key=key,
-                                    val=val, dialects=repr(self.DIALECTS))
-            return True
-        return False
+    def _check(self, section_name, key):
+        val = self._sections[section_name].get(key)
+        if val not in self.DIALECTS:
+            return self._process_error(section_name=section_name, key=key,
+                                val=val, dialects=repr(self.DIALECTS))
+        return True
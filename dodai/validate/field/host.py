@@ -15,8 +15,229 @@
 # You should have received a copy of the GNU General Public License
 # along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
 
+import time
+import queue
 import socket
+import threading
+from concurrent.futures import Future, wait, FIRST_COMPLETED
 from dodai.validate.field.base import BaseValidate
+from dodai.validate.field.base import SectionExists
+from dodai.validate.field.base import KeyExists
+from dodai.validate.field.base import ValueExists
+from dodai.parse import typed
+from dodai.validate.cache import HostCache
+
+
+class HostTimeout(socket.timeout):
+    """Raised for a host that was not resolved in time
+    """
+
+
+def resolve(host):
+    """The default resolver.  Returns the addresses of the host or raises
+    socket.gaierror
+    """
+    return socket.getaddrinfo(host, 80)
+
+
+class _DaemonPool(object):
+    """A bounded pool of daemon threads.  Unlike a ThreadPoolExecutor the
+    threads are never joined at exit, so a lookup that hangs does not hold
+    up the interpreter.  A thread stuck on an abandoned call does not count
+    against workers and threads that are idle for IDLE seconds exit.
+    """
+
+    IDLE = 10.0
+
+    def __init__(self, workers):
+        self._workers = workers
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._threads = 0
+        self._idle = 0
+        self._abandoned = set()
+
+    def submit(self, func, *args):
+        """Returns the concurrent.futures.Future of func(*args)
+        """
+        future = Future()
+        self._queue.put((future, func, args))
+        with self._lock:
+            self._spawn()
+        return future
+
+    def abandon(self, future):
+        """Gives up on a call that is still running, so that another thread
+        can take its place
+        """
+        with self._lock:
+            if not future.done():
+                self._abandoned.add(future)
+                self._spawn()
+
+    def _spawn(self):
+        """Starts a thread when calls are waiting and there is room for
+        one.  Called with the lock held.
+        """
+        if self._queue.qsize() > self._idle and \
+                self._threads < self._workers + len(self._abandoned):
+            self._threads += 1
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def _work(self):
+        while True:
+            with self._lock:
+                self._idle += 1
+            try:
+                future, func, args = self._queue.get(timeout=self.IDLE)
+            except queue.Empty:
+                with self._lock:
+                    self._idle -= 1
+                    self._threads -= 1
+                return
+            with self._lock:
+                self._idle -= 1
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+            with self._lock:
+                if future in self._abandoned:
+                    self._abandoned.discard(future)
+                    # Another thread took this one's place meanwhile
+                    if self._threads > self._workers + \
+                            len(self._abandoned):
+                        self._threads -= 1
+                        return
+
+
+class ResolveHosts(object):
+    """Callable object that resolves many hosts at the same time on a
+    bounded pool of daemon threads, kept for the life of the object.  Each
+    lookup gets lookup_timeout seconds from the time it starts and all of
+    them together get timeout seconds.  Lookups that run over are reported
+    as a HostTimeout and left to finish in the background.  A single host
+    is looked up on the calling thread, bounded only by the resolver.
+
+    Results are kept in a dodai.validate.cache.HostCache so hosts that were
+    looked up lately are not looked up again.
+
+    To use this class::
+
+        resolve_hosts = ResolveHosts()
+        errors = resolve_hosts(['db1.example.com', 'db2.example.com'])
+        # errors['db1.example.com'] is None when it resolved
+    """
+
+    WORKERS = 16
+    LOOKUP_TIMEOUT = 5.0
+    TIMEOUT = 15.0
+
+    def __init__(self, resolver=None, workers=None, lookup_timeout=None,
+                 timeout=None, cache=None):
+        """
+        :param resolver: Callable that takes a host and returns its
+            addresses or raises an OSError (eg.. socket.gaierror).  Defaults
+            to socket.getaddrinfo.  A stub can be given in tests.
+        :param workers: The most lookups that run at the same time
+        :param lookup_timeout: Seconds each lookup may take
+        :param timeout: Seconds all of the lookups may take
+        :param cache: The HostCache of the results.  Defaults to the one
+            shared by the process, or to none when a resolver is given.
+        """
+        if cache is None and resolver is None:
+            cache = HostCache.shared()
+        self.cache = cache
+        self._resolver = resolver or resolve
+        self._workers = workers or self.WORKERS
+        self._lookup_timeout = lookup_timeout or self.LOOKUP_TIMEOUT
+        self._timeout = timeout or self.TIMEOUT
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def __call__(self, hosts):
+        """Returns a dictionary of every host to None when it resolved or
+        to the error (an OSError) when it did not
+        """
+        out = {}
+        hosts = list(dict.fromkeys(hosts))
+        if self.cache is not None:
+            missing = []
+            for host in hosts:
+                found, error = self.cache.get(host)
+                if found:
+                    out[host] = error
+                else:
+                    missing.append(host)
+            hosts = missing
+        if hosts:
+            resolved = self._resolve(hosts)
+            if self.cache is not None:
+                self.cache.update(resolved)
+            out.update(resolved)
+        return out
+
+    def _resolve(self, hosts):
+        if len(hosts) == 1:
+            return {hosts[0]: self._lookup(hosts[0], {})}
+        deadline = time.monotonic() + self._timeout
+        started = {}
+        out = {}
+        pool = self._get_pool()
+        pending = dict((pool.submit(self._lookup, host, started), host)
+                       for host in hosts)
+        try:
+            while pending:
+                now = time.monotonic()
+                for future, host in list(pending.items()):
+                    if future.done():
+                        out[host] = future.result()
+                    elif now >= deadline or \
+                            now >= started.get(host, now) + \
+                            self._lookup_timeout:
+                        out[host] = HostTimeout(
+                            "Timed out resolving '{0}'".format(host))
+                        if not future.cancel():
+                            pool.abandon(future)
+                    else:
+                        continue
+                    del pending[future]
+                if pending:
+                    wait(pending, self._wait(pending, started, deadline),
+                         FIRST_COMPLETED)
+        finally:
+            for future in pending:
+                future.cancel()
+        return out
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = _DaemonPool(self._workers)
+            return self._pool
+
+    def _wait(self, pending, started, deadline):
+        """Returns the seconds until the next lookup or the whole batch runs
+        out of time
+        """
+        until = deadline
+        for host in pending.values():
+            if host in started:
+                until = min(until, started[host] + self._lookup_timeout)
+        # Lookups still queued have not started their clock yet
+        return max(0, min(until - time.monotonic(), self._lookup_timeout))
+
+    def _lookup(self, host, started):
+        started[host] = time.monotonic()
+        try:
+            if not self._resolver(host):
+                return socket.gaierror(
+                    "No addresses found for '{0}'".format(host))
+        except OSError as e:
+            return e
+        return None
+
 
 class IsValidHost(BaseValidate):
 
@@ -26,20 +247,84 @@ class IsValidHost(BaseValidate):
     LOG_TYPE = "critical"
     KEY = 'host'
 
-    def __call__(self, section_name, key=None):
-        key = key or self.KEY
-        if self._validate_field(section_name, key):
+    def __init__(self, sections, section_exists, key_exists, value_exists,
+                 log=None, log_type=None, raise_errors=True, typed_view=None,
+                 resolve_hosts=None):
+        """
+        :param resolve_hosts: An instance of ResolveHosts
+        """
+        super(IsValidHost, self).__init__(sections, section_exists,
+                                          key_exists, value_exists, log,
+                                          log_type, raise_errors, typed_view)
+        self._resolve_hosts = resolve_hosts or ResolveHosts()
+        self._prefetched = {}
 
-            val = self._sections[section_name].get(key)
-            try:
-                data = socket.getaddrinfo(val, 80)
-            except socket.gaierror:
-                return self._raise_error(section_name, key, val)
+    @classmethod
+    def load(cls, sections, log=None, log_type=None, raise_errors=True,
+             typed_view=None, resolve_hosts=None):
+        """
+        :param typed_view: The dodai.parse.typed.TypedView used to convert
+            values.  Defaults to the one shared by the sections.
+        :param resolve_hosts: The ResolveHosts that looks up the hosts
+        """
+        section_exists = SectionExists(sections, log, log_type, raise_errors)
+        key_exists = KeyExists(sections, log, log_type, raise_errors)
+        value_exists = ValueExists(sections, log, log_type, raise_errors)
+        typed_view = typed_view or typed.view(sections)
+        return cls(sections, section_exists, key_exists, value_exists, log,
+                   log_type, raise_errors, typed_view, resolve_hosts)
+
+    def _check(self, section_name, key):
+        val = self._sections[section_name].get(key)
+        if val in self._prefetched:
+            error = self._prefetched[val]
+        else:
+            error = self._resolve_hosts([val])[val]
+        if error is not None:
+            return self._raise_error(section_name, key, val)
+        return True
+
+    def prefetch(self, hosts):
+        """Resolves the hosts at the same time and keeps the results for the
+        checks that follow, until forget is called
+        """
+        self._prefetched = self._resolve_hosts(hosts)
+        return self._prefetched
+
+    def forget(self):
+        """Drops the results kept by prefetch
+        """
+        self._prefetched = {}
+
+    def batch(self, section_names, key=None):
+        """Validates the host of every section, resolving all of them at
+        the same time.  Returns a dictionary of section name to True or
+        False.  Every failure is logged and, when raising errors, they are
+        raised together in one ValueError once all of the lookups are done.
+        """
+        key = key or self.KEY
+        out = {}
+        hosts = {}
+        for section_name in section_names:
+            if self._validate_field(section_name, key):
+                hosts[section_name] = self._sections[section_name].get(key)
             else:
-                if not data:
-                    return self._raise_error(section_name, key, val)
-                return True
-        return False
+                out[section_name] = False
+
+        errors = self._resolve_hosts(hosts.values())
+        messages = []
+        for section_name, val in hosts.items():
+            out[section_name] = errors[val] is None
+            if errors[val] is not None:
+                messages.append(self.MSG.format(section_name=section_name,
+                                                key=key, val=val))
+        if messages:
+            if self._log:
+                for msg in messages:
+                    self._log_this(msg)
+            if self._raise_errors:
+                raise self.RAISE('\n'.join(messages))
+        return out
 
     def _raise_error(self, section_name, key, val):
         self._process_error(section_name=section_name, key=key, val=val)
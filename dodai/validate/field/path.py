@@ -21,9 +21,3 @@ class IsValidPath(BaseValidate):
 
     LOG_TYPE = "critical"
     KEY = 'path'
-
-    def __call__(self, section_name, key=None):
-        key = key or self.KEY
-        if self._validate_field(section_name, key):
-            return True
-        return False
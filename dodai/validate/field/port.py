@@ -26,20 +26,16 @@ class IsValidPort(BaseValidate):
     LOG_TYPE = "critical"
     KEY = 'port'
 
-    def __call__(self, section_name, key=None):
-        key = key or self.KEY
-        if self._validate_field(section_name, key):
-
+    def _check(self, section_name, key):
+        try:
+            val = self._typed.getint(section_name, key)
+        except ValueError:
             val = self._sections[section_name].get(key)
-            try:
-                val = int(val)
-            except ValueError:
+            return self._raise_error(section_name, key, val)
+        else:
+            if val < 1 or val > 65535:
                 return self._raise_error(section_name, key, val)
-            else:
-                if val < 1 or val > 65535:
-                    return self._raise_error(section_name, key, val)
-            return True
-        return False
+        return True
 
     def _raise_error(self, section_name, key, val):
         self._process_error(section_name=section_name, key=key, val=val)
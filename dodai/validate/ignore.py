@@ -15,6 +15,26 @@
 # You should have received a copy of the GNU General Public License
 # along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
 
+from dodai.parse import typed
+
+
+class _IsTrue(object):
+    """Converter of an ignore value.  Equal converters share their results
+    in a TypedView.
+    """
+
+    def __init__(self, true):
+        self._true = tuple(true)
+
+    def __call__(self, value):
+        return value.lower() in self._true
+
+    def __eq__(self, other):
+        return isinstance(other, _IsTrue) and self._true == other._true
+
+    def __hash__(self):
+        return hash((_IsTrue, self._true))
+
 
 class ShouldIgnore(object):
     """Callable object used to determin if the section should be ignored
@@ -24,15 +44,21 @@ class ShouldIgnore(object):
     TRUE = ('true', 'yes')
     MSG = "The config section '{section_name}' has been ignored"
 
-    def __init__(self, sections, log=None, ignore_key=None):
+    def __init__(self, sections, log=None, ignore_key=None, typed_view=None):
+        """
+        :param typed_view: The dodai.parse.typed.TypedView used to read the
+            ignore value.  Defaults to the one shared by the sections.
+        """
         self._sections = sections
         self._log = log
         self._ignore_key = ignore_key or self.KEY
+        self._typed = typed_view or typed.view(sections)
+        self._is_true = _IsTrue(self.TRUE)
 
     def __call__(self, section_name):
         if self._ignore_key in self._sections[section_name]:
-            val = self._sections[section_name].get(self._ignore_key)
-            if val.lower() in self.TRUE:
+            if self._typed.get(section_name, self._ignore_key,
+                               self._is_true):
                 if self._log:
                     msg = self.MSG.format(section_name=section_name)
                     self._log.debug(msg)
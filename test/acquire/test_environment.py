@@ -17,7 +17,9 @@
 
 
 import unittest
+from unittest import mock
 from test.acquire import fixture
+from dodai.parse.sections import Sections
 from dodai.acquire.environment import AcquireEnvironment
 
 
@@ -47,3 +49,22 @@ class TestAcquireEnvironment(unittest.TestCase):
         acquire = AcquireEnvironment.load(fixture.SECTIONS_05)
         val = acquire()
         self.assertEqual(val, 'dev')
+
+    def test_acquire_environment_value(self):
+        acquire = AcquireEnvironment.load(fixture.SECTIONS_01, value='qa')
+        self.assertEqual(acquire(), 'qa')
+
+    def test_acquire_environment_searched_once(self):
+        data = {'default': {'env': 'prod'}}
+        acquire = AcquireEnvironment.load(Sections(data))
+        self.assertEqual(acquire(), 'prod')
+        with mock.patch.object(acquire, '_search') as search:
+            self.assertEqual(acquire(), 'prod')
+        self.assertFalse(search.called)
+
+    def test_acquire_environment_mutable_sections(self):
+        sections = {'default': {'env': 'prod'}}
+        acquire = AcquireEnvironment.load(sections)
+        self.assertEqual(acquire(), 'prod')
+        sections['default']['env'] = 'stage'
+        self.assertEqual(acquire(), 'stage')
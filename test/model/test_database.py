@@ -0,0 +1,43 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+from dodai.model.database import GetDatabase
+
+
+class TestGetDatabaseEnvironment(unittest.TestCase):
+
+    def _get_database(self, sections):
+        return GetDatabase(sections, None, {'groups': {}, 'names': {}},
+                           None)
+
+    def test_last_search_section_wins(self):
+        sections = {'basic': {'env': 'stage'}, 'main': {'env': 'prod'}}
+        self.assertEqual('prod', self._get_database(sections).environment)
+
+    def test_config_section_is_not_searched(self):
+        sections = {'config': {'environment': 'prod'}}
+        self.assertEqual('dev', self._get_database(sections).environment)
+
+    def test_empty_value_is_skipped(self):
+        sections = {'server': {'environment': ''},
+                    'system': {'environment': 'qa'}}
+        self.assertEqual('qa', self._get_database(sections).environment)
+
+
+if __name__ == '__main__':
+    unittest.main()
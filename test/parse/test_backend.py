@@ -0,0 +1,128 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>
+
+import unittest
+import configparser
+from test.parse.fixture import ParseIniFixture
+from dodai.util import find
+from dodai.parse import backend
+from dodai.parse.ini import ParseIni
+from dodai.model.parse import Parse
+
+
+class TestNativeBackendConformance(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._fixture = ParseIniFixture.load()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._fixture.destroy()
+
+    def test_fixture_files(self):
+        native = backend.NativeBackend()
+        default = backend.ConfigParserBackend()
+        files = find.config_files(self._fixture.name)
+        self.assertTrue(files)
+        for file_ in files:
+            with open(file_.name, 'r', encoding=file_.encoding) as f:
+                text = f.read()
+            self.assertEqual(default(text, file_.name),
+                             native(text, file_.name))
+
+    def test_parse_ini_sections(self):
+        expected = ParseIni(self._fixture.name).sections().to_dict()
+        parse_ini = ParseIni.load(self._fixture.name, backend='native')
+        self.assertEqual(expected, parse_ini.sections().to_dict())
+
+    def test_model_parse(self):
+        expected = Parse(self._fixture.name)()
+        sections = Parse(self._fixture.name, backend='native')()
+        self.assertEqual(expected.sections(), sections.sections())
+        for section_name in expected.sections():
+            self.assertEqual(dict(expected[section_name]),
+                             dict(sections[section_name]))
+
+
+class TestNativeBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.native = backend.NativeBackend()
+        self.default = backend.ConfigParserBackend()
+
+    def assertSame(self, text):
+        self.assertEqual(self.default(text), self.native(text))
+
+    def assertSameError(self, text):
+        with self.assertRaises(configparser.Error) as expected:
+            self.default(text)
+        with self.assertRaises(type(expected.exception)) as error:
+            self.native(text)
+        self.assertEqual(str(expected.exception), str(error.exception))
+
+    def test_delimiters(self):
+        self.assertSame("[a]\none = 1\ntwo: 2\nthree=a:b\nfour:a=b\n"
+                        "five = \nurl = http://x?y=z\n")
+
+    def test_lowercase_keys(self):
+        self.assertSame("[Section]\nMixed_Case = Value\n")
+
+    def test_comments(self):
+        self.assertSame("# top\n[a]\n; one\none = 1 # kept\n  # indented\n"
+                        "two = 2\n")
+
+    def test_continuation(self):
+        self.assertSame("[a]\nkey = one\n  two\n\n\n    three\n\nnext = 1\n"
+                        "  [not a section]\n")
+
+    def test_continuation_after_empty_value(self):
+        self.assertSame("[a]\nkey =\n    one\n    two\n")
+
+    def test_default_section(self):
+        self.assertSame("[DEFAULT]\nroot = /srv\n[a]\none = 1\n"
+                        "[DEFAULT]\nother = 2\n")
+
+    def test_no_default_section(self):
+        self.assertNotIn('DEFAULT', self.native("[a]\none = 1\n"))
+
+    def test_section_header(self):
+        self.assertSame("[a] trailing\none = 1\n[b]]\ntwo = 2\n")
+
+    def test_missing_section_header(self):
+        self.assertSameError("one = 1\n")
+
+    def test_duplicate_section(self):
+        self.assertSameError("[a]\none = 1\n[a]\ntwo = 2\n")
+
+    def test_duplicate_option(self):
+        self.assertSameError("[a]\nOne = 1\none = 2\n")
+
+    def test_parsing_error(self):
+        self.assertSameError("[a]\nnot an option\n= 1\nlast")
+
+    def test_load(self):
+        self.assertIsInstance(backend.load(), backend.ConfigParserBackend)
+        self.assertIsInstance(backend.load('native'), backend.NativeBackend)
+        native = backend.NativeBackend()
+        self.assertIs(native, backend.load(native))
+        with self.assertRaises(ValueError):
+            backend.load('unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
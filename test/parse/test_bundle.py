@@ -0,0 +1,140 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from dodai.parse.bundle import Bundle
+from dodai.parse.ini import ParseIni
+from dodai.validate.database import IsValidDatabaseConnectionSection
+
+PROJECT = '__test__dodai__bundle__'
+
+
+class TestBundle(unittest.TestCase):
+
+    DATA = {
+        'DEFAULT': {'root': '/srv'},
+        'db.main': {'dialect': 'sqlite', 'path': '%(root)s/main.db'},
+    }
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'config.bundle')
+        self.bundle = Bundle(PROJECT, 'prod', self.DATA, ['db.main'],
+                             ['/etc/config.ini'], 1.0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        self.bundle.write(self.path)
+        bundle = Bundle.load(self.path)
+        for name in ('project_name', 'environment', 'data', 'databases',
+                     'files', 'created', 'validated'):
+            self.assertEqual(getattr(self.bundle, name),
+                             getattr(bundle, name))
+        self.assertEqual('/srv/main.db',
+                         bundle.sections()['db.main']['path'])
+
+    def test_url(self):
+        self.assertEqual('sqlite:////srv/main.db', self.bundle.url('db.main'))
+        with self.assertRaises(KeyError):
+            self.bundle.url('DEFAULT')
+
+    def test_checksum(self):
+        content = bytearray(self.bundle.dumps())
+        content[-2] ^= 0xff
+        with self.assertRaises(ValueError):
+            Bundle.loads(bytes(content))
+
+    def test_not_a_bundle(self):
+        for content in (b'', b'x' * 100, self.bundle.dumps()[:20]):
+            with self.assertRaises(ValueError):
+                Bundle.loads(content)
+
+    def test_version(self):
+        content = bytearray(self.bundle.dumps())
+        content[8] += 1
+        with self.assertRaises(ValueError):
+            Bundle.loads(bytes(content))
+
+    def test_parse_ini_skips_files(self):
+        self.bundle.write(self.path)
+        parse_ini = ParseIni.load(PROJECT, bundle=self.path)
+        with mock.patch.object(parse_ini, '_config_files') as config_files:
+            sections = parse_ini.sections(dictionary={'extra': {'a': 1}})
+        self.assertFalse(config_files.called)
+        self.assertEqual('/srv/main.db', sections['db.main']['path'])
+        self.assertEqual('1', sections['extra']['a'])
+        self.assertEqual([], parse_ini.loaded_files)
+
+    def test_environment_variable(self):
+        self.bundle.write(self.path)
+        with mock.patch.dict(os.environ,
+                             {ParseIni.BUNDLE_ENVIRONMENT_VARIABLE:
+                              self.path}):
+            parse_ini = ParseIni.load(PROJECT)
+        self.assertEqual('prod', parse_ini.bundle.environment)
+
+    def test_bundle_false_ignores_environment_variable(self):
+        with mock.patch.dict(os.environ,
+                             {ParseIni.BUNDLE_ENVIRONMENT_VARIABLE:
+                              os.path.join(self.directory, 'missing')}):
+            parse_ini = ParseIni.load(PROJECT, bundle=False)
+        self.assertIsNone(parse_ini.bundle)
+
+    def test_compiled_environment(self):
+        self.bundle.write(self.path)
+        parse_ini = ParseIni.load(PROJECT, bundle=self.path)
+        with mock.patch('dodai.parse.sections.AcquireEnvironment') as acquire:
+            self.assertEqual('prod', parse_ini.sections().environment)
+            self.assertEqual('prod', parse_ini.environment())
+        self.assertFalse(acquire.called)
+
+    def test_validated_sections_are_not_checked_again(self):
+        # The path is not valid, the bundle says it was
+        data = dict(self.DATA, **{'db.main': {'dialect': 'sqlite'}})
+        Bundle(PROJECT, 'prod', data, self.bundle.databases, [], 1.0,
+               True).write(self.path)
+        sections = ParseIni.load(PROJECT, bundle=self.path).sections()
+        self.assertEqual(frozenset(['db.main']), sections.validated)
+        validate = IsValidDatabaseConnectionSection.load(sections)
+        self.assertTrue(validate('db.main'))
+        self.assertEqual(['db.main'], validate.batch().valid)
+
+    def test_not_validated_bundle_is_checked(self):
+        data = dict(self.DATA, **{'db.main': {'dialect': 'sqlite'}})
+        Bundle(PROJECT, 'prod', data, self.bundle.databases, [],
+               1.0).write(self.path)
+        sections = ParseIni.load(PROJECT, bundle=self.path).sections()
+        self.assertEqual(frozenset(), sections.validated)
+        with self.assertRaises(KeyError):
+            IsValidDatabaseConnectionSection.load(sections)('db.main')
+
+    def test_dictionary_sections_are_checked(self):
+        self.bundle.validated = True
+        self.bundle.write(self.path)
+        sections = ParseIni.load(PROJECT, bundle=self.path).sections(
+                        dictionary={'db.main': {'path': ''}})
+        self.assertEqual(frozenset(), sections.validated)
+
+
+if __name__ == '__main__':
+    unittest.main()
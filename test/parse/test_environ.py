@@ -0,0 +1,57 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+from dodai.parse.environ import from_environ
+
+
+class TestFromEnviron(unittest.TestCase):
+
+    ENVIRON = {
+        'DODAI__DB_MAIN__HOST': 'db.example.com',
+        'DODAI__DB_MAIN__Port': '5432',
+        'DODAI__DEFAULT__ROOT': '/srv',
+        'DODAI__SERVER__ENV': 'prod',
+        'DODAI__NOKEY': 'x',
+        'DODAI____KEY': 'x',
+        'DODAI_DB__HOST': 'x',
+        'PATH': '/usr/bin',
+    }
+
+    def test_sections(self):
+        self.assertEqual(from_environ(self.ENVIRON), {
+            'DEFAULT': {'root': '/srv'},
+            'db.main': {'host': 'db.example.com', 'port': '5432'},
+            'server': {'env': 'prod'},
+        })
+
+    def test_prefix(self):
+        environ = {'MYAPP__DB_MAIN__HOST': 'a', 'DODAI__DB_MAIN__HOST': 'b'}
+        self.assertEqual(from_environ(environ, 'MYAPP'),
+                         {'db.main': {'host': 'a'}})
+
+    def test_escaped_underscore(self):
+        environ = {'DODAI__DB_MY___APP__HOST': 'a',
+                   'DODAI__MY___SERVICE__LOG_LEVEL': 'info',
+                   'DODAI__DB____MAIN__HOST': 'x'}
+        self.assertEqual(from_environ(environ), {
+            'db.my_app': {'host': 'a'},
+            'my_service': {'log_level': 'info'},
+        })
+
+    def test_empty(self):
+        self.assertEqual(from_environ({'HOME': '/root'}), {})
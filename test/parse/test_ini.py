@@ -15,9 +15,16 @@
 # You should have received a copy of the GNU General Public License
 # along with Dodai.  If not, see <http://www.gnu.org/licenses/>
 
+import os
+import time
+import shutil
+import tempfile
+import threading
 import unittest
+from unittest import mock
 from test.parse.fixture import ParseIniFixture
 from dodai.parse.ini import ParseIni
+from dodai.util import find
 
 
 class TestParse(unittest.TestCase):
@@ -63,3 +70,205 @@ class TestParse(unittest.TestCase):
             for key in test_data[section]:
                 val = "{0}".format(test_data[section][key])
                 self.assertEqual(val, data[section][key])
+
+    def test_parse_ini_records_loaded_files(self):
+        parse_data = ParseIni(self._fixture.name)
+        parse_data()
+        names = [file_.name for file_ in parse_data.loaded_files]
+        self.assertEqual(len(names),
+                         len(self._fixture.project_config_files))
+        for name in names:
+            self.assertTrue(name.startswith(
+                            self._fixture.project_config_directory))
+
+
+class TestParallel(unittest.TestCase):
+
+    PROJECT = '__test__dodai__parallel__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls._fixture = ParseIniFixture.load()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._fixture.destroy()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_same_as_serial(self):
+        serial = ParseIni(self._fixture.name)
+        parallel = ParseIni(self._fixture.name, workers=4)
+        self.assertEqual(serial.sections().to_dict(),
+                         parallel.sections().to_dict())
+        self.assertEqual(serial.parsed_files, parallel.parsed_files)
+        expected = serial()
+        data = parallel()
+        self.assertEqual(expected.sections(), data.sections())
+        for section_name in expected.sections():
+            self.assertEqual(dict(expected[section_name]),
+                             dict(data[section_name]))
+
+    def test_precedence_with_slow_files(self):
+        files = [self._write('{0}.ini'.format(x),
+                             "[a]\nkey = {0}\nkey{0} = 1\n".format(x))
+                 for x in range(0, 4)]
+        started = []
+
+        def opener(name, *args, **kwargs):
+            started.append(name)
+            # The first file is the slowest so it finishes last
+            time.sleep(0.05 if name == files[0] else 0)
+            return open(name, *args, **kwargs)
+
+        parse_ini = ParseIni(self.PROJECT, workers=4, opener=opener)
+        sections = parse_ini.sections(files)
+        self.assertEqual('3', sections['a']['key'])
+        self.assertEqual(files, parse_ini.parsed_files[-4:])
+        self.assertEqual('3', parse_ini(files)['a']['key'])
+        self.assertEqual(8, len([name for name in started if name in files]))
+
+    def test_reads_at_the_same_time(self):
+        files = [self._write('{0}.ini'.format(x), "[s{0}]\n".format(x))
+                 for x in range(0, 3)]
+        barrier = threading.Barrier(3, timeout=5)
+
+        def opener(name, *args, **kwargs):
+            if name in files:
+                barrier.wait()
+            return open(name, *args, **kwargs)
+
+        sections = ParseIni(self.PROJECT, workers=3,
+                            opener=opener).sections(files)
+        self.assertEqual(['s0', 's1', 's2'],
+                         [name for name in sections.sections()
+                          if name.startswith('s')][-3:])
+
+
+class TestOverlays(unittest.TestCase):
+
+    PROJECT = '__test__dodai__overlays__'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        patcher = mock.patch.object(find, 'config_directories',
+                                    return_value=[self.directory])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        environ = mock.patch.dict(os.environ)
+        environ.start()
+        self.addCleanup(environ.stop)
+        os.environ.pop(ParseIni.ENVIRONMENT_VARIABLE, None)
+        self._write('config.ini', "[server]\nenv = prod\n"
+                                  "[db.main]\nhost = localhost\n")
+        self._write('config.prod.ini', "[db.main]\nhost = db.example.com\n")
+        self._write('config.stage.ini', "[db.main]\nhost = stage\n")
+        self._write('db.ini', "[db.main]\nport = 5432\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def _names(self, parse_ini):
+        return [os.path.basename(name) for name in parse_ini.parsed_files]
+
+    def test_off_by_default(self):
+        parse_ini = ParseIni(self.PROJECT)
+        self.assertEqual('localhost', parse_ini.sections()['db.main']['host'])
+        self.assertEqual(['config.ini', 'db.ini'], self._names(parse_ini))
+
+    def test_environment_from_base_files(self):
+        parse_ini = ParseIni(self.PROJECT, overlays=True)
+        sections = parse_ini.sections()
+        self.assertEqual('db.example.com', sections['db.main']['host'])
+        self.assertEqual('5432', sections['db.main']['port'])
+        self.assertEqual(['config.ini', 'config.prod.ini', 'db.ini'],
+                         self._names(parse_ini))
+
+    def test_environment_from_environ(self):
+        os.environ[ParseIni.ENVIRONMENT_VARIABLE] = 'stage'
+        parse_ini = ParseIni(self.PROJECT, overlays=True)
+        self.assertEqual('stage', parse_ini.sections()['db.main']['host'])
+        self.assertEqual('stage', parse_ini.environment())
+
+    def test_given_environment(self):
+        parse_ini = ParseIni(self.PROJECT, overlays=True, environment='dev')
+        self.assertEqual('localhost', parse_ini.sections()['db.main']['host'])
+        self.assertEqual(['config.ini', 'db.ini'], self._names(parse_ini))
+
+    def test_lazy(self):
+        parse_ini = ParseIni(self.PROJECT, overlays=True, lazy=True)
+        sections = parse_ini.sections()
+        self.assertEqual('db.example.com', sections['db.main']['host'])
+
+    def test_reload_reads_only_changed_files(self):
+        parse_ini = ParseIni(self.PROJECT, overlays=True)
+        parse_ini.sections()
+        with mock.patch('dodai.parse.ini.AcquireEnvironment') as acquire:
+            sections = parse_ini.reload()
+            self.assertFalse(acquire.load.called)
+        self.assertEqual([], parse_ini.parsed_files)
+        self.assertEqual('db.example.com', sections['db.main']['host'])
+
+
+class TestEnviron(unittest.TestCase):
+
+    PROJECT = '__test__dodai__environ__'
+
+    ENVIRON = {
+        'DODAI__DB_MAIN__HOST': 'db.example.com',
+        'DODAI__DB_MAIN__PATH': '%(root)s/db',
+        'DODAI__DEFAULT__ROOT': '/srv',
+        'DODAI__CACHE__HOST': 'cache.example.com',
+    }
+
+    def test_sections(self):
+        parse_ini = ParseIni(self.PROJECT, environ=self.ENVIRON)
+        sections = parse_ini.sections()
+        self.assertEqual('db.example.com', sections['db.main']['host'])
+        self.assertEqual('/srv/db', sections['db.main']['path'])
+        self.assertEqual([], parse_ini.loaded_files)
+
+    def test_no_discovery(self):
+        with mock.patch.object(find, 'config_files') as config_files:
+            ParseIni(self.PROJECT, environ=self.ENVIRON).sections()
+            self.assertFalse(config_files.called)
+
+    def test_prefixes_and_dictionary(self):
+        parse_ini = ParseIni(self.PROJECT, prefixes='db.',
+                             environ=self.ENVIRON)
+        sections = parse_ini.sections(dictionary={'db.main': {'port': 1}})
+        self.assertEqual(['db.main'], sections.sections())
+        self.assertEqual('1', sections['db.main']['port'])
+
+    def test_load(self):
+        with mock.patch.dict(os.environ, self.ENVIRON):
+            os.environ[ParseIni.ENVIRON_VARIABLE] = 'true'
+            parse_ini = ParseIni.load(self.PROJECT)
+            self.assertEqual('db.example.com',
+                             parse_ini.sections()['db.main']['host'])
+            os.environ[ParseIni.ENVIRON_VARIABLE] = '0'
+            self.assertIsNone(ParseIni.load(self.PROJECT).environ)
+
+    def test_reload(self):
+        environ = dict(self.ENVIRON)
+        parse_ini = ParseIni(self.PROJECT, environ=environ)
+        parse_ini.sections()
+        environ['DODAI__DB_MAIN__HOST'] = 'other.example.com'
+        self.assertEqual('other.example.com',
+                         parse_ini.reload()['db.main']['host'])
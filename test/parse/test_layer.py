@@ -0,0 +1,107 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>
+
+import os
+import unittest
+import tempfile
+from dodai.parse.ini import ParseIni
+from dodai.parse import layer
+from collections import namedtuple
+
+class TestReload(unittest.TestCase):
+
+    PROJECT = '__test__dodai__reload__'
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.files = []
+        for x in range(0, 3):
+            path = os.path.join(self._tmp.name, 'conf{0}.ini'.format(x))
+            self._write(path, "[main]\nfile{0} = {0}\nlast = {0}\n"
+                              "".format(x))
+            self.files.append(path)
+        self.parse_ini = ParseIni(self.PROJECT)
+        self.first = self.parse_ini.sections(self.files)
+        self.config_file = namedtuple('config_file', ('name', 'encoding'))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, path, text, stamp=1000000000):
+        with open(path, 'w') as f:
+            f.write(text)
+        os.utime(path, (stamp, stamp))
+
+    def test_unchanged_reload_parses_nothing(self):
+        sections = self.parse_ini.sections(self.files)
+        self.assertEqual(self.parse_ini.parsed_files, [])
+        self.assertEqual(sections.to_dict(), self.first.to_dict())
+
+    def test_reload_parses_changed_file(self):
+        self._write(self.files[2], "[main]\nlast = new\n", 1000000001)
+        sections = self.parse_ini.sections(self.files)
+        self.assertEqual(self.parse_ini.parsed_files, [self.files[2]])
+        self.assertEqual(sections['main']['last'], 'new')
+        self.assertNotIn('file2', sections['main'])
+        self.assertEqual(sections['main']['file1'], '1')
+
+    def test_reload_uses_the_same_config_files(self):
+        self._write(self.files[1], "[main]\nfile1 = changed\n", 1000000001)
+        sections = self.parse_ini.reload()
+        self.assertEqual(self.parse_ini.parsed_files, [self.files[1]])
+        self.assertEqual(sections['main']['file1'], 'changed')
+
+    def test_check_stamp(self):
+        # utime moves the ctime so nothing here would be trusted otherwise
+        self.addCleanup(setattr, layer, 'RACY_SECONDS', layer.RACY_SECONDS)
+        layer.RACY_SECONDS = 0
+        file_ = self.config_file(self.files[0], 'utf-8')
+        current = layer.read_layer(file_, lambda file_, content: {})
+        self.assertEqual(layer.check(file_, current.stamp), current.stamp)
+        os.utime(self.files[0], (1000000002, 1000000002))
+        refreshed = layer.check(file_, current.stamp)
+        self.assertEqual(refreshed[-1], current.stamp[-1])
+        self.assertEqual(refreshed[3], 1000000002 * 10 ** 9)
+        self._write(self.files[0], "[main]\nfile0 = 1\nlast = 0\n",
+                    1000000003)
+        self.assertIsNone(layer.check(file_, current.stamp))
+
+    def test_replaced_with_same_size_and_mtime(self):
+        self.addCleanup(setattr, layer, 'RACY_SECONDS', layer.RACY_SECONDS)
+        layer.RACY_SECONDS = 0
+        self.parse_ini.sections(self.files)
+        # Like rsync -t or cp -p: a new file of the same size and mtime
+        # is renamed over the old one
+        path = self.files[0] + '.new'
+        self._write(path, "[main]\nfile0 = 9\nlast = 0\n")
+        os.replace(path, self.files[0])
+        sections = self.parse_ini.reload()
+        self.assertEqual(self.parse_ini.parsed_files, [self.files[0]])
+        self.assertEqual(sections['main']['file0'], '9')
+
+    def test_rewritten_in_place_with_same_size_and_mtime(self):
+        self.addCleanup(setattr, layer, 'RACY_SECONDS', layer.RACY_SECONDS)
+        layer.RACY_SECONDS = 0
+        self.parse_ini.sections(self.files)
+        self._write(self.files[0], "[main]\nfile0 = 9\nlast = 0\n")
+        sections = self.parse_ini.reload()
+        self.assertEqual(sections['main']['file0'], '9')
+
+    def test_reload_keeps_old_sections(self):
+        self._write(self.files[0], "[main]\nfile0 = changed\n", 1000000001)
+        self.parse_ini.sections(self.files)
+        self.assertEqual(self.first['main']['file0'], '0')
@@ -0,0 +1,180 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>
+
+import os
+import shutil
+import tempfile
+import unittest
+import configparser
+from unittest import mock
+from collections import namedtuple
+from test.parse.fixture import ParseIniFixture
+from dodai.parse import lazy
+from dodai.parse.backend import NativeBackend
+from dodai.parse.ini import ParseIni
+
+PROJECT = '__test__dodai__lazy__'
+
+ConfigFile = namedtuple('config_file', ('name', 'encoding'))
+
+
+class TestLazyFixture(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._fixture = ParseIniFixture.load()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._fixture.destroy()
+
+    def test_same_as_sections(self):
+        expected = ParseIni(self._fixture.name).sections()
+        sections = ParseIni(self._fixture.name, lazy=True).sections()
+        self.assertEqual(expected.to_dict(), sections.to_dict())
+
+
+class TestLazySections(unittest.TestCase):
+
+    TEXT = ("# Tenants\n"
+            "[DEFAULT]\n"
+            "root = /srv\n"
+            "[db.one]\r\n"
+            "host = one\n"
+            "path = %(root)s/one\n"
+            "[web]\n"
+            "port = 80\n"
+            "[x = not a header\n"
+            "[DEFAULT]\n"
+            "debug = no\n"
+            "[db.two]\n"
+            "host = two\n")
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        return path
+
+    def _sections(self, files, **kwargs):
+        return ParseIni(PROJECT, lazy=True, **kwargs).sections(files)
+
+    def test_parsed_on_first_read(self):
+        path = self._write('one.ini', self.TEXT)
+        sections = self._sections([path])
+        self.assertEqual([], sections.parsed)
+        self.assertEqual(['db.one', 'web', 'db.two'], sections.sections())
+        self.assertEqual('/srv/one', sections['db.one']['path'])
+        self.assertEqual('no', sections['db.one']['debug'])
+        self.assertEqual(['db.one'], sections.parsed)
+
+    def test_same_as_configparser(self):
+        path = self._write('one.ini', self.TEXT)
+        sections = self._sections([path])
+        parser = configparser.ConfigParser()
+        parser.read(path, encoding='utf-8')
+        self.assertEqual(parser.defaults(), sections.defaults())
+        for section_name in parser.sections():
+            self.assertEqual(dict(parser[section_name]),
+                             dict(sections[section_name]))
+
+    def test_prefixes(self):
+        path = self._write('one.ini', self.TEXT)
+        sections = self._sections([path], prefixes='db.')
+        self.assertEqual(['db.one', 'db.two'], sections.sections())
+        self.assertNotIn('web', sections)
+
+    def test_prefixes_not_lazy(self):
+        path = self._write('one.ini', self.TEXT)
+        sections = ParseIni(PROJECT, prefixes=('db.', 'x')).sections([path])
+        self.assertEqual(['db.one', 'db.two'], sections.sections())
+        self.assertEqual('/srv', sections.get('db.two', 'root'))
+
+    def test_layers_and_dictionary(self):
+        one = self._write('one.ini', self.TEXT)
+        two = self._write('two.ini', "[db.one]\nhost = other\n[new]\na = 1\n")
+        sections = ParseIni(PROJECT, lazy=True).sections(
+                        [one, two], {'db.two': {'port': 5432}})
+        self.assertEqual('other', sections['db.one']['host'])
+        self.assertEqual('/srv/one', sections['db.one']['path'])
+        self.assertEqual('5432', sections['db.two']['port'])
+        self.assertEqual('two', sections['db.two']['host'])
+        self.assertIn('new', sections)
+
+    def test_indented_header_parses_in_full(self):
+        path = self._write('one.ini', "[a]\nkey = one\n  [b]\n[c]\nd = 1\n")
+        sections = self._sections([path])
+        self.assertEqual(['a', 'c'], sections.sections())
+        self.assertEqual('one\n[b]', sections['a']['key'])
+
+    def test_duplicate_section(self):
+        path = self._write('one.ini', "[a]\n[b]\n[a]\n")
+        with self.assertRaises(configparser.DuplicateSectionError) as error:
+            self._sections([path])
+        self.assertEqual(3, error.exception.lineno)
+
+    def test_missing_section_header(self):
+        path = self._write('one.ini', "key = value\n[a]\n")
+        with self.assertRaises(configparser.MissingSectionHeaderError):
+            self._sections([path])
+
+    def test_mmap(self):
+        path = self._write('one.ini', self.TEXT)
+        file_ = ConfigFile(path, 'utf-8')
+        with mock.patch.object(lazy, 'MMAP_THRESHOLD', 1):
+            index = lazy.SectionIndex.load(file_, NativeBackend())
+        self.assertEqual({'host': 'two'}, index.section('db.two'))
+        self.assertEqual(['db.two'], index.parsed)
+
+    def _mapped(self):
+        path = self._write('one.ini', self.TEXT)
+        with mock.patch.object(lazy, 'MMAP_THRESHOLD', 1):
+            index = lazy.SectionIndex.load(ConfigFile(path, 'utf-8'),
+                                           NativeBackend())
+        return path, index
+
+    def test_mmap_file_replaced(self):
+        path, index = self._mapped()
+        other = path + '.new'
+        with open(other, 'w') as f:
+            f.write(self.TEXT.replace('two', 'six'))
+        os.replace(other, path)
+        self.assertEqual({'host': 'two'}, index.section('db.two'))
+
+    def test_mmap_file_rewritten_in_place(self):
+        path, index = self._mapped()
+        with open(path, 'w') as f:
+            f.write(self.TEXT.replace('two', 'six'))
+        with self.assertRaises(lazy.FileChangedError):
+            index.section('db.two')
+
+    def test_mmap_file_truncated(self):
+        path, index = self._mapped()
+        with open(path, 'w') as f:
+            f.write('')
+        with self.assertRaises(lazy.FileChangedError):
+            index.section('db.two')
+
+
+if __name__ == '__main__':
+    unittest.main()
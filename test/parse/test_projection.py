@@ -0,0 +1,67 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+from dodai.parse.projection import project
+
+
+DATA = {
+    'DEFAULT': {'root': '/srv', 'root.prod': '/data'},
+    'db.main': {'host': 'localhost', 'host.prod': 'db.example.com',
+                'host.stage': 'stage.example.com', 'port': '5432'},
+    'db.main.prod': {'port': '6432'},
+    'db.main.stage': {'port': '7432'},
+    'cache.prod': {'host': 'cache.example.com'},
+    'info': {'name': 'test'},
+}
+
+
+class TestProject(unittest.TestCase):
+
+    def test_keys_collapse(self):
+        out = project(DATA, 'prod')
+        self.assertEqual(out['db.main']['host'], 'db.example.com')
+        self.assertEqual(out['DEFAULT'], {'root': '/data'})
+
+    def test_sections_collapse(self):
+        out = project(DATA, 'prod')
+        self.assertEqual(out['db.main']['port'], '6432')
+        self.assertNotIn('db.main.prod', out)
+
+    def test_section_without_base(self):
+        out = project(DATA, 'prod')
+        self.assertEqual(out['cache'], {'host': 'cache.example.com'})
+
+    def test_other_environments_kept(self):
+        out = project(DATA, 'prod')
+        self.assertEqual(out['db.main']['host.stage'], 'stage.example.com')
+        self.assertIn('db.main.stage', out)
+
+    def test_other_environments_left_out(self):
+        out = project(DATA, 'prod', ('dev', 'stage', 'prod'))
+        self.assertEqual(out['db.main'], {'host': 'db.example.com',
+                                          'port': '6432'})
+        self.assertNotIn('db.main.stage', out)
+
+    def test_unchanged_sections_are_shared(self):
+        out = project(DATA, 'prod')
+        self.assertIs(out['info'], DATA['info'])
+
+    def test_data_not_changed(self):
+        project(DATA, 'prod')
+        self.assertEqual(DATA['db.main']['host'], 'localhost')
+        self.assertIn('db.main.prod', DATA)
@@ -0,0 +1,131 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>
+
+import os
+import unittest
+import tempfile
+import threading
+from dodai.parse.ini import ParseIni
+from dodai.parse.publish import Published
+from dodai.parse.sections import Sections
+
+
+def _build(generation, keys=20):
+    values = dict(('key{0}'.format(x), str(generation)) for x in range(keys))
+    return Sections({'main': values, 'other': dict(values)})
+
+
+class TestPublished(unittest.TestCase):
+
+    READERS = 8
+    PUBLISHES = 300
+
+    def test_publish(self):
+        published = Published(_build(0))
+        seen = []
+        published.subscribe(lambda generation, current: seen.append(
+                                                                generation))
+        self.assertEqual(published.generation, 0)
+        published.publish(_build(1))
+        self.assertEqual(published.current['main']['key0'], '1')
+        self.assertEqual(published.state()[0], 1)
+        self.assertEqual(seen, [1])
+
+    def test_held_config_stays_valid(self):
+        published = Published(_build(0))
+        held = published.current
+        published.update(lambda: _build(1))
+        self.assertEqual(held['main']['key5'], '0')
+        self.assertEqual(published.current['main']['key5'], '1')
+
+    def test_readers_never_see_a_mixed_config(self):
+        published = Published(_build(0))
+        stop = threading.Event()
+        errors = []
+        reads = [0] * self.READERS
+
+        def reader(index):
+            last = 0
+            while not stop.is_set():
+                sections = published.current
+                values = set(sections['main'].values())
+                values.update(sections['other'].values())
+                if len(values) != 1:
+                    errors.append(values)
+                generation = int(values.pop())
+                if generation < last:
+                    errors.append((last, generation))
+                last = generation
+                reads[index] += 1
+
+        threads = [threading.Thread(target=reader, args=(x,))
+                   for x in range(self.READERS)]
+        for thread in threads:
+            thread.start()
+        for generation in range(1, self.PUBLISHES + 1):
+            published.update(lambda: _build(generation))
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(published.generation, self.PUBLISHES)
+        self.assertTrue(all(reads))
+
+
+class TestParseIniPublish(unittest.TestCase):
+
+    PROJECT = '__test__dodai__publish__'
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, 'db.ini')
+        self._write(0)
+        self.parse_ini = ParseIni(self.PROJECT)
+        self.parse_ini.publish([self.path])
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, generation):
+        with open(self.path, 'w') as f:
+            f.write("[main]\nfirst = {0}\nsecond = {0}\n".format(generation))
+        os.utime(self.path, (1000000000 + generation,) * 2)
+
+    def test_concurrent_reload(self):
+        stop = threading.Event()
+        errors = []
+
+        def reader():
+            while not stop.is_set():
+                main = self.parse_ini.current['main']
+                if main['first'] != main['second']:
+                    errors.append(dict(main))
+
+        threads = [threading.Thread(target=reader) for x in range(4)]
+        for thread in threads:
+            thread.start()
+        for generation in range(1, 20):
+            self._write(generation)
+            self.parse_ini.publish()
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.parse_ini.current['main']['first'], '19')
+        self.assertEqual(self.parse_ini.published.generation, 20)
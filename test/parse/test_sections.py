@@ -0,0 +1,206 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>
+
+import unittest
+import configparser
+from unittest import mock
+from dodai.parse.sections import Sections
+
+
+class TestSections(unittest.TestCase):
+
+    DATA = {
+        'DEFAULT': {
+            'root': '/srv',
+            'debug': 'no',
+        },
+        'db.main': {
+            'dialect': 'sqlite',
+            'path': '%(root)s/%(name)s.db',
+            'name': 'main',
+            'port': '5432',
+            'ratio': '0.5',
+            'percent': '100%%',
+        },
+        'db.bad': {
+            'path': '%(missing)s',
+        }
+    }
+
+    def setUp(self):
+        self.parser = configparser.ConfigParser()
+        self.parser.read_dict(self.DATA)
+        self.sections = Sections(dict((name, dict(values)) for name, values
+                                      in self.DATA.items()))
+
+    def test_section_names(self):
+        self.assertEqual(list(self.sections), list(self.parser))
+        self.assertEqual(self.sections.sections(), self.parser.sections())
+        self.assertIn('DEFAULT', self.sections)
+        self.assertNotIn('db.other', self.sections)
+
+    def test_values_match_configparser(self):
+        for section_name in ('DEFAULT', 'db.main'):
+            self.assertEqual(dict(self.sections[section_name]),
+                             dict(self.parser[section_name]))
+            self.assertEqual(list(self.sections[section_name]),
+                             list(self.parser[section_name]))
+
+    def test_keys_are_case_insensitive(self):
+        section = self.sections['db.main']
+        self.assertIn('DIALECT', section)
+        self.assertEqual(section['Dialect'], 'sqlite')
+
+    def test_conversions(self):
+        self.assertEqual(self.sections.getint('db.main', 'port'), 5432)
+        self.assertEqual(self.sections.getfloat('db.main', 'ratio'), 0.5)
+        self.assertFalse(self.sections['db.main'].getboolean('debug'))
+        self.assertEqual(self.sections.getint('db.main', 'x', fallback=3), 3)
+
+    def test_raw(self):
+        self.assertEqual(self.sections.get('db.main', 'path', raw=True),
+                         '%(root)s/%(name)s.db')
+
+    def test_missing(self):
+        with self.assertRaises(KeyError):
+            self.sections['db.other']
+        with self.assertRaises(configparser.NoSectionError):
+            self.sections.get('db.other', 'path')
+        with self.assertRaises(configparser.NoOptionError):
+            self.sections.get('db.main', 'host')
+        with self.assertRaises(configparser.InterpolationMissingOptionError):
+            self.sections['db.bad']['path']
+
+    def test_read_only(self):
+        with self.assertRaises(TypeError):
+            self.sections['db.main']['dialect'] = 'mysql'
+
+
+class TestResolvedValues(unittest.TestCase):
+
+    DATA = {
+        'DEFAULT': {
+            'root': '/srv',
+            'data': '%(root)s/data',
+        },
+        'db.main': {
+            'path': '%(data)s/%(name)s.db',
+            'name': 'main',
+        },
+        'db.other': {
+            'path': '%(root)s/other.db',
+        }
+    }
+
+    def _sections(self, previous=None, changes=None):
+        data = dict((name, dict(values)) for name, values
+                    in self.DATA.items())
+        for section_name, values in (changes or {}).items():
+            data[section_name].update(values)
+        sections = Sections(data, previous)
+        sections._interpolation = mock.Mock(wraps=sections._interpolation)
+        return sections
+
+    def _count(self, sections):
+        return sections._interpolation.before_get.call_count
+
+    def test_resolved_once(self):
+        sections = self._sections()
+        for x in range(0, 3):
+            self.assertEqual('/srv/data/main.db',
+                             sections['db.main']['path'])
+            self.assertEqual('/srv/data/main.db',
+                             sections.get('db.main', 'path'))
+        self.assertEqual(1, self._count(sections))
+
+    def test_reused_when_unchanged(self):
+        sections = self._sections()
+        sections['db.main']['path']
+        sections['db.other']['path']
+        sections = self._sections(sections)
+        self.assertEqual('/srv/data/main.db', sections['db.main']['path'])
+        self.assertEqual('/srv/other.db', sections['db.other']['path'])
+        self.assertEqual(0, self._count(sections))
+
+    def test_dependency_changed(self):
+        sections = self._sections()
+        sections['db.main']['path']
+        sections['db.other']['path']
+        sections = self._sections(sections, {'db.main': {'name': 'new'}})
+        self.assertEqual('/srv/other.db', sections['db.other']['path'])
+        self.assertEqual(0, self._count(sections))
+        self.assertEqual('/srv/data/new.db', sections['db.main']['path'])
+        self.assertEqual(1, self._count(sections))
+
+    def test_nested_dependency_changed(self):
+        sections = self._sections()
+        sections['db.main']['path']
+        sections = self._sections(sections, {'DEFAULT': {'root': '/opt'}})
+        self.assertEqual('/opt/data/main.db', sections['db.main']['path'])
+
+    def test_raw_value_changed(self):
+        sections = self._sections()
+        sections['db.other']['path']
+        sections = self._sections(
+                        sections, {'db.other': {'path': '%(root)s/moved.db'}})
+        self.assertEqual('/srv/moved.db', sections['db.other']['path'])
+
+    def test_shadowed_by_section(self):
+        sections = self._sections()
+        sections['db.other']['path']
+        sections = self._sections(sections, {'db.other': {'root': '/home'}})
+        self.assertEqual('/home/other.db', sections['db.other']['path'])
+
+
+class TestForEnvironment(unittest.TestCase):
+
+    DATA = {
+        'DEFAULT': {'root': '/srv'},
+        'server': {'env': 'prod'},
+        'db.main': {'host': 'localhost', 'host.prod': 'db.example.com',
+                    'path': '%(root)s/db'},
+        'db.main.prod': {'root': '/data'},
+    }
+
+    def test_environment(self):
+        self.assertEqual(Sections(self.DATA).environment, 'prod')
+
+    def test_active_environment(self):
+        view = Sections(self.DATA).for_environment()
+        self.assertEqual(view['db.main']['host'], 'db.example.com')
+        self.assertEqual(view['db.main']['path'], '/data/db')
+        self.assertNotIn('db.main.prod', view)
+
+    def test_given_environment(self):
+        view = Sections(self.DATA).for_environment('dev')
+        self.assertEqual(view['db.main']['host'], 'localhost')
+        self.assertEqual(view['db.main']['path'], '/srv/db')
+
+    def test_view_is_kept(self):
+        sections = Sections(self.DATA)
+        self.assertIs(sections.for_environment(),
+                      sections.for_environment('prod'))
+
+    def test_reload_reuses_resolved_values(self):
+        first = Sections(self.DATA)
+        view = first.for_environment()
+        view['db.main']['path']
+        second = Sections(self.DATA, first).for_environment()
+        self.assertIsNot(second, view)
+        self.assertEqual(second['db.main']['path'], '/data/db')
+        self.assertIs(second._resolved[('db.main', 'path')],
+                      view._resolved[('db.main', 'path')])
@@ -0,0 +1,156 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from dodai.parse import shared
+from dodai.parse.shared import SharedConfig
+from dodai.parse.sections import Sections
+from dodai.parse.publish import Published
+
+
+class TestSharedConfig(unittest.TestCase):
+
+    DATA = {
+        'DEFAULT': {
+            'root': '/srv',
+        },
+        'db.main': {
+            'path': '%(root)s/main.db',
+        },
+        'db.other': {
+            'path': '%(root)s/other.db',
+        }
+    }
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.shared = SharedConfig.load('test', self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_nothing_published(self):
+        self.assertEqual(0, self.shared.generation)
+        self.assertIsNone(self.shared.current)
+
+    def test_publish_and_attach(self):
+        self.assertEqual(1, self.shared.publish(Sections(self.DATA)))
+        reader = SharedConfig(self.shared.path)
+        sections = reader.current
+        self.assertEqual(['db.main', 'db.other'], sections.sections())
+        self.assertEqual([], sections.parsed)
+        self.assertEqual('/srv/main.db', sections['db.main']['path'])
+        self.assertEqual(['db.main'], sections.parsed)
+        self.assertEqual(self.DATA, sections.to_dict())
+        self.assertIs(sections, reader.current)
+
+    def test_generation(self):
+        reader = SharedConfig(self.shared.path)
+        self.shared.publish(self.DATA)
+        first = reader.current
+        self.assertEqual(1, reader.generation)
+        data = dict(self.DATA, DEFAULT={'root': '/opt'})
+        self.assertEqual(2, self.shared.publish(data))
+        self.assertEqual(2, reader.generation)
+        second = reader.current
+        self.assertIsNot(first, second)
+        self.assertEqual('/opt/main.db', second['db.main']['path'])
+        self.assertEqual('/srv/main.db', first['db.main']['path'])
+
+    def test_old_generations_removed(self):
+        for x in range(0, 4):
+            self.shared.publish(self.DATA)
+        names = sorted(os.listdir(self.directory))
+        name = os.path.basename(self.shared.path)
+        self.assertEqual([name, name + '.3', name + '.4'], names)
+
+    def test_subscriber(self):
+        published = Published()
+        published.subscribe(self.shared.subscriber)
+        published.publish(Sections(self.DATA))
+        self.assertEqual(1, SharedConfig(self.shared.path).generation)
+
+    def test_private_directory(self):
+        with mock.patch.object(shared, 'SHM_DIRECTORY', self.directory):
+            path = SharedConfig.load('test').path
+        directory = os.path.join(self.directory,
+                                 'dodai-{0}'.format(os.getuid()))
+        self.assertEqual(os.path.join(directory, 'test.config'), path)
+        self.assertEqual(0o700, os.stat(directory).st_mode & 0o777)
+
+    def test_unsafe_directory_is_not_used(self):
+        directory = os.path.join(self.directory,
+                                 'dodai-{0}'.format(os.getuid()))
+        os.mkdir(directory)
+        os.chmod(directory, 0o777)
+        with mock.patch.object(shared, 'SHM_DIRECTORY', self.directory):
+            path = SharedConfig.load('test').path
+        self.assertFalse(path.startswith(self.directory))
+
+    def test_symlink_is_not_followed(self):
+        other = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, other)
+        publisher = SharedConfig.load('test', other)
+        publisher.publish(self.DATA)
+        os.symlink(publisher.path, self.shared.path)
+        os.symlink(publisher.path + '.1', self.shared.path + '.1')
+        self.assertEqual(0, self.shared.generation)
+        self.assertIsNone(self.shared.current)
+        with self.assertRaises(OSError):
+            self.shared.publish(self.DATA)
+        self.assertEqual(1, publisher.generation)
+
+    def test_files_of_other_users_are_not_read(self):
+        self.shared.publish(self.DATA)
+        reader = SharedConfig(self.shared.path)
+        with mock.patch('os.getuid', return_value=os.getuid() + 1):
+            self.assertEqual(0, reader.generation)
+            self.assertIsNone(reader.current)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs os.fork')
+    def test_fork(self):
+        self.shared.publish(self.DATA)
+        self.shared.current
+        read, write = os.pipe()
+        pid = os.fork()
+        if not pid:
+            try:
+                os.close(read)
+                # Waits for the master to publish again
+                deadline = time.monotonic() + 5
+                while self.shared.generation < 2 and \
+                        time.monotonic() < deadline:
+                    time.sleep(0.001)
+                value = self.shared.current['db.main']['path']
+                os.write(write, value.encode())
+            finally:
+                os._exit(0)
+        os.close(write)
+        self.shared.publish(dict(self.DATA, DEFAULT={'root': '/opt'}))
+        with os.fdopen(read, 'rb') as f:
+            value = f.read().decode()
+        os.waitpid(pid, 0)
+        self.assertEqual('/opt/main.db', value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>
+
+import os
+import unittest
+import tempfile
+from dodai.parse import layer
+from dodai.parse.ini import ParseIni
+from dodai.parse.snapshot import ParseSnapshot
+
+
+class _CountingParseIni(ParseIni):
+
+    parsed = 0
+
+    def _parse(self, file_, content):
+        _CountingParseIni.parsed += 1
+        return super(_CountingParseIni, self)._parse(file_, content)
+
+
+class TestParseSnapshot(unittest.TestCase):
+
+    PROJECT = '__test__dodai__snapshot__'
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.files = []
+        for x in range(0, 3):
+            path = os.path.join(self._tmp.name, 'conf{0}.ini'.format(x))
+            self._write(path, "[DEFAULT]\nvalue = {0}\n[file{0}]\nkey = "
+                              "%(value)s\n".format(x))
+            self.files.append(path)
+        _CountingParseIni.parsed = 0
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _process(self):
+        """Returns a ParseIni like a new process would have
+        """
+        snapshot = ParseSnapshot(os.path.join(self._tmp.name, 'snapshot'))
+        return _CountingParseIni(self.PROJECT, snapshot)
+
+    def _write(self, path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+        os.utime(path, (1000000000, 1000000000))
+
+    def test_matches_configparser(self):
+        sections = self._process().sections(self.files)
+        parser = ParseIni(self.PROJECT)(self.files)
+        for section_name in parser:
+            self.assertEqual(dict(sections[section_name]),
+                             dict(parser[section_name]))
+
+    def test_snapshot_skips_parsing(self):
+        first = self._process().sections(self.files)
+        second = self._process().sections(self.files)
+        self.assertEqual(_CountingParseIni.parsed, 3)
+        self.assertEqual(second.to_dict(), first.to_dict())
+        self.assertEqual(second['file2']['key'], '2')
+
+    def test_only_changed_file_is_parsed(self):
+        self._process().sections(self.files)
+        self._write(self.files[1], "[DEFAULT]\nvalue = changed\n")
+        parse_ini = self._process()
+        sections = parse_ini.sections(self.files)
+        self.assertEqual(parse_ini.parsed_files, [self.files[1]])
+        self.assertEqual(sections['DEFAULT']['value'], '2')
+        self.assertNotIn('file1', sections)
+        self.assertEqual(_CountingParseIni.parsed, 4)
+
+    def test_touched_file_uses_digest(self):
+        self._process().sections(self.files)
+        os.utime(self.files[0], (1000000005, 1000000005))
+        self._process().sections(self.files)
+        self.assertEqual(_CountingParseIni.parsed, 3)
+
+    def test_replaced_with_same_size_and_mtime(self):
+        self.addCleanup(setattr, layer, 'RACY_SECONDS', layer.RACY_SECONDS)
+        layer.RACY_SECONDS = 0
+        self._process().sections(self.files)
+        path = self.files[2] + '.new'
+        self._write(path, "[DEFAULT]\nvalue = 9\n[file9]\nkey = "
+                          "%(value)s\n")
+        os.replace(path, self.files[2])
+        sections = self._process().sections(self.files)
+        self.assertEqual(sections['file9']['key'], '9')
+
+    def test_different_file_list_reuses_layers(self):
+        self._process().sections(self.files)
+        sections = self._process().sections(self.files[:2])
+        self.assertEqual(sections['DEFAULT']['value'], '1')
+        self.assertEqual(_CountingParseIni.parsed, 3)
+
+    def test_dictionary_is_not_stored(self):
+        self._process().sections(self.files, {'extra': {'Key': 1}})
+        sections = self._process().sections(self.files)
+        self.assertNotIn('extra', sections)
+
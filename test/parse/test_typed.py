@@ -0,0 +1,149 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>
+
+import unittest
+import configparser
+from unittest import mock
+from dodai.parse import typed
+from dodai.parse.sections import Sections
+from dodai.validate.ignore import ShouldIgnore
+from dodai.validate.field.port import IsValidPort
+
+
+class TestConverters(unittest.TestCase):
+
+    def test_duration(self):
+        self.assertEqual(90.0, typed.to_duration('90'))
+        self.assertEqual(0.25, typed.to_duration('250ms'))
+        self.assertEqual(5400.0, typed.to_duration('1h 30m'))
+        self.assertEqual(5400.0, typed.to_duration('1.5H'))
+        self.assertEqual(86400.0 + 1, typed.to_duration('1d1s'))
+        for value in ('', 'm', '1 30', '5 minutes', '-1s'):
+            with self.assertRaises(ValueError):
+                typed.to_duration(value)
+
+    def test_size(self):
+        self.assertEqual(512, typed.to_size('512'))
+        self.assertEqual(10000, typed.to_size('10KB'))
+        self.assertEqual(4096, typed.to_size('4 KiB'))
+        self.assertEqual(1024 ** 3, typed.to_size('1g'))
+        self.assertEqual(1536, typed.to_size('1.5k'))
+        for value in ('', 'KB', '10 ib', '10 bytes'):
+            with self.assertRaises(ValueError):
+                typed.to_size(value)
+
+    def test_list(self):
+        self.assertEqual(('a', 'b', 'c'), typed.to_list('a, b,,\n c\n'))
+        self.assertEqual((), typed.to_list(''))
+
+    def test_url(self):
+        url = typed.to_url('postgresql://user@db.example.com:5432/main')
+        self.assertEqual('postgresql', url.scheme)
+        self.assertEqual(5432, url.port)
+        with self.assertRaises(ValueError):
+            typed.to_url('db.example.com')
+
+
+class TestTypedView(unittest.TestCase):
+
+    DATA = {
+        'DEFAULT': {
+            'timeout': '30s',
+        },
+        'db.main': {
+            'port': '5432',
+            'debug': 'yes',
+            'hosts': 'one, two',
+            'bad': 'nope',
+            'ignore': 'Yes',
+        }
+    }
+
+    def setUp(self):
+        self.sections = Sections(dict((name, dict(values)) for name, values
+                                      in self.DATA.items()))
+
+    def test_converted_once(self):
+        converter = mock.Mock(return_value=1)
+        view = self.sections.typed
+        for x in range(0, 3):
+            self.assertEqual(1, view.get('db.main', 'port', converter))
+        converter.assert_called_once_with('5432')
+
+    def test_getters(self):
+        view = self.sections.typed
+        self.assertEqual(5432, view.getint('db.main', 'port'))
+        self.assertEqual(5432.0, view.getfloat('db.main', 'port'))
+        self.assertTrue(view.getboolean('db.main', 'debug'))
+        self.assertEqual(30.0, view.getduration('db.main', 'timeout'))
+        self.assertEqual(('one', 'two'), view.getlist('db.main', 'hosts'))
+        self.assertEqual(3, view.getint('db.main', 'missing', fallback=3))
+
+    def test_errors(self):
+        view = self.sections.typed
+        for x in range(0, 2):
+            with self.assertRaises(ValueError):
+                view.getint('db.main', 'bad')
+        with self.assertRaises(KeyError):
+            view.getint('db.main', 'missing')
+        with self.assertRaises(KeyError):
+            view.getint('db.other', 'port')
+
+    def test_register(self):
+        view = self.sections.typed
+        view.register('upper', str.upper)
+        self.assertEqual('NOPE', view.get('db.main', 'bad', 'upper'))
+
+    def test_new_view_on_reload(self):
+        view = self.sections.typed
+        self.assertIs(view, self.sections.typed)
+        self.assertIs(view, typed.view(self.sections))
+        reloaded = Sections(self.sections.to_dict(), self.sections)
+        self.assertIsNot(view, reloaded.typed)
+
+    def test_clear(self):
+        data = {'db': {'port': '1'}}
+        view = typed.TypedView(data)
+        self.assertEqual(1, view.getint('db', 'port'))
+        data['db']['port'] = '2'
+        self.assertEqual(1, view.getint('db', 'port'))
+        view.clear()
+        self.assertEqual(2, view.getint('db', 'port'))
+
+    def test_mutable_data_is_not_kept(self):
+        parser = configparser.ConfigParser()
+        parser.read_dict({'db.a': {'port': '1', 'ignore': 'no'}})
+        is_valid_port = IsValidPort.load(parser)
+        should_ignore = ShouldIgnore(parser)
+        self.assertTrue(is_valid_port('db.a'))
+        self.assertFalse(should_ignore('db.a'))
+        parser.set('db.a', 'port', '99999')
+        parser.set('db.a', 'ignore', 'yes')
+        with self.assertRaises(ValueError):
+            is_valid_port('db.a')
+        self.assertTrue(should_ignore('db.a'))
+
+    def test_shared_with_validators(self):
+        view = self.sections.typed
+        self.assertTrue(IsValidPort.load(self.sections)('db.main'))
+        self.assertTrue(ShouldIgnore(self.sections)('db.main'))
+        self.assertTrue(ShouldIgnore(self.sections)('db.main'))
+        self.assertEqual(2, len(view._cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
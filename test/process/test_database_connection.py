@@ -0,0 +1,55 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+from dodai.process.database_connection import DodaiSqlalchemyConnection
+
+
+class _Engine(object):
+
+    def __init__(self, url, **kwargs):
+        self.url = url
+
+    def connect(self):
+        return ('connection', self.url)
+
+
+def _sessionmaker(bind):
+    return lambda: ('session', bind)
+
+
+class TestDodaiSqlalchemyConnection(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = DodaiSqlalchemyConnection(
+                                'test', 'sqlite://', create_engine=_Engine,
+                                sessionmaker=_sessionmaker)
+
+    def test_engine(self):
+        self.assertEqual(self.connection.engine.url, 'sqlite://')
+
+    def test_engine_is_kept(self):
+        self.assertIs(self.connection.engine, self.connection.engine)
+
+    def test_connection(self):
+        self.assertEqual(self.connection.connection,
+                         ('connection', 'sqlite://'))
+
+    def test_session(self):
+        kind, engine = self.connection.session
+        self.assertEqual(kind, 'session')
+        self.assertIs(engine, self.connection.engine)
@@ -0,0 +1,112 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>
+
+import time
+import asyncio
+import unittest
+from test.parse.fixture import ParseIniFixture
+from dodai import aio
+from dodai.util import find
+from dodai.parse.ini import ParseIni
+from dodai.validate.field.port import IsValidPort
+
+
+class TestAio(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._fixture = ParseIniFixture.load()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._fixture.destroy()
+
+    def test_config_files(self):
+        expected = find.config_files(self._fixture.name, ['/nonexistent'])
+        found = asyncio.run(aio.config_files(self._fixture.name,
+                                             ['/nonexistent']))
+        self.assertEqual(expected, found)
+
+    def test_config_files_environment(self):
+        expected = find.config_files(self._fixture.name, environment='prod')
+        found = asyncio.run(aio.config_files(self._fixture.name,
+                                             environment='prod'))
+        self.assertEqual(expected, found)
+
+    def test_sections(self):
+        expected = ParseIni(self._fixture.name).sections(
+                        dictionary={'a': {'b': 1}})
+        parse_ini = aio.AsyncParseIni.load(self._fixture.name)
+        sections = asyncio.run(parse_ini.sections(dictionary={'a': {'b': 1}}))
+        self.assertEqual(expected.to_dict(), sections.to_dict())
+        self.assertEqual(len(parse_ini.parse_ini.loaded_files),
+                         len(parse_ini.parse_ini.parsed_files))
+        reloaded = asyncio.run(parse_ini.reload())
+        self.assertEqual(expected.to_dict(), reloaded.to_dict())
+        self.assertEqual([], parse_ini.parse_ini.parsed_files)
+
+    def test_publish(self):
+        parse_ini = aio.AsyncParseIni.load(self._fixture.name, lazy=True)
+        self.assertIsNone(parse_ini.current)
+
+        async def publish():
+            return await asyncio.gather(parse_ini.publish(),
+                                        parse_ini.publish())
+
+        first, second = asyncio.run(publish())
+        self.assertIs(second, parse_ini.current)
+        self.assertEqual(2, parse_ini.published.generation)
+        self.assertEqual(first.sections(), second.sections())
+
+    def test_loop_keeps_running(self):
+        def opener(name, *args, **kwargs):
+            time.sleep(0.05)
+            return open(name, *args, **kwargs)
+
+        parse_ini = aio.AsyncParseIni.load(self._fixture.name, opener=opener)
+
+        async def run():
+            ticks = 0
+            task = asyncio.ensure_future(parse_ini.sections())
+            while not task.done():
+                ticks += 1
+                await asyncio.sleep(0.01)
+            return ticks, task.result()
+
+        ticks, sections = asyncio.run(run())
+        self.assertGreater(ticks, 2)
+        self.assertTrue(sections.sections())
+
+    def test_validate_sections(self):
+        data = {'a': {'port': '80'}, 'b': {'port': '0'}}
+        validate = IsValidPort.load(data, raise_errors=False)
+        results = asyncio.run(aio.validate_sections(validate, data))
+        self.assertEqual({'a': True, 'b': False}, results)
+        validate = IsValidPort.load(data)
+        with self.assertRaises(ValueError):
+            asyncio.run(aio.validate_sections(validate, data))
+
+    def test_connect(self):
+        class Connection(object):
+            connection = 'connection'
+            session = 'session'
+        self.assertEqual('connection', asyncio.run(aio.connect(Connection())))
+        self.assertEqual('session', asyncio.run(aio.session(Connection())))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from dodai.__main__ import main
+from dodai.compile import CompileBundle
+from dodai.parse.bundle import Bundle
+from dodai.process.url import DatabaseUrl
+
+PROJECT = '__test__dodai__compile__'
+
+
+class TestDatabaseUrl(unittest.TestCase):
+
+    SECTIONS = {
+        'db.file': {'dialect': 'sqlite', 'path': '/srv/main.db'},
+        'db.pg': {'dialect': 'PostgreSQL', 'driver': 'psycopg2',
+                  'host': 'db.example.com', 'port': '5432',
+                  'username': 'user', 'password': 'p@ss/word',
+                  'database': 'main'},
+        'db.bare': {'dialect': 'mysql', 'host': 'localhost'},
+        'db.ipv6': {'dialect': 'postgresql', 'host': '::1', 'port': '5432'},
+    }
+
+    def test_urls(self):
+        url = DatabaseUrl(self.SECTIONS)
+        self.assertEqual('sqlite:////srv/main.db', url('db.file'))
+        self.assertEqual('postgresql+psycopg2://user:p%40ss%2Fword@'
+                         'db.example.com:5432/main', url('db.pg'))
+        self.assertEqual('mysql://localhost', url('db.bare'))
+        self.assertEqual('postgresql://[::1]:5432', url('db.ipv6'))
+
+
+class TestCompile(unittest.TestCase):
+
+    CONFIG = ("[server]\n"
+              "environment = stage\n"
+              "[db.main]\n"
+              "dialect = sqlite\n"
+              "path = /srv/main.db\n"
+              "[db.ignored]\n"
+              "dialect = sqlite\n"
+              "path = /srv/other.db\n"
+              "ignore = yes\n"
+              "[web]\n"
+              "port = 80\n")
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config = os.path.join(self.directory, 'config.ini')
+        with open(self.config, 'w') as f:
+            f.write(self.CONFIG)
+        self.output = os.path.join(self.directory, 'config.bundle')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_compile(self):
+        bundle = CompileBundle.load(PROJECT)([self.config])
+        self.assertEqual('stage', bundle.environment)
+        self.assertEqual(['db.main'], bundle.databases)
+        self.assertEqual('sqlite:////srv/main.db', bundle.url('db.main'))
+        self.assertNotIn('sqlite:', repr(bundle.dumps()))
+        self.assertIn(self.config, bundle.files)
+        self.assertEqual('80', bundle.data['web']['port'])
+
+    def test_invalid_database(self):
+        with open(self.config, 'a') as f:
+            f.write("[db.bad]\ndialect = nosql\n")
+        with self.assertRaises(ValueError):
+            CompileBundle.load(PROJECT)([self.config])
+        bundle = CompileBundle.load(PROJECT, validate=False)([self.config])
+        self.assertNotIn('db.bad', bundle.databases)
+        self.assertFalse(bundle.validated)
+
+    def test_command(self):
+        stdout = io.StringIO()
+        with mock.patch('sys.stdout', stdout):
+            code = main(['compile', PROJECT, '-f', self.config,
+                         '-o', self.output])
+        self.assertEqual(0, code)
+        self.assertIn(self.output, stdout.getvalue())
+        self.assertEqual('stage', Bundle.load(self.output).environment)
+
+    def test_command_error(self):
+        with open(self.config, 'a') as f:
+            f.write("[db.bad]\ndialect = nosql\n")
+        stderr = io.StringIO()
+        with mock.patch('sys.stderr', stderr):
+            code = main(['compile', PROJECT, '-f', self.config,
+                         '-o', self.output])
+        self.assertEqual(1, code)
+        self.assertIn('nosql', stderr.getvalue())
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_command_default_output(self):
+        with open(self.config, 'a') as f:
+            f.write("[DEFAULT]\nroot = /srv\n")
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.directory)
+        stdout = io.StringIO()
+        with mock.patch('sys.stdout', stdout):
+            code = main(['compile', PROJECT, '-f', self.config])
+        self.assertEqual(0, code)
+        self.assertIn('4 sections', stdout.getvalue())
+        bundle = Bundle.load(os.path.join(self.directory,
+                                          PROJECT + '.bundle'))
+        self.assertTrue(bundle.validated)
+
+    def test_compile_ignores_bundle_and_environ(self):
+        with mock.patch.dict(os.environ, {
+                'DODAI_BUNDLE': os.path.join(self.directory, 'missing'),
+                'DODAI_FROM_ENVIRON': '1'}):
+            bundle = CompileBundle.load(PROJECT)([self.config])
+        self.assertIn(self.config, bundle.files)
+        self.assertIn('db.main', bundle.databases)
+
+
+if __name__ == '__main__':
+    unittest.main()
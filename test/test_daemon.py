@@ -0,0 +1,199 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>
+
+import os
+import time
+import shutil
+import threading
+import socket
+import tempfile
+import unittest
+from unittest import mock
+from dodai import daemon
+from dodai.parse.ini import ParseIni
+
+PROJECT = '__test__dodai__daemon__'
+
+
+class TestFrames(unittest.TestCase):
+
+    def test_round_trip(self):
+        one, two = socket.socketpair()
+        with one, two:
+            daemon.send_frame(one, daemon.DATA, 7, b'x' * 100000)
+            self.assertEqual((daemon.DATA, 7, b'x' * 100000),
+                             daemon.read_frame(two))
+            one.close()
+            self.assertIsNone(daemon.read_frame(two))
+
+
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config = os.path.join(self.directory, 'config.ini')
+        self._write("[db]\nhost = one\n")
+        self.path = os.path.join(self.directory, 'daemon.sock')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, text):
+        with open(self.config, 'w') as f:
+            f.write(text)
+
+    def _parse_ini(self):
+        parse_ini = ParseIni(PROJECT)
+        parse_ini.sections([self.config])
+        return parse_ini
+
+    def _daemon(self, validate=None, log=None):
+        return daemon.ConfigDaemon(self._parse_ini(), self.path, validate,
+                                   watch=False, log=log)
+
+    def _client(self):
+        client = daemon.ConfigClient(self.path, self._parse_ini(), 1.0)
+        self.addCleanup(client.close)
+        return client
+
+    def _wait(self, func):
+        deadline = time.monotonic() + 5
+        while not func() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return func()
+
+    def test_serves_sections(self):
+        with self._daemon():
+            client = self._client()
+            sections = client.current
+            self.assertTrue(client.connected)
+            self.assertEqual('one', sections['db']['host'])
+            self.assertIs(sections, client.current)
+
+    def test_invalidation(self):
+        with self._daemon() as config_daemon:
+            client = self._client()
+            first = client.current
+            self._write("[db]\nhost = two\n")
+            generation = config_daemon.reload()
+            self.assertTrue(self._wait(lambda: client._latest == generation))
+            self.assertEqual('two', client.current['db']['host'])
+            self.assertEqual('one', first['db']['host'])
+
+    def test_fallback(self):
+        client = self._client()
+        self.assertEqual('one', client.current['db']['host'])
+        self.assertFalse(client.connected)
+
+    def test_daemon_goes_away(self):
+        config_daemon = self._daemon().start()
+        client = self._client()
+        client.current
+        config_daemon.stop()
+        self.assertTrue(self._wait(lambda: not client.connected))
+        self._write("[db]\nhost = two\n")
+        self.assertEqual('two', client.current['db']['host'])
+        self.assertFalse(client.connected)
+
+    def test_daemon_comes_back(self):
+        client = self._client()
+        client.RETRY = 0
+        self.assertFalse(client.connected)
+        with self._daemon():
+            client.current
+            self.assertTrue(client.connected)
+
+    def test_invalid_config_is_not_published(self):
+        log = mock.Mock()
+        validate = mock.Mock(side_effect=[None, ValueError('bad')])
+        with self._daemon(validate, log) as config_daemon:
+            client = self._client()
+            client.current
+            self._write("[db]\nhost = two\n")
+            self.assertIsNone(config_daemon.reload())
+            self.assertTrue(log.exception.called)
+            self.assertEqual('one', client.current['db']['host'])
+
+    def test_no_config_until_one_is_valid(self):
+        log = mock.Mock()
+        validate = mock.Mock(side_effect=[ValueError('bad'), None])
+        with self._daemon(validate, log) as config_daemon:
+            self.assertIsNone(config_daemon.payload)
+            client = self._client()
+            client.RETRY = 0
+            self.assertEqual('one', client.current['db']['host'])
+            self.assertFalse(client.connected)
+            self._write("[db]\nhost = two\n")
+            self.assertEqual(1, config_daemon.reload())
+            self.assertEqual('two', client.current['db']['host'])
+            self.assertTrue(client.connected)
+
+    def test_parse_error_keeps_the_last_config(self):
+        log = mock.Mock()
+        with self._daemon(log=log) as config_daemon:
+            client = self._client()
+            client.current
+            self._write("not an ini file\n")
+            self.assertIsNone(config_daemon.reload())
+            self.assertTrue(log.exception.called)
+            self.assertEqual('one', client.current['db']['host'])
+            self.assertTrue(client.connected)
+
+    def test_database_sections_are_validated_by_default(self):
+        config_daemon = daemon.ConfigDaemon.load(PROJECT, self.path,
+                                                 watch=False)
+        self.assertIs(daemon.validate_sections, config_daemon._validate)
+        config_daemon = daemon.ConfigDaemon.load(PROJECT, self.path,
+                                                 validate=False, watch=False)
+        self.assertIsNone(config_daemon._validate)
+
+    def test_invalid_database_section_is_not_published(self):
+        log = mock.Mock()
+        self._write("[server]\nhost = one\n")
+        with self._daemon(daemon.validate_sections, log) as config_daemon:
+            self.assertEqual(1, config_daemon.generation)
+            self._write("[db.main]\ndialect = nope\n")
+            self.assertIsNone(config_daemon.reload())
+            self.assertTrue(log.exception.called)
+            self.assertEqual(1, config_daemon.generation)
+
+    def test_frames_to_a_subscriber_are_serialized(self):
+        config_daemon = self._daemon()
+        sock = mock.Mock()
+        lock = config_daemon._subscribe(sock)
+        lock.acquire()
+        thread = threading.Thread(target=config_daemon._notify, args=(2,))
+        thread.start()
+        try:
+            thread.join(0.1)
+            self.assertFalse(sock.sendall.called)
+        finally:
+            lock.release()
+            thread.join()
+        self.assertTrue(sock.sendall.called)
+
+    def test_main_logs_errors(self):
+        with mock.patch.object(daemon.ConfigDaemon, 'load') as load:
+            load.return_value.path = self.path
+            load.return_value.serve_forever.side_effect = KeyboardInterrupt
+            with mock.patch('sys.stdout'):
+                self.assertEqual(0, daemon.main([PROJECT]))
+        self.assertIsNotNone(load.call_args[1]['log'])
+
+
+if __name__ == '__main__':
+    unittest.main()
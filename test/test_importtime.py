@@ -0,0 +1,71 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import subprocess
+import unittest
+
+# The modules a config-only tool imports
+CONFIG_MODULES = ('dodai.util.find', 'dodai.parse.ini',
+                  'dodai.acquire.environment', 'dodai.validate.database')
+
+# Microseconds the config-only modules may take to import, sqlalchemy
+# alone takes several times this
+BUDGET = 250000
+
+
+def importtime(modules):
+    """Returns {module: cumulative microseconds} of a fresh interpreter
+    importing the given modules, as reported by python -X importtime
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import {0}".format(', '.join(modules))
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                             cwd=root, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE, universal_newlines=True)
+    if process.returncode:
+        raise AssertionError(process.stderr)
+    out = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_time, cumulative, name = line[12:].split('|')
+        if cumulative.strip().isdigit():
+            out[name.strip()] = int(cumulative)
+    return out
+
+
+class TestConfigOnlyImports(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.times = importtime(CONFIG_MODULES)
+
+    def test_sqlalchemy_is_not_imported(self):
+        for name in self.times:
+            self.assertFalse(name.split('.')[0] == 'sqlalchemy', name)
+
+    def test_database_connection_does_not_import_sqlalchemy(self):
+        times = importtime(('dodai.process.database_connection',))
+        for name in times:
+            self.assertFalse(name.split('.')[0] == 'sqlalchemy', name)
+
+    def test_budget(self):
+        total = sum(self.times[name] for name in CONFIG_MODULES
+                    if name in self.times)
+        self.assertLess(total, BUDGET)
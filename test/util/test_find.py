@@ -71,6 +71,45 @@ class TestBasicFind(unittest.TestCase):
             self.assertGreater(len(encoding), 0)
 
 
+class TestEnvironmentProbe(unittest.TestCase):
+
+    def setUp(self):
+        self.project = 'test'
+        self.probe = find.EnvironmentProbe()
+
+    def test_values_match_the_functions(self):
+        self.assertEqual(self.probe.tmp_directory, find.tmp_directory())
+        self.assertEqual(self.probe.home_directory, find.home_directory())
+        self.assertEqual(self.probe.encoding, find.system_encoding())
+        self.assertEqual(self.probe.system, platform.system())
+
+    def test_probed_once(self):
+        calls = []
+        def probe():
+            calls.append(1)
+            return 'value'
+        self.assertEqual(self.probe._get('name', probe), 'value')
+        self.assertEqual(self.probe._get('name', probe), 'value')
+        self.assertEqual(len(calls), 1)
+
+    def test_reset(self):
+        self.probe._values['tmp_directory'] = 'stale'
+        self.assertEqual(self.probe.tmp_directory, 'stale')
+        self.probe.reset()
+        self.assertEqual(self.probe.tmp_directory, tempfile.gettempdir())
+
+    def test_reset_probes(self):
+        find.probe._values['system'] = 'Windows'
+        try:
+            self.assertIsNone(find.system_config_directory())
+        finally:
+            find.reset_probes()
+        self.assertEqual(find.system_config_directory(self.project),
+                         os.path.join(os.path.sep, 'etc', self.project)
+                         if platform.system() not in ('Windows', 'Java')
+                         else None)
+
+
 class TestFindConfigFiles(unittest.TestCase):
 
     @classmethod
@@ -163,3 +202,84 @@ class TestFindConfigFiles(unittest.TestCase):
         for name in self._fixture.bogus_filenames:
             msg = error_message.format(name)
             self.assertFalse(name in loaded_files, msg=msg)
+
+
+class TestConfigFilesScan(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.first = os.path.join(self._tmp.name, 'first')
+        self.second = os.path.join(self._tmp.name, 'second')
+        os.mkdir(self.first)
+        os.mkdir(self.second)
+        for directory, names in ((self.first, ('db.ini', 'config', 'x.ini')),
+                                 (self.second, ('.cfg.txt', 'cfg'))):
+            for name in names:
+                with open(os.path.join(directory, name), 'w') as f:
+                    pass
+        os.mkdir(os.path.join(self.second, 'setup.cfg'))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _names(self, directories, filenames=None):
+        obj = find.ConfigFiles(directories, 'utf-8')
+        return [config_file.name for config_file in obj(filenames)]
+
+    def test_precedence_order(self):
+        missing = os.path.join(self._tmp.name, 'missing')
+        names = self._names([self.first, None, missing, self.second])
+        self.assertEqual(names, [
+            os.path.join(self.first, 'config'),
+            os.path.join(self.first, 'db.ini'),
+            os.path.join(self.second, '.cfg.txt'),
+            os.path.join(self.second, 'cfg'),
+        ])
+
+    def test_custom_filenames_come_first(self):
+        custom = os.path.join(self.first, 'x.ini')
+        names = self._names([self.second], [(custom, 'latin-1')])
+        self.assertEqual(names[0], custom)
+
+    def test_symlinked_file_is_loaded_once(self):
+        target = os.path.join(self.first, 'db.ini')
+        os.symlink(target, os.path.join(self.second, 'server.ini'))
+        names = self._names([self.first, self.second])
+        self.assertNotIn(target, names)
+        self.assertIn(os.path.join(self.second, 'server.ini'), names)
+
+
+class TestConfigFilesOverlays(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+        for name in ('config.ini', 'config.prod.ini', 'config.stage.ini',
+                     '.db.prod.cfg', 'server', 'server.prod', 'db.ini'):
+            with open(os.path.join(self.directory, name), 'w') as f:
+                pass
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _names(self, environment=None):
+        obj = find.ConfigFiles([self.directory], 'utf-8')
+        return [os.path.basename(config_file.name) for config_file
+                in obj(environment=environment)]
+
+    def test_no_environment(self):
+        self.assertEqual(self._names(), ['config.ini', 'db.ini', 'server'])
+
+    def test_overlays_follow_their_base(self):
+        self.assertEqual(self._names('prod'), [
+            'config.ini', 'config.prod.ini', '.db.prod.cfg', 'db.ini',
+            'server', 'server.prod'])
+
+    def test_other_environments_are_skipped(self):
+        self.assertEqual(self._names('stage'), [
+            'config.ini', 'config.stage.ini', 'db.ini', 'server'])
+
+    def test_overlay_ranks_are_kept(self):
+        obj = find.ConfigFiles([self.directory], 'utf-8')
+        self.assertIs(obj.overlay_ranks('prod'), obj.overlay_ranks('prod'))
+        self.assertIn('.config.prod.txt', obj.overlay_ranks('prod'))
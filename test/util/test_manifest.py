@@ -0,0 +1,94 @@
+# Copyright (C) 2012  Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import unittest
+import tempfile
+from dodai.util import find
+from dodai.util.manifest import DiscoveryManifest
+
+
+class _CountingConfigFiles(find.ConfigFiles):
+
+    calls = 0
+
+    def __call__(self, filenames=None, environment=None):
+        self.calls += 1
+        return super(_CountingConfigFiles, self).__call__(filenames,
+                                                          environment)
+
+
+class TestDiscoveryManifest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self._tmp.name, 'config')
+        os.mkdir(self.directory)
+        self._touch('db.ini')
+        self._age(self.directory)
+        path = os.path.join(self._tmp.name, 'cache', 'discovery.json')
+        self.manifest = DiscoveryManifest(path)
+        self.config_files = _CountingConfigFiles([self.directory], 'utf-8')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _touch(self, name):
+        with open(os.path.join(self.directory, name), 'w') as f:
+            pass
+
+    def _age(self, path):
+        os.utime(path, (1000000000, 1000000000))
+
+    def _names(self, files):
+        return [os.path.basename(file_.name) for file_ in files]
+
+    def test_reuses_manifest(self):
+        first = self.manifest(self.config_files)
+        second = self.manifest(self.config_files)
+        self.assertEqual(first, second)
+        self.assertEqual(self._names(second), ['db.ini'])
+        self.assertEqual(self.config_files.calls, 1)
+
+    def test_added_file_invalidates(self):
+        self.manifest(self.config_files)
+        self._touch('config.ini')
+        os.utime(self.directory, (1000000001, 1000000001))
+        files = self.manifest(self.config_files)
+        self.assertEqual(self._names(files), ['config.ini', 'db.ini'])
+        self.assertEqual(self.config_files.calls, 2)
+
+    def test_removed_file_invalidates(self):
+        self.manifest(self.config_files)
+        os.remove(os.path.join(self.directory, 'db.ini'))
+        # Even with the old directory mtime the missing file is noticed
+        self._age(self.directory)
+        self.assertEqual(self.manifest(self.config_files), [])
+
+    def test_racy_directory_is_not_recorded(self):
+        os.utime(self.directory)
+        self.manifest(self.config_files)
+        self.assertFalse(os.path.exists(self.manifest.path))
+
+    def test_different_filenames_are_not_reused(self):
+        custom = os.path.join(self._tmp.name, 'custom.ini')
+        with open(custom, 'w') as f:
+            pass
+        self.manifest(self.config_files)
+        files = self.manifest(self.config_files, [custom])
+        self.assertEqual(files[0].name, custom)
+        self.assertEqual(self.config_files.calls, 2)
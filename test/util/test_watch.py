@@ -0,0 +1,156 @@
+# Copyright (C) 2012  Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+import unittest
+import tempfile
+import warnings
+import threading
+from dodai.util import watch
+
+
+class _BaseWatcherTest(object):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self._tmp.name, 'config')
+        self.other = os.path.join(self._tmp.name, 'other')
+        os.mkdir(self.directory)
+        os.mkdir(self.other)
+        self.loaded = os.path.join(self.other, 'custom.ini')
+        self._write(self.loaded)
+        self.missing = os.path.join(self._tmp.name, 'later', 'config')
+        self.events = []
+        self._fired = threading.Event()
+        self.watcher = watch.ConfigWatcher([self.directory, self.missing],
+                                           [self.loaded],
+                                           ('db.ini', 'config.ini'),
+                                           self._callback, self.backend(),
+                                           debounce=0.05)
+        self.watcher.start()
+
+    def tearDown(self):
+        self.watcher.stop()
+        self._tmp.cleanup()
+
+    def _callback(self, event):
+        self.events.append(event)
+        self._fired.set()
+
+    def _write(self, path, text='[main]\n'):
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def _wait(self, timeout=3):
+        fired = self._fired.wait(timeout)
+        self._fired.clear()
+        return fired
+
+    def test_new_candidate_file(self):
+        path = os.path.join(self.directory, 'db.ini')
+        self._write(path)
+        self.assertTrue(self._wait())
+        self.assertIn(path, self.events[0].paths)
+        self.assertGreaterEqual(self.events[0].latency, 0)
+
+    def test_loaded_file_outside_config_directories(self):
+        self._write(self.loaded, '[main]\nfoo = bar\n')
+        self.assertTrue(self._wait())
+        self.assertEqual(self.events[0].paths, (self.loaded,))
+
+    def test_unrelated_file_is_ignored(self):
+        self._write(os.path.join(self.directory, 'notes.txt'))
+        self._write(os.path.join(self.other, 'db.ini'))
+        self.assertFalse(self._wait(0.5))
+
+    def test_changes_are_debounced(self):
+        for name in ('db.ini', 'config.ini'):
+            self._write(os.path.join(self.directory, name))
+        self.assertTrue(self._wait())
+        time.sleep(0.3)
+        paths = set()
+        for event in self.events:
+            paths.update(event.paths)
+        self.assertEqual(len(paths), 2)
+        self.assertLessEqual(len(self.events), 2)
+
+    def test_directory_created_later(self):
+        os.makedirs(self.missing)
+        path = os.path.join(self.missing, 'db.ini')
+        self._write(path)
+        self.assertTrue(self._wait())
+        paths = set()
+        for event in self.events:
+            paths.update(event.paths)
+        self.assertTrue(paths.intersection([self.missing, path]))
+        self.events = []
+        time.sleep(0.2)
+        self._fired.clear()
+        path = os.path.join(self.missing, 'config.ini')
+        self._write(path)
+        self.assertTrue(self._wait())
+        self.assertIn(path, self.events[0].paths)
+
+    def test_failing_callback_does_not_stop_the_watcher(self):
+        self.failures = 0
+
+        def callback(event):
+            if not self.failures:
+                self.failures += 1
+                raise RuntimeError('bad config')
+            self._callback(event)
+
+        self.watcher._callback = callback
+        path = os.path.join(self.directory, 'db.ini')
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self._write(path)
+            time.sleep(0.5)
+        self.assertEqual(1, self.failures)
+        self.assertIn('bad config', str(caught[0].message))
+        self.assertTrue(self.watcher._thread.is_alive())
+        self._write(os.path.join(self.directory, 'config.ini'))
+        self.assertTrue(self._wait())
+
+
+@unittest.skipUnless(watch._InotifyBackend.load(), "inotify not available")
+class TestInotifyWatcher(_BaseWatcherTest, unittest.TestCase):
+
+    def backend(self):
+        return watch._InotifyBackend.load()
+
+
+class TestPollingWatcher(_BaseWatcherTest, unittest.TestCase):
+
+    def backend(self):
+        return watch._PollingBackend(interval=0.02)
+
+    def test_wake_without_a_pipe(self):
+        backend = watch._PollingBackend(interval=5)
+        threading.Timer(0.05, backend.wake).start()
+        start = time.monotonic()
+        self.assertEqual([], backend.wait(None))
+        self.assertLess(time.monotonic() - start, 1)
+
+    def _write(self, path, text='[main]\n'):
+        # Make sure the mtime moves even on coarse timestamp filesystems
+        super(TestPollingWatcher, self)._write(path, text)
+        self._offset = getattr(self, '_offset', 0) + 1
+        stamp = time.time() + self._offset
+        os.utime(path, (stamp, stamp))
+        os.utime(os.path.dirname(path), (stamp, stamp))
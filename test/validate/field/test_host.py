@@ -16,8 +16,33 @@
 # You should have received a copy of the GNU General Public License
 # along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
 
+import sys
+import time
+import socket
+import subprocess
+import threading
 import unittest
 from dodai.validate.field.host import IsValidHost
+from dodai.validate.field.host import ResolveHosts
+from dodai.validate.field.host import HostTimeout
+
+
+class StubResolver(object):
+    """Resolves hosts from a dictionary of host to seconds it takes, hosts
+    that are not in it do not resolve
+    """
+
+    def __init__(self, delays):
+        self._delays = delays
+        self.calls = []
+
+    def __call__(self, host):
+        self.calls.append(host)
+        if host not in self._delays:
+            raise socket.gaierror(host)
+        time.sleep(self._delays[host])
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '',
+                 ('127.0.0.1', 80))]
 
 
 class TestValidateHost(unittest.TestCase):
@@ -44,3 +69,136 @@ class TestValidateHost(unittest.TestCase):
     def test_not_valid(self):
         with self.assertRaises(ValueError) as e:
             self._validate('red')
+
+
+class TestResolveHosts(unittest.TestCase):
+
+    def test_results(self):
+        resolve_hosts = ResolveHosts(StubResolver({'a': 0, 'b': 0}))
+        errors = resolve_hosts(['a', 'b', 'c', 'a'])
+        self.assertIsNone(errors['a'])
+        self.assertIsNone(errors['b'])
+        self.assertIsInstance(errors['c'], socket.gaierror)
+
+    def test_each_host_once(self):
+        resolver = StubResolver({'a': 0})
+        ResolveHosts(resolver)(['a', 'a', 'a'])
+        self.assertEqual(['a'], resolver.calls)
+
+    def test_at_the_same_time(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def resolver(host):
+            barrier.wait()
+            return [host]
+
+        errors = ResolveHosts(resolver)(['a', 'b', 'c'])
+        self.assertEqual({'a': None, 'b': None, 'c': None}, errors)
+
+    def test_lookup_timeout(self):
+        resolve_hosts = ResolveHosts(StubResolver({'a': 0, 'slow': 1}),
+                                     lookup_timeout=0.05)
+        start = time.monotonic()
+        errors = resolve_hosts(['a', 'slow'])
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertIsNone(errors['a'])
+        self.assertIsInstance(errors['slow'], HostTimeout)
+
+    def test_lookup_timeout_starts_with_the_lookup(self):
+        resolver = StubResolver(dict((str(x), 0.03) for x in range(0, 4)))
+        resolve_hosts = ResolveHosts(resolver, workers=1, lookup_timeout=0.5)
+        errors = resolve_hosts([str(x) for x in range(0, 4)])
+        self.assertEqual([None] * 4, list(errors.values()))
+
+    def test_single_host_on_the_calling_thread(self):
+        threads = []
+
+        def resolver(host):
+            threads.append(threading.current_thread())
+            return [host]
+
+        self.assertEqual({'a': None}, ResolveHosts(resolver)(['a']))
+        self.assertEqual([threading.current_thread()], threads)
+
+    def test_pool_is_kept(self):
+        threads = set()
+
+        def resolver(host):
+            threads.add(threading.current_thread())
+            return [host]
+
+        resolve_hosts = ResolveHosts(resolver, workers=2)
+        for x in range(0, 5):
+            resolve_hosts(['a{0}'.format(x), 'b{0}'.format(x)])
+        self.assertLessEqual(len(threads), 2)
+        self.assertTrue(all(thread.daemon for thread in threads))
+
+    def test_hung_lookup_is_replaced(self):
+        resolver = StubResolver({'slow': 1, 'a': 0})
+        resolve_hosts = ResolveHosts(resolver, workers=1, lookup_timeout=0.05)
+        start = time.monotonic()
+        errors = resolve_hosts(['slow', 'a'])
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertIsInstance(errors['slow'], HostTimeout)
+        self.assertIsNone(errors['a'])
+
+    def test_hung_lookup_does_not_hold_up_exit(self):
+        code = ("import time\n"
+                "from dodai.validate.field.host import ResolveHosts\n"
+                "ResolveHosts(lambda host: time.sleep(3) or [host],\n"
+                "             timeout=0.1)(['a', 'b'])\n")
+        start = time.monotonic()
+        subprocess.check_call([sys.executable, '-c', code])
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_overall_timeout(self):
+        resolver = StubResolver(dict((str(x), 0.2) for x in range(0, 4)))
+        resolve_hosts = ResolveHosts(resolver, workers=1, timeout=0.1)
+        start = time.monotonic()
+        errors = resolve_hosts([str(x) for x in range(0, 4)])
+        self.assertLess(time.monotonic() - start, 0.5)
+        for error in errors.values():
+            self.assertIsInstance(error, HostTimeout)
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.sections = dict(('db{0}'.format(x),
+                              {'host': 'host{0}'.format(x)})
+                             for x in range(0, 6))
+        self.sections['db6'] = {'host': 'host0'}
+        self.resolver = StubResolver(dict(('host{0}'.format(x), 0.01)
+                                          for x in range(0, 4)))
+        self.resolve_hosts = ResolveHosts(self.resolver)
+
+    def test_valid(self):
+        validate = IsValidHost.load(self.sections,
+                                    resolve_hosts=self.resolve_hosts)
+        out = validate.batch(['db0', 'db1', 'db6'])
+        self.assertEqual({'db0': True, 'db1': True, 'db6': True}, out)
+        self.assertEqual(2, len(self.resolver.calls))
+
+    def test_failures_are_reported_together(self):
+        validate = IsValidHost.load(self.sections,
+                                    resolve_hosts=self.resolve_hosts)
+        with self.assertRaises(ValueError) as e:
+            validate.batch(sorted(self.sections))
+        message = str(e.exception)
+        self.assertIn("'db4'", message)
+        self.assertIn("'db5'", message)
+        self.assertNotIn("'db0'", message)
+
+    def test_without_raising(self):
+        validate = IsValidHost.load(self.sections, raise_errors=False,
+                                    resolve_hosts=self.resolve_hosts)
+        out = validate.batch(sorted(self.sections))
+        self.assertEqual([True, True, True, True, False, False, True],
+                         [out[name] for name in sorted(out)])
+
+    def test_single_uses_the_resolver(self):
+        validate = IsValidHost.load(self.sections,
+                                    resolve_hosts=self.resolve_hosts)
+        self.assertTrue(validate('db0'))
+        with self.assertRaises(ValueError):
+            validate('db5')
@@ -0,0 +1,228 @@
+# Copyright (C) 2012 Leonard Thomas
+#
+# This file is part of Dodai.
+#
+# Dodai is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Dodai is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import socket
+import subprocess
+import tempfile
+import unittest
+from dodai.validate import cache as cache_module
+from dodai.validate.cache import HostCache, ValidationCache
+from dodai.validate.field.host import ResolveHosts, HostTimeout
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHostCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = HostCache(ttl=60, negative_ttl=5, clock=self.clock)
+
+    def test_miss(self):
+        self.assertEqual((False, None), self.cache.get('a'))
+        self.assertEqual((0, 1), (self.cache.hits, self.cache.misses))
+
+    def test_positive(self):
+        self.cache.update({'a': None})
+        self.clock.now += 59
+        self.assertEqual((True, None), self.cache.get('a'))
+        self.clock.now += 1
+        self.assertEqual((False, None), self.cache.get('a'))
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+    def test_negative(self):
+        error = socket.gaierror('a')
+        self.cache.update({'a': error})
+        self.assertEqual((True, error), self.cache.get('a'))
+        self.clock.now += 5
+        self.assertEqual((False, None), self.cache.get('a'))
+
+    def test_clear(self):
+        self.cache.update({'a': None})
+        self.cache.get('a')
+        self.cache.clear()
+        self.assertEqual(0, self.cache.hits)
+        self.assertEqual((False, None), self.cache.get('a'))
+
+    def test_shared(self):
+        self.assertIs(HostCache.shared(), HostCache.shared())
+
+
+class TestPersistedHostCache(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, 'hosts.json')
+        self.clock = Clock()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _cache(self):
+        return HostCache(self.path, ttl=60, negative_ttl=5, clock=self.clock)
+
+    def test_shared_between_instances(self):
+        self._cache().update({'a': None, 'b': socket.gaierror('no b'),
+                              'c': HostTimeout('slow c')})
+        cache = self._cache()
+        self.assertEqual((True, None), cache.get('a'))
+        found, error = cache.get('b')
+        self.assertIsInstance(error, socket.gaierror)
+        self.assertEqual('no b', str(error))
+        found, error = cache.get('c')
+        self.assertIsInstance(error, socket.timeout)
+
+    def test_expired_entries_are_not_written(self):
+        self._cache().update({'a': None})
+        self.clock.now += 61
+        cache = self._cache()
+        cache.update({'b': None})
+        self.assertNotIn('"a"', open(self.path).read())
+
+    def test_bad_file(self):
+        with open(self.path, 'w') as f:
+            f.write('{"version": 1, "hosts": [1, 2]}')
+        self.assertEqual((False, None), self._cache().get('a'))
+
+    def test_writes_merge_other_processes(self):
+        one = self._cache()
+        two = self._cache()
+        one.get('x')
+        two.get('x')
+        one.update({'a': None})
+        two.update({'b': None})
+        cache = self._cache()
+        self.assertEqual((True, None), cache.get('a'))
+        self.assertEqual((True, None), cache.get('b'))
+        two.update({'c': None})
+        self.assertEqual((True, None), two.get('a'))
+
+    def test_newest_write_wins_between_processes(self):
+        cache = self._cache()
+        cache.get('x')
+        code = ("from dodai.validate.cache import HostCache\n"
+                "HostCache({0!r}, ttl=60, negative_ttl=5,\n"
+                "          clock=lambda: 1000.0).update({{'a': None}})\n"
+                ).format(self.path)
+        subprocess.check_call([sys.executable, '-c', code])
+        self.clock.now = 1010.0
+        cache.update({'a': socket.gaierror('no a')})
+        for cache in (cache, self._cache()):
+            found, error = cache.get('a')
+            self.assertIsInstance(error, socket.gaierror)
+        self.clock.now = 1015.0
+        self.assertEqual((False, None), self._cache().get('a'))
+
+    def test_clear_is_not_merged(self):
+        self._cache().update({'a': None})
+        cache = self._cache()
+        cache.clear()
+        self.assertEqual((False, None), self._cache().get('a'))
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            cache_module._TTLCache()
+
+
+class TestResolveHostsCache(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.cache = HostCache()
+
+    def resolver(self, host):
+        self.calls.append(host)
+        if host == 'bad':
+            raise socket.gaierror(host)
+        return [host]
+
+    def test_results_are_reused(self):
+        resolve_hosts = ResolveHosts(self.resolver, cache=self.cache)
+        first = resolve_hosts(['a', 'bad'])
+        second = resolve_hosts(['a', 'bad', 'b'])
+        self.assertEqual(['a', 'b', 'bad'], sorted(self.calls))
+        self.assertIsNone(second['a'])
+        self.assertIs(first['bad'], second['bad'])
+        self.assertEqual(2, self.cache.hits)
+
+    def test_no_cache_with_a_resolver(self):
+        resolve_hosts = ResolveHosts(self.resolver)
+        resolve_hosts(['a'])
+        resolve_hosts(['a'])
+        self.assertIsNone(resolve_hosts.cache)
+        self.assertEqual(['a', 'a'], self.calls)
+
+    def test_shared_cache_by_default(self):
+        self.assertIs(HostCache.shared(), ResolveHosts().cache)
+
+
+class TestPersistedValidationCache(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, 'validation.json')
+        self.clock = Clock()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _cache(self):
+        return ValidationCache(self.path, ttl=60, negative_ttl=5,
+                               clock=self.clock)
+
+    def test_shared_between_instances(self):
+        invalid = (ValidationCache.INVALID, 'KeyError', ('no path',))
+        self._cache().update({'a': (ValidationCache.VALID, None, ()),
+                              'b': invalid})
+        cache = self._cache()
+        self.assertEqual((True, (ValidationCache.VALID, None, ())),
+                         cache.get('a'))
+        self.assertEqual((True, invalid), cache.get('b'))
+
+    def test_invalid_outcomes_expire_first(self):
+        self._cache().update({'a': (ValidationCache.SKIPPED, None, ()),
+                              'b': (ValidationCache.INVALID, None, ('x',))})
+        self.clock.now += 5
+        cache = self._cache()
+        self.assertTrue(cache.get('a')[0])
+        self.assertFalse(cache.get('b')[0])
+
+    def test_newest_write_wins(self):
+        valid = (ValidationCache.VALID, None, ())
+        invalid = (ValidationCache.INVALID, 'ValueError', ('bad host',))
+        one = self._cache()
+        two = self._cache()
+        two.get('x')
+        one.update({'a': valid})
+        self.clock.now += 10
+        two.update({'a': invalid})
+        self.assertEqual((True, invalid), two.get('a'))
+        self.assertEqual((True, invalid), self._cache().get('a'))
+        one.update({'b': valid})
+        self.assertEqual((True, invalid), one.get('a'))
+
+    def test_own_shared_cache(self):
+        self.assertIsNot(ValidationCache.shared(), HostCache.shared())
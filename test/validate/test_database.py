@@ -15,9 +15,15 @@
 # You should have received a copy of the GNU General Public License
 # along with Dodai.  If not, see <http://www.gnu.org/licenses/>.
 
+import configparser
+import socket
+import threading
 import unittest
+from dodai.validate.cache import ValidationCache
 from dodai.validate.database import IsDatabaseConnectionSection
 from dodai.validate.database import IsValidDatabaseConnectionSection
+from dodai.validate.database import ValidateOnFirstUse
+from dodai.validate.field.host import ResolveHosts
 
 class TestIsDatabaseConnectionSection(unittest.TestCase):
 
@@ -108,3 +114,228 @@ class TestIsValidDatabaseConnectionSection(unittest.TestCase):
         validate = IsValidDatabaseConnectionSection.load(self.DATA,
                                                 also_validate_schema=False)
         self.assertTrue(validate('db.orange'))
+
+
+class TestBatch(unittest.TestCase):
+
+    DATA = {
+        'db.green': {'dialect': 'sqlite', 'path': '/foo'},
+        'db.blue': {'dialect': 'postgresql', 'host': 'good', 'port': '1',
+                    'username': 'foo', 'password': 'bar',
+                    'database': 'test', 'schema': 'public'},
+        'db.teal': {'dialect': 'mysql', 'host': 'good', 'port': '2',
+                    'username': 'foo', 'password': 'bar',
+                    'database': 'test'},
+        'db.red': {'dialect': 'access'},
+        'db.orange': {'dialect': 'oracle', 'host': 'bad', 'port': 'x',
+                      'username': 'foo', 'password': 'bar',
+                      'database': 'test'},
+        'db.purple': {'dialect': 'foobar'},
+        'db.brown': {'dialect': 'postgresql', 'ignore': 'true'},
+        'server': {'env': 'prod'},
+    }
+
+    def setUp(self):
+        self.calls = []
+        self.validate = IsValidDatabaseConnectionSection.load(
+                            self.DATA, resolve_hosts=ResolveHosts(self.resolve))
+
+    def resolve(self, host):
+        self.calls.append(host)
+        if host != 'good':
+            raise socket.gaierror(host)
+        return [host]
+
+    def test_report(self):
+        report = self.validate.batch()
+        self.assertFalse(report.ok)
+        self.assertEqual(['db.blue', 'db.green', 'db.teal'],
+                         sorted(report.valid))
+        self.assertEqual(['db.brown', 'server'], sorted(report.skipped))
+        self.assertEqual(['db.orange', 'db.purple', 'db.red'],
+                         sorted(report.errors))
+
+    def test_every_error_is_kept(self):
+        errors = self.validate.batch().errors
+        self.assertEqual(2, len(errors['db.orange']))
+        self.assertIn("'host' of 'bad'", errors['db.orange'][0])
+        self.assertIn("'port' of 'x'", errors['db.orange'][1])
+        self.assertIn("'path'", errors['db.red'][0])
+        self.assertIn("'foobar'", errors['db.purple'][0])
+
+    def test_hosts_are_resolved_once(self):
+        self.validate.batch()
+        self.assertEqual(['bad', 'good'], sorted(self.calls))
+
+    def test_raise_errors(self):
+        report = self.validate.batch(['db.green', 'db.red', 'db.orange'])
+        with self.assertRaises(ValueError) as e:
+            report.raise_errors()
+        self.assertEqual(3, len(str(e.exception).split('\n')))
+
+    def test_same_result_as_calling(self):
+        report = self.validate.batch(['db.blue', 'db.teal', 'db.green'])
+        self.assertTrue(report.ok)
+        for section_name in report.valid:
+            self.assertTrue(self.validate(section_name))
+
+    def test_without_raising_errors(self):
+        validate = IsValidDatabaseConnectionSection.load(
+                        self.DATA, raise_errors=False,
+                        resolve_hosts=ResolveHosts(self.resolve))
+        report = validate.batch()
+        self.assertEqual(['db.orange', 'db.red'], sorted(report.errors))
+        self.assertIn('db.purple', report.skipped)
+
+    def test_plan_is_compiled_once(self):
+        self.validate('db.blue')
+        plan = self.validate._plan('db.blue')
+        self.assertIs(plan, self.validate._plan('db.blue'))
+        self.assertEqual(6, sum(len(checks) for checks in plan))
+
+
+class TestValidationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.data = dict((name, dict(values)) for name, values
+                         in TestBatch.DATA.items())
+        self.calls = []
+        self.cache = ValidationCache()
+
+    def resolve(self, host):
+        self.calls.append(host)
+        if host != 'good':
+            raise socket.gaierror(host)
+        return [host]
+
+    def _validate(self, data=None, **kwargs):
+        return IsValidDatabaseConnectionSection.load(
+                        data or self.data, cache=self.cache,
+                        resolve_hosts=ResolveHosts(self.resolve), **kwargs)
+
+    def test_unchanged_sections_are_not_validated_again(self):
+        first = self._validate().batch()
+        self.calls = []
+        second = self._validate().batch()
+        self.assertEqual([], self.calls)
+        self.assertEqual(len(self.data), self.cache.hits)
+        self.assertEqual(sorted(first.valid), sorted(second.valid))
+        self.assertEqual(first.errors, second.errors)
+        self.assertEqual(sorted(first.skipped), sorted(second.skipped))
+
+    def test_changed_section_is_validated_again(self):
+        self._validate().batch()
+        self.calls = []
+        self.data['db.orange']['host'] = 'good'
+        report = self._validate().batch()
+        self.assertEqual(['good'], self.calls)
+        self.assertEqual(1, len(report.errors['db.orange']))
+
+    def test_configuration_is_part_of_the_key(self):
+        self._validate().batch(['db.blue'])
+        self._validate(also_validate_schema=False).batch(['db.blue'])
+        self.assertEqual(0, self.cache.hits)
+
+    def test_raw_values_are_hashed(self):
+        data = configparser.ConfigParser()
+        data.read_dict(self.data)
+        data.read_string('[db.blue]\nnote = 100%\n')
+        self.data = data
+        uncached = IsValidDatabaseConnectionSection.load(
+                        self.data, resolve_hosts=ResolveHosts(self.resolve))
+        self.assertTrue(uncached('db.blue'))
+        self.assertTrue(self._validate()('db.blue'))
+        self.assertTrue(self._validate()('db.blue'))
+        self.assertEqual(1, self.cache.hits)
+
+    def test_call_raises_kept_errors(self):
+        with self.assertRaises(ValueError):
+            self._validate()('db.orange')
+        with self.assertRaises(KeyError):
+            self._validate()('db.red')
+        with self.assertRaises(ValueError):
+            self._validate()('db.orange')
+        self.assertTrue(self._validate()('db.blue'))
+        self.assertFalse(self._validate()('server'))
+        self.assertEqual(1, self.cache.hits)
+
+
+class TestValidateOnFirstUse(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.validate = ValidateOnFirstUse.load(
+                            TestBatch.DATA,
+                            resolve_hosts=ResolveHosts(self.resolve))
+
+    def resolve(self, host):
+        self.calls.append(host)
+        if host != 'good':
+            raise socket.gaierror(host)
+        return [host]
+
+    def test_names_are_not_validated(self):
+        self.assertEqual(['db.blue', 'db.brown', 'db.green', 'db.orange',
+                          'db.purple', 'db.red', 'db.teal'],
+                         sorted(self.validate.names))
+        self.assertEqual([], self.calls)
+        self.assertFalse(self.validate.is_validated('db.blue'))
+
+    def test_validated_on_first_use_only(self):
+        self.assertTrue(self.validate('db.blue'))
+        self.assertTrue(self.validate('db.blue'))
+        self.assertEqual(['good'], self.calls)
+        self.assertTrue(self.validate.is_validated('db.blue'))
+        self.assertFalse(self.validate.is_validated('db.teal'))
+
+    def test_kept_errors_are_raised_again(self):
+        for x in range(0, 2):
+            with self.assertRaises(ValueError):
+                self.validate('db.orange')
+            with self.assertRaises(KeyError):
+                self.validate('db.red')
+        self.assertEqual(['bad'], self.calls)
+        self.assertFalse(self.validate('db.brown'))
+
+    def test_sections_are_validated_in_parallel(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        class Validate(object):
+
+            def outcomes(self, section_names):
+                if 'db.slow' in section_names:
+                    started.set()
+                    release.wait(5)
+                return dict((section_name, (ValidationCache.VALID, None, ()))
+                            for section_name in section_names)
+
+            def replay(self, outcome):
+                return True
+
+        validate = ValidateOnFirstUse({'db.slow': {}, 'db.fast': {}},
+                                      Validate())
+        thread = threading.Thread(target=validate, args=('db.slow',))
+        thread.start()
+        self.assertTrue(started.wait(5))
+        try:
+            self.assertTrue(validate('db.fast'))
+            self.assertFalse(validate.is_validated('db.slow'))
+        finally:
+            release.set()
+            thread.join()
+        self.assertTrue(validate.is_validated('db.slow'))
+
+    def test_validate_all(self):
+        self.validate('db.blue')
+        report = self.validate.validate_all()
+        self.assertEqual(['db.blue', 'db.green', 'db.teal'],
+                         sorted(report.valid))
+        self.assertEqual(['db.orange', 'db.purple', 'db.red'],
+                         sorted(report.errors))
+        self.assertEqual(['db.brown'], report.skipped)
+        self.assertEqual(['bad', 'good', 'good'], sorted(self.calls))
+        self.validate.validate_all()
+        self.assertEqual(3, len(self.calls))
+        self.assertTrue(self.validate('db.teal'))
+        self.assertEqual(3, len(self.calls))